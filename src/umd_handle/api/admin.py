@@ -1,10 +1,18 @@
-from django.contrib import admin
+import re
+
+from django import forms
+from django.contrib import admin, messages
+from django.contrib.admin.helpers import ACTION_CHECKBOX_NAME
+from django.contrib.admin.views.main import ChangeList
 from django.contrib.auth.models import Group, User
-from django.db.models import CharField, Value
-from django.db.models.functions import Cast, Concat, LPad
+from django.template.response import TemplateResponse
 from django.utils.html import format_html
 
-from .models import Handle
+from .history import handle_values, record_create, record_delete, record_update, request_actor
+from .models import Handle, HandleHistory, HandleLinkCheck, UrlRewriteRule
+from .paginators import EstimatedCountPaginator
+from .search import exact_match, full_text_search, with_repo_id_match
+from .url_rewrite import UrlRewrite, rewrite_urls
 
 # Customize the site header, title, and admin index page title
 admin.site.site_header = "UMD Handle Service"
@@ -17,49 +25,164 @@ admin.site.unregister(User)
 admin.site.unregister(Group)
 
 
+class HandleChangeList(ChangeList):
+    def get_ordering(self, request, queryset):
+        ordering = super().get_ordering(request, queryset)
+
+        # Sorting by the "Handle" column orders by "prefix" (see
+        # "combined_handle"), so add "suffix" to order by the
+        # (prefix, suffix) pair, which can use the unique constraint index.
+        # As the pair is unique, any ordering fields after it are redundant.
+        for i, field in enumerate(ordering):
+            if field in ('prefix', '-prefix'):
+                return ordering[:i] + [field, field.replace('prefix', 'suffix')]
+        return ordering
+
+
+class UrlRewriteForm(forms.Form):
+    pattern = forms.CharField(label='Replace', help_text='The URL prefix (or regular expression) to replace')
+    replacement = forms.CharField(label='With', required=False)
+    regex = forms.BooleanField(
+        label='Regular expression', required=False,
+        help_text='Replace the matches of a regular expression ("With" may use "\\1" group references)'
+    )
+
+    def clean(self):
+        cleaned_data = super().clean()
+        if 'pattern' in cleaned_data:
+            try:
+                cleaned_data['rewrite'] = UrlRewrite(
+                    cleaned_data['pattern'], cleaned_data.get('replacement', ''), regex=cleaned_data.get('regex')
+                )
+            except re.error as e:
+                raise forms.ValidationError(f"Invalid regular expression: {e}")
+        return cleaned_data
+
+
 class HandleAdmin(admin.ModelAdmin):
     fields = [
         'prefix', 'suffix', 'url', 'repo', 'repo_id', 'description', 'notes',
-        'created', 'modified',
+        'created', 'modified', 'legacy_modified',
     ]
-    readonly_fields = ('suffix', 'created', 'modified')
+    readonly_fields = ('suffix', 'created', 'modified', 'legacy_modified')
 
     list_display = (
-        'combined_handle', 'url_link', 'repo', 'repo_id', 'modified'
+        'combined_handle', 'url_link', 'repo', 'repo_id', 'modified', 'hits', 'last_accessed'
     )
-    # Default order for admin list - modified descending
-    ordering = ['-modified']
+    # The resolution counts are retrieved in the same query as the handles
+    list_select_related = ('stats',)
+    # Default order for admin list - modified descending (the "id" tie-breaker
+    # allows the "modified"/"id" index to be used)
+    ordering = ['-modified', '-id']
 
     search_fields = [
         'prefix', 'suffix', 'url', 'repo', 'repo_id', 'description', 'notes'
     ]
 
-    def get_queryset(self, request):
-      queryset = super().get_queryset(request)
+    # Avoid "SELECT COUNT(*)" queries on the (large) handles table
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+
+    def get_changelist(self, request, **kwargs):
+        return HandleChangeList
 
-      # Modify the the "Handle" (prefix/suffix) combination sorting to ensure
-      # that the suffixes are sorted numerically by left-padding with zero
-      # out to 10 digits (the approximate max length of the IntegerField).
-      return queryset.annotate(
-          _handle_sort_key=Concat(
-              'prefix',
-              # Pad the string representation of suffix with up to 10 leading zeros
-              LPad(Cast('suffix', output_field=CharField()), Value(10), Value('0')),
-              output_field=CharField()
-          )
-      )
+    def get_search_results(self, request, queryset, search_term):
+        # Handles ("<PREFIX>/<SUFFIX>") are found using an indexed equality
+        # lookup
+        exact_queryset = exact_match(queryset, search_term)
+        if exact_queryset is not None:
+            return exact_queryset, False
 
+        search_queryset = full_text_search(queryset, search_term)
+        may_have_duplicates = False
+        if search_queryset is None:
+            # In PostgreSQL, the "icontains" lookups are supported by trigram
+            # indexes
+            search_queryset, may_have_duplicates = super().get_search_results(request, queryset, search_term)
+        return with_repo_id_match(search_queryset, queryset, search_term), may_have_duplicates
 
     list_filter = ('repo', 'created', 'modified')
 
+    actions = ['rewrite_selected_urls']
+
+    @admin.action(description='Rewrite URLs of selected handles', permissions=['change'])
+    def rewrite_selected_urls(self, request, queryset):
+        """
+        Rewrites the URLs of the selected handles, using a set-based UPDATE,
+        after showing a form for the substitution, and a preview of the
+        number of handles that would be changed.
+        """
+        submitted = 'preview' in request.POST or 'apply' in request.POST
+        form = UrlRewriteForm(request.POST if submitted else None)
+        preview = None
+
+        if submitted and form.is_valid():
+            apply = 'apply' in request.POST
+            result = rewrite_urls(
+                queryset, form.cleaned_data['rewrite'], dry_run=not apply, actor=request_actor(request)
+            )
+            if apply:
+                self.message_user(request, f"Rewrote {result.rewritten} of {result.matched} matching URL(s).", messages.SUCCESS)
+                if result.invalid:
+                    self.message_user(
+                        request,
+                        f"{result.invalid} handle(s) were skipped, because the rewritten URL is not valid.",
+                        messages.WARNING
+                    )
+                # Return to the change list
+                return None
+            preview = result
+
+        context = {
+            **self.admin_site.each_context(request),
+            'title': 'Rewrite URLs',
+            'opts': self.model._meta,
+            'form': form,
+            'preview': preview,
+            'selected_count': queryset.count(),
+            'selected': request.POST.getlist(ACTION_CHECKBOX_NAME),
+            'select_across': request.POST.get('select_across', '0'),
+            'action': request.POST.get('action', 'rewrite_selected_urls'),
+            'action_checkbox_name': ACTION_CHECKBOX_NAME,
+        }
+        return TemplateResponse(request, 'admin/api/handle/rewrite_urls.html', context)
+
     @admin.display(description='URL', ordering='url')
     def url_link(self, obj):
         return format_html('<a href="{url}">{url}</a>', url=obj.url)
 
-    @admin.display(description='Handle', ordering='_handle_sort_key')
+    @admin.display(description='Handle', ordering='prefix')
     def combined_handle(self, obj):
         return str(obj)
 
+    @admin.display(description='Hits', ordering='stats__hits')
+    def hits(self, obj):
+        stats = getattr(obj, 'stats', None)
+        return stats.hits if stats else 0
+
+    @admin.display(description='Last accessed', ordering='stats__last_accessed')
+    def last_accessed(self, obj):
+        stats = getattr(obj, 'stats', None)
+        return stats.last_accessed if stats else None
+
+    def save_model(self, request, obj, form, change):
+        super().save_model(request, obj, form, change)
+        if change:
+            before = {field: form.initial[field] for field in handle_values(obj) if field in form.initial}
+            record_update(obj, before, request_actor(request))
+        else:
+            record_create(obj, request_actor(request))
+
+    def delete_model(self, request, obj):
+        record_delete(obj, request_actor(request))
+        super().delete_model(request, obj)
+
+    def delete_queryset(self, request, queryset):
+        actor = request_actor(request)
+        for obj in queryset:
+            record_delete(obj, actor)
+        super().delete_queryset(request, queryset)
+
     def get_readonly_fields(self, request, obj=None):
         if obj:
             # Editing an existing handle
@@ -69,3 +192,60 @@ class HandleAdmin(admin.ModelAdmin):
             return self.readonly_fields
 
 admin.site.register(Handle, HandleAdmin)
+
+
+class HandleHistoryAdmin(admin.ModelAdmin):
+    """
+    Read-only view of the handle history.
+    """
+    list_display = ('created', 'combined_handle', 'action', 'actor')
+    list_filter = ('action', 'created')
+    search_fields = ['actor']
+    ordering = ['-created', '-id']
+
+    @admin.display(description='Handle', ordering='prefix')
+    def combined_handle(self, obj):
+        return f"{obj.prefix}/{obj.suffix}"
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def has_delete_permission(self, request, obj=None):
+        return False
+
+admin.site.register(HandleHistory, HandleHistoryAdmin)
+
+
+class HandleLinkCheckAdmin(admin.ModelAdmin):
+    """
+    Read-only view of the link checks (see the "db_check_links" command).
+    """
+    list_display = ('handle', 'url', 'status', 'location', 'error', 'checked')
+    list_filter = ('status', 'checked')
+    list_select_related = ('handle',)
+    search_fields = ['url']
+    ordering = ['-checked', '-id']
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+admin.site.register(HandleLinkCheck, HandleLinkCheckAdmin)
+
+
+class UrlRewriteRuleAdmin(admin.ModelAdmin):
+    fields = [
+        'match_type', 'pattern', 'replacement', 'repo', 'priority', 'enabled', 'description',
+        'created', 'modified',
+    ]
+    readonly_fields = ('created', 'modified')
+    list_display = ('pattern', 'replacement', 'match_type', 'repo', 'priority', 'enabled')
+    list_filter = ('enabled', 'match_type', 'repo')
+    ordering = ['-priority', 'id']
+
+admin.site.register(UrlRewriteRule, UrlRewriteRuleAdmin)
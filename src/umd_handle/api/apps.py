@@ -4,3 +4,7 @@ from django.apps import AppConfig
 class ApiConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'umd_handle.api'
+
+    def ready(self):
+        # Connect the signal handlers that reload the URL rewrite rules
+        from . import rewrite_rules  # noqa: F401
@@ -0,0 +1,48 @@
+"""
+Incremental change feed of handles, for downstream consumers (such as Solr
+indexers and the Handle.net server) that need to pick up new and changed
+handles without re-exporting every handle.
+
+Changes are returned in ("modified", "id") order, using the index on those
+columns. Each change includes a cursor, so that a consumer can resume after
+the last change it processed.
+"""
+from datetime import timedelta
+
+from django.conf import settings
+from django.utils import timezone
+
+from .cursors import after_cursor, encode_cursor
+from .models import Handle
+
+
+def changed_handles(since=None, limit=None):
+    """
+    Returns an iterator of (cursor, handle) tuples for handles modified after
+    the given cursor (or all handles, if no cursor is given), streamed from
+    the database in chunks.
+
+    Handles modified within the last CHANGE_FEED_SETTLE_SECONDS are not
+    returned, so that changes from transactions that have not yet committed
+    are not skipped over by the cursor. Raises InvalidCursor if the cursor is
+    not valid.
+    """
+    settled = timezone.now() - timedelta(seconds=settings.CHANGE_FEED_SETTLE_SECONDS)
+    queryset = after_cursor(Handle.objects.filter(modified__lt=settled), 'modified', since)
+    if limit:
+        queryset = queryset[:limit]
+
+    # The cursor is validated above, before any changes are streamed
+    return _stream_changes(queryset)
+
+
+def _stream_changes(queryset):
+    for handle in queryset.iterator(chunk_size=settings.CHANGE_FEED_CHUNK_SIZE):
+        yield encode_cursor('modified', handle), handle
+
+
+def change_record(cursor, handle):
+    """
+    Returns the dictionary representation of a change in the feed.
+    """
+    return {'cursor': cursor, 'handle': handle.to_dict()}
@@ -0,0 +1,147 @@
+"""
+Conditional ("If-Match") handle updates, for optimistic concurrency control.
+
+The version of a handle is its "modified" timestamp, which is returned (as
+microseconds since the epoch) in the "ETag" header of the handle endpoint. A
+PATCH request with an "If-Match" header only updates the handle if it still
+has that version, so that concurrent editors cannot silently overwrite each
+other's changes.
+
+The check and the update are a single conditional UPDATE statement. On
+PostgreSQL, the statement also returns the previous values of the handle (for
+the handle history), so the update is a single round trip. Other databases
+lock and read the handle first.
+"""
+import datetime
+
+from django.db import connection, transaction
+from django.utils import timezone
+from django.utils.http import parse_etags, quote_etag
+
+from .history import handle_values
+from .models import Handle
+
+EPOCH = datetime.datetime(1970, 1, 1, tzinfo=datetime.UTC)
+ONE_MICROSECOND = datetime.timedelta(microseconds=1)
+
+
+class PreconditionFailed(Exception):
+    pass
+
+
+def handle_etag(handle):
+    """
+    Returns the (quoted) ETag of the given handle.
+    """
+    return quote_etag(str((handle.modified - EPOCH) // ONE_MICROSECOND))
+
+
+def if_match_versions(header):
+    """
+    Returns the handle versions (i.e., "modified" timestamps) in the given
+    If-Match header, or None if the header is "*" (matching any version).
+
+    Weak ETags, and ETags that are not handle versions, never match, so are
+    ignored.
+    """
+    etags = parse_etags(header)
+    if etags == ['*']:
+        return None
+
+    versions = []
+    for etag in etags:
+        if etag.startswith('W/'):
+            continue
+        try:
+            versions.append(EPOCH + int(etag.strip('"')) * ONE_MICROSECOND)
+        except (ValueError, OverflowError):
+            continue
+    return versions
+
+
+def conditional_update(prefix, suffix, versions, values):
+    """
+    Updates the given fields (a dictionary of validated values) of the handle,
+    if the handle has one of the given versions.
+
+    Returns a (handle, before) tuple, of the updated handle, and the values of
+    its recorded fields (see "handle_values") before the update. Raises
+    PreconditionFailed if the handle has another version, or
+    Handle.DoesNotExist if there is no such handle.
+    """
+    modified = timezone.now()
+    if not versions:
+        handle = None
+    elif not values:
+        # Nothing to update, so only check the version
+        handle = Handle.objects.filter(prefix=prefix, suffix=suffix, modified__in=versions).first()
+        if handle is not None:
+            return handle, handle_values(handle)
+    elif connection.vendor == 'postgresql':
+        handle = _update_returning_previous(prefix, suffix, versions, values, modified)
+    else:
+        handle = _lock_and_update(prefix, suffix, versions, values, modified)
+
+    if handle is None:
+        # Only queried when the update fails
+        if Handle.objects.filter(prefix=prefix, suffix=suffix).exists():
+            raise PreconditionFailed(f"Handle {prefix}/{suffix} has been modified")
+        raise Handle.DoesNotExist()
+
+    before = handle_values(handle)
+    for field, value in values.items():
+        setattr(handle, field, value)
+    handle.modified = modified
+    return handle, before
+
+
+def _update_returning_previous(prefix, suffix, versions, values, modified):
+    """
+    Updates the handle, returning the handle before the update (or None if
+    the handle was not updated).
+
+    The table is joined with itself, as RETURNING only sees the new values of
+    the updated table, while the joined table has the previous values.
+    """
+    quote_name = connection.ops.quote_name
+    table = quote_name(Handle._meta.db_table)
+    modified_field = Handle._meta.get_field('modified')
+    fields = [Handle._meta.get_field(name) for name in values] + [modified_field]
+    assignments = ', '.join(f"{quote_name(field.column)} = %s" for field in fields)
+    params = [field.get_db_prep_save(value, connection) for field, value in zip(fields, [*values.values(), modified])]
+    returned = Handle._meta.concrete_fields
+    columns = ', '.join(f"previous.{quote_name(field.column)}" for field in returned)
+    pk, prefix_column, suffix_column, modified_column = (
+        quote_name(Handle._meta.get_field(name).column) for name in ['id', 'prefix', 'suffix', 'modified']
+    )
+
+    sql = (
+        f"UPDATE {table} SET {assignments} "
+        f"FROM {table} AS previous "
+        f"WHERE previous.{pk} = {table}.{pk} "
+        f"AND {table}.{prefix_column} = %s AND {table}.{suffix_column} = %s "
+        f"AND {table}.{modified_column} IN ({', '.join(['%s'] * len(versions))}) "
+        f"RETURNING {columns}"
+    )
+    params += [prefix, suffix] + [modified_field.get_db_prep_value(version, connection) for version in versions]
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+        row = cursor.fetchone()
+    if row is None:
+        return None
+    return Handle.from_db(connection.alias, [field.attname for field in returned], row)
+
+
+def _lock_and_update(prefix, suffix, versions, values, modified):
+    """
+    Updates the handle, returning the handle before the update (or None if
+    the handle was not updated), by locking and reading the handle first.
+    """
+    with transaction.atomic():
+        previous = Handle.objects.select_for_update().filter(
+            prefix=prefix, suffix=suffix, modified__in=versions
+        ).first()
+        if previous is None:
+            return None
+        Handle.objects.filter(pk=previous.pk).update(**values, modified=modified)
+    return previous
@@ -0,0 +1,251 @@
+"""
+Support for long-running CSV import commands (i.e.,
+"db_import_handles_from_csv"):
+
+* CSVImportReader reads the rows of the CSV file, reporting the progress
+  (rows/sec and ETA) periodically, and recording the byte offset of the last
+  imported row in a checkpoint file, so that an interrupted import can be
+  resumed from that row
+* ImportErrors writes each error as it happens (to an errors file, if
+  given), instead of keeping every error in memory
+
+The CSV file may be "-" (STDIN), and may be compressed (gzip, bzip2, xz, or,
+if the "zstandard" package is installed, zstd), which is detected from the
+start of the file and decompressed as it is read.
+"""
+import bz2
+import csv
+import datetime
+import gzip
+import io
+import json
+import lzma
+import os
+import stat
+import sys
+import tempfile
+import time
+
+# The "magic" bytes at the start of each compression format
+COMPRESSION_FORMATS = [
+    (b'\x1f\x8b', 'gzip'),
+    (b'BZh', 'bzip2'),
+    (b'\xfd7zXZ\x00', 'xz'),
+    (b'\x28\xb5\x2f\xfd', 'zstd'),
+]
+
+
+class CheckpointError(Exception):
+    pass
+
+
+def open_input(path):
+    """
+    Opens the given file (or STDIN, if the path is "-"), returning a
+    (file, raw file) tuple, of the (binary) file to read, and the underlying
+    file, which differ if the file is compressed.
+    """
+    # The file is closed by the caller
+    raw = sys.stdin.buffer if path == '-' else open(path, 'rb')  # noqa: SIM115
+    try:
+        start = raw.peek(6)[:6]
+        compression = next((name for magic, name in COMPRESSION_FORMATS if start.startswith(magic)), None)
+        if compression == 'gzip':
+            return gzip.GzipFile(fileobj=raw, mode='rb'), raw
+        if compression == 'bzip2':
+            return bz2.BZ2File(raw, 'rb'), raw
+        if compression == 'xz':
+            return lzma.LZMAFile(raw, 'rb'), raw
+        if compression == 'zstd':
+            try:
+                import zstandard
+            except ImportError:
+                raise OSError('zstd-compressed files require the "zstandard" package')
+            reader = zstandard.ZstdDecompressor().stream_reader(raw, read_across_frames=True)
+            return io.BufferedReader(reader), raw
+        return raw, raw
+    except BaseException:
+        if raw is not sys.stdin.buffer:
+            raw.close()
+        raise
+
+
+class CSVImportReader:
+    """
+    Iterates over the rows of a CSV file, as (row number, row dictionary)
+    tuples, where the header is row 1.
+
+    Each row is assumed to have been imported (and committed) once the next
+    row is requested, so the checkpoint records the last such row. The
+    checkpoint is written every "progress_seconds", along with a progress
+    line (written using the "progress" function), and when all the rows have
+    been read.
+    """
+    def __init__(self, path, checkpoint_file=None, resume=False, progress=None, progress_seconds=10.0):
+        self.path = path
+        self.checkpoint_file = checkpoint_file
+        self.resume = resume
+        self.progress = progress
+        self.progress_seconds = progress_seconds
+
+        # The number of the last row read, and the byte offset of its end
+        self.row = 1
+        self.offset = 0
+        self.rows_read = 0
+
+        self._file, self._raw = open_input(path)
+        # The size of the (possibly compressed) file, if it is a regular file
+        self._size = None
+        try:
+            file_stat = os.fstat(self._raw.fileno())
+            if stat.S_ISREG(file_stat.st_mode):
+                self._size = file_stat.st_size
+        except (OSError, ValueError):
+            # Not a file (i.e., a replaced STDIN)
+            pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def close(self):
+        if self._raw is not sys.stdin.buffer:
+            self._file.close()
+            self._raw.close()
+
+    def _lines(self):
+        # Tracks the byte offset of the lines read by the CSV reader, which
+        # only reads as many lines as it needs for each row
+        for line in self._file:
+            self.offset += len(line)
+            yield line.decode('utf-8')
+
+    def __iter__(self):
+        reader = csv.DictReader(self._lines())
+        # Read the header
+        _ = reader.fieldnames
+
+        if self.resume:
+            self._resume(reader)
+
+        start_position = self._position()
+        start_time = last_report = time.monotonic()
+        for row in reader:
+            self.row += 1
+            end_offset = self.offset
+            yield self.row, row
+
+            # The row has been imported
+            self.rows_read += 1
+            now = time.monotonic()
+            if now - last_report >= self.progress_seconds:
+                last_report = now
+                self._write_checkpoint(self.row, end_offset)
+                self._report(now - start_time, start_position)
+
+        self._write_checkpoint(self.row, self.offset, complete=True)
+
+    def _resume(self, reader):
+        checkpoint = self.read_checkpoint()
+        if checkpoint is None:
+            return
+        if checkpoint['path'] != self._checkpoint_path():
+            raise CheckpointError(f"Checkpoint file is for another CSV file: {checkpoint['path']}")
+
+        if self._size is not None and self._file.seekable():
+            # A compressed file is decompressed up to the offset, which is
+            # still faster than parsing the rows
+            self._file.seek(checkpoint['offset'])
+            self.offset = checkpoint['offset']
+            self.row = checkpoint['row']
+        else:
+            # Not seekable (STDIN, or a zstd stream), so the imported rows
+            # are read again, and skipped
+            for _ in zip(range(checkpoint['row'] - 1), reader):
+                pass
+            self.row = checkpoint['row']
+
+        if self.progress:
+            self.progress(f"Resuming after row {self.row}")
+
+    def _checkpoint_path(self):
+        return self.path if self.path == '-' else os.path.abspath(self.path)
+
+    def read_checkpoint(self):
+        """
+        Returns the checkpoint, or None if there is no checkpoint file.
+        """
+        if not self.checkpoint_file or not os.path.exists(self.checkpoint_file):
+            return None
+        try:
+            with open(self.checkpoint_file, encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError) as e:
+            raise CheckpointError(f"Could not read checkpoint file: {e}")
+
+    def _write_checkpoint(self, row, offset, complete=False):
+        if not self.checkpoint_file:
+            return
+        checkpoint = {'path': self._checkpoint_path(), 'row': row, 'offset': offset, 'complete': complete}
+        directory = os.path.dirname(os.path.abspath(self.checkpoint_file))
+        fd, temp_path = tempfile.mkstemp(dir=directory, prefix='.checkpoint-')
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            json.dump(checkpoint, f)
+        os.replace(temp_path, self.checkpoint_file)
+
+    def _position(self):
+        # The position in the (possibly compressed) file, if it is a regular
+        # file. This includes any data read ahead, but not yet imported.
+        return self._raw.tell() if self._size else None
+
+    def _report(self, elapsed, start_position):
+        if not self.progress:
+            return
+        rate = self.rows_read / elapsed if elapsed else 0
+        message = f"Row {self.row}: {self.rows_read} rows in {elapsed:.0f}s ({rate:.0f} rows/sec)"
+        position = self._position()
+        if position is not None and position > start_position:
+            remaining = (self._size - position) * elapsed / (position - start_position)
+            message += (
+                f", {position * 100 / self._size:.1f}% done, "
+                f"ETA {datetime.timedelta(seconds=round(remaining))}"
+            )
+        self.progress(message)
+
+
+class ImportErrors:
+    """
+    Writes import errors as they happen, to a CSV file of (row, message)
+    entries, or (if no file is given) using the "write" function.
+    """
+    def __init__(self, errors_file=None, write=None, append=False):
+        self.count = 0
+        self._write = write
+        self._file = None
+        if errors_file:
+            exists = append and os.path.exists(errors_file)
+            # Closed by "close" (or on leaving the "with" block)
+            self._file = open(errors_file, 'a' if append else 'w', newline='', encoding='utf-8')  # noqa: SIM115
+            self._writer = csv.writer(self._file)
+            if not exists:
+                self._writer.writerow(['row', 'message'])
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def close(self):
+        if self._file:
+            self._file.close()
+
+    def add(self, row, message):
+        self.count += 1
+        if self._file:
+            self._writer.writerow([row, message])
+            self._file.flush()
+        elif self._write:
+            self._write(f" - {row}: {message}")
@@ -0,0 +1,76 @@
+"""
+Opaque cursors for keyset ("seek") pagination of handles.
+
+Rather than using OFFSET, each page continues from the sort key of the last
+row of the previous page, so that every page is an index range scan, and
+deep pages cost the same as the first page.
+"""
+import base64
+import binascii
+import json
+
+from django.db.models import F
+from django.db.models.fields.tuple_lookups import Tuple, TupleGreaterThan
+from django.utils.dateparse import parse_datetime
+
+# The supported orderings, and their (unique) sort keys
+ORDERINGS = {
+    'handle': ('prefix', 'suffix'),
+    'modified': ('modified', 'id'),
+}
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+def encode_cursor(ordering, handle):
+    """
+    Returns an opaque cursor for continuing after the given handle.
+    """
+    if ordering == 'modified':
+        key = [handle.modified.isoformat(), handle.id]
+    else:
+        key = [handle.prefix, handle.suffix]
+    data = json.dumps({'o': ordering, 'k': key}, separators=(',', ':'))
+    return base64.urlsafe_b64encode(data.encode('utf-8')).decode('ascii').rstrip('=')
+
+
+def decode_cursor(ordering, cursor):
+    """
+    Returns the sort key encoded in the given cursor, raising InvalidCursor
+    if the cursor is malformed, or was created for a different ordering.
+    """
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        data = json.loads(base64.urlsafe_b64decode(padded.encode('ascii')))
+        cursor_ordering = data['o']
+        first, second = data['k']
+        second = int(second)
+        if ordering == 'modified':
+            first = parse_datetime(first)
+    except (binascii.Error, UnicodeError, ValueError, KeyError, TypeError) as e:
+        raise InvalidCursor('Invalid cursor') from e
+
+    if cursor_ordering != ordering:
+        raise InvalidCursor(f"Cursor is not valid for '{ordering}' ordering")
+    if first is None:
+        raise InvalidCursor('Invalid cursor')
+    return first, second
+
+
+def after_cursor(queryset, ordering, cursor):
+    """
+    Returns the queryset, ordered by the sort key for the given ordering, and
+    limited to rows after the given (encoded) cursor, if provided.
+    """
+    first_field, second_field = ORDERINGS[ordering]
+    queryset = queryset.order_by(first_field, second_field)
+    if not cursor:
+        return queryset
+
+    first, second = decode_cursor(ordering, cursor)
+    # A row value comparison, i.e. "(prefix, suffix) > (%s, %s)", which
+    # (unlike the equivalent "OR" of comparisons) PostgreSQL uses as the start
+    # of the index range scan. (On SQLite, Django uses the "OR" form.)
+    return queryset.filter(TupleGreaterThan(Tuple(F(first_field), F(second_field)), (first, second)))
@@ -0,0 +1,156 @@
+"""
+Handle.net batch files, for registering the handles with (or updating) the
+Handle.net server, using its batch tool.
+
+Each handle is a CREATE operation (with an HS_ADMIN value and a URL value),
+or, if it already existed at the time of the given change feed cursor (see
+"umd_handle.api.changes"), a MODIFY operation (of its URL value). Handles
+deleted since the cursor (according to the handle history) are DELETE
+operations. Operations are separated by blank lines.
+
+The operations are generated as the handles are streamed from the database,
+and written to one or more files (of a maximum number of operations each,
+so that they can be loaded in parallel) as they are generated, so memory use
+does not grow with the number of handles.
+"""
+from datetime import timedelta
+from pathlib import Path
+
+from django.conf import settings
+from django.db.models import Exists, OuterRef
+from django.utils import timezone
+
+from .cursors import after_cursor, decode_cursor, encode_cursor
+from .models import Handle, HandleHistory
+
+# The index of the URL value of each handle
+URL_INDEX = 1
+# The index of the HS_ADMIN value of each handle
+ADMIN_INDEX = 100
+# The permissions of each value: admin read and write, public read, no
+# public write
+PERMISSIONS = '1110'
+# The permissions in the HS_ADMIN value (all permissions)
+ADMIN_PERMISSIONS = '111111111111'
+
+
+def batch_operations(since=None):
+    """
+    Returns a (operations, cursor) tuple, of an iterator of the batch file
+    operations (as strings) for the handles changed (and deleted) after the
+    given change feed cursor (or every handle, if no cursor is given), and
+    the cursor to use for the next batch file.
+
+    As for the change feed, changes made in the last
+    CHANGE_FEED_SETTLE_SECONDS are left for the next batch file. Raises
+    InvalidCursor if the cursor is not valid.
+    """
+    settled = timezone.now() - timedelta(seconds=settings.CHANGE_FEED_SETTLE_SECONDS)
+    handles = after_cursor(Handle.objects.filter(modified__lt=settled), 'modified', since)
+
+    since_time = decode_cursor('modified', since)[0] if since else None
+    if since_time is not None and since_time >= settled:
+        # Nothing has settled since the cursor
+        return iter([]), since
+
+    # Every handle modified (and deleted) before the settled time is included,
+    # so the next batch file continues from that time
+    cursor = encode_cursor('modified', Handle(id=0, modified=settled))
+    return _operations(handles, since_time, settled), cursor
+
+
+def _operations(handles, since_time, settled):
+    rows = handles.values_list('prefix', 'suffix', 'url', 'created').iterator(
+        chunk_size=settings.CHANGE_FEED_CHUNK_SIZE
+    )
+    for prefix, suffix, url, created in rows:
+        if since_time is None or created > since_time:
+            yield create_operation(prefix, suffix, url)
+        else:
+            yield modify_operation(prefix, suffix, url)
+
+    if since_time is not None:
+        for prefix, suffix in deleted_handles(since_time, settled).iterator(
+            chunk_size=settings.CHANGE_FEED_CHUNK_SIZE
+        ):
+            yield delete_operation(prefix, suffix)
+
+
+def deleted_handles(after, before):
+    """
+    Returns the (prefix, suffix) of the handles deleted in the given period
+    (that have not since been created again), using the handle history.
+    """
+    existing = Handle.objects.filter(prefix=OuterRef('prefix'), suffix=OuterRef('suffix'))
+    return HandleHistory.objects.filter(
+        action=HandleHistory.ACTION_DELETE, created__gt=after, created__lt=before
+    ).filter(~Exists(existing)).order_by('created', 'id').values_list('prefix', 'suffix')
+
+
+def create_operation(prefix, suffix, url):
+    admin_index, admin_handle = settings.HANDLE_NET_ADMIN.format(prefix=prefix).split(':', 1)
+    return (
+        f"CREATE {prefix}/{suffix}\n"
+        f"{ADMIN_INDEX} HS_ADMIN {settings.HANDLE_NET_TTL} {PERMISSIONS} "
+        f"ADMIN {admin_index}:{ADMIN_PERMISSIONS}:{admin_handle}\n"
+        f"{_url_value(url)}\n"
+    )
+
+
+def modify_operation(prefix, suffix, url):
+    return f"MODIFY {prefix}/{suffix}\n{_url_value(url)}\n"
+
+
+def delete_operation(prefix, suffix):
+    return f"DELETE {prefix}/{suffix}\n"
+
+
+def _url_value(url):
+    # A value is a single line, so any line breaks (which are not valid in a
+    # URL) are removed
+    url = url.replace('\r', '').replace('\n', '').strip()
+    return f"{URL_INDEX} URL {settings.HANDLE_NET_TTL} {PERMISSIONS} UTF8 {url}"
+
+
+class BatchFileWriter:
+    """
+    Writes batch file operations to the given path, or, if "per_file" is
+    given, to numbered files (i.e., "batch-0001.txt", "batch-0002.txt", for
+    a path of "batch.txt") of at most "per_file" operations each.
+    """
+    def __init__(self, path, per_file=None):
+        self.path = Path(path)
+        self.per_file = per_file
+        self.paths = []
+        self.operations = 0
+        self._file = None
+        self._file_operations = 0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def write(self, operation):
+        if self._file is None or (self.per_file and self._file_operations >= self.per_file):
+            self._open_next()
+        # Operations are separated by a blank line
+        self._file.write(operation + '\n')
+        self._file_operations += 1
+        self.operations += 1
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def _open_next(self):
+        self.close()
+        path = self.path
+        if self.per_file:
+            path = path.with_name(f"{path.stem}-{len(self.paths) + 1:04d}{path.suffix}")
+        # Closed by "close" (or when the next file is opened)
+        self._file = open(path, 'w', encoding='utf-8', newline='\n')  # noqa: SIM115
+        self._file_operations = 0
+        self.paths.append(path)
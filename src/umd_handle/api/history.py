@@ -0,0 +1,231 @@
+"""
+Audit trail ("HandleHistory") of changes to handles.
+
+So that recording history does not add a database write to every request,
+entries are (by default) added to an in-process buffer once the change has
+been committed, and written in batches by a background thread, every
+HANDLE_HISTORY_FLUSH_SECONDS, or as soon as HANDLE_HISTORY_BATCH_SIZE entries
+are waiting.
+
+Any buffered entries are written when the process exits (see "atexit" below,
+and the SIGTERM handler in "umd_handle.server").
+"""
+import atexit
+import functools
+import logging
+import threading
+
+from django.conf import settings
+from django.db import close_old_connections, transaction
+
+from .models import HandleHistory, JWTToken
+
+logger = logging.getLogger(__name__)
+
+# The handle fields recorded in the history
+HISTORY_FIELDS = ['url', 'repo', 'repo_id', 'description', 'notes']
+
+
+def handle_values(handle):
+    """
+    Returns a dictionary of the recorded field values of the given handle.
+    """
+    return {field: getattr(handle, field) for field in HISTORY_FIELDS}
+
+
+def record_create(handle, actor):
+    """
+    Records the creation of the given handle.
+    """
+    _record(handle, HandleHistory.ACTION_CREATE, None, handle_values(handle), actor)
+
+
+def record_update(handle, before, actor):
+    """
+    Records an update of the given handle, where "before" is a dictionary of
+    field values before the update. Only the changed fields are recorded, and
+    nothing is recorded if no fields were changed.
+    """
+    after = handle_values(handle)
+    changed = [field for field in before if field in after and before[field] != after[field]]
+    if not changed:
+        return
+    _record(
+        handle,
+        HandleHistory.ACTION_UPDATE,
+        {field: before[field] for field in changed},
+        {field: after[field] for field in changed},
+        actor,
+    )
+
+
+def record_delete(handle, actor):
+    """
+    Records the deletion of the given handle.
+    """
+    _record(handle, HandleHistory.ACTION_DELETE, handle_values(handle), None, actor)
+
+
+def record_bulk_update(changes, actor, timestamp):
+    """
+    Records updates made by a bulk operation, where "changes" is a list of
+    (row, before, after) tuples, and each "row" is a dictionary with the
+    "id", "prefix" and "suffix" of a handle.
+
+    The entries are written immediately (as part of the bulk operation's
+    transaction), as the bulk operation already writes in batches.
+    """
+    HandleHistory.objects.bulk_create(
+        [
+            HandleHistory(
+                handle_id=row['id'],
+                prefix=row['prefix'],
+                suffix=row['suffix'],
+                action=HandleHistory.ACTION_UPDATE,
+                before=before,
+                after=after,
+                actor=actor,
+                created=timestamp,
+            )
+            for row, before, after in changes
+        ],
+        batch_size=settings.HANDLE_HISTORY_BATCH_SIZE,
+    )
+
+
+def _record(handle, action, before, after, actor):
+    entry = HandleHistory(
+        handle_id=handle.pk,
+        prefix=handle.prefix,
+        suffix=handle.suffix,
+        action=action,
+        before=before,
+        after=after,
+        actor=actor,
+    )
+    if settings.HANDLE_HISTORY_ASYNC:
+        # Only buffer the entry if the change is committed
+        transaction.on_commit(lambda: writer.add(entry))
+    else:
+        entry.save()
+
+
+def request_actor(request):
+    """
+    Returns a description of who made the request: the username of a (SAML)
+    logged-in user, or the description of the JWT token used for a REST API
+    request.
+    """
+    user = getattr(request, 'user', None)
+    if user is not None and user.is_authenticated:
+        return user.get_username()
+
+    token = getattr(request, 'jwt_token', None)
+    if token:
+        return jwt_token_description(token)
+    return ''
+
+
+@functools.lru_cache(maxsize=256)
+def jwt_token_description(token):
+    """
+    Returns the description of the given JWT token, from the JWTToken table.
+    Cached, as tokens are long-lived, and the description does not change.
+    """
+    description = JWTToken.objects.filter(token=token).values_list('description', flat=True).first()
+    return description or 'Unregistered JWT token'
+
+
+class HistoryWriter:
+    """
+    Buffers history entries, and writes them to the database in batches from
+    a background thread.
+    """
+    def __init__(self):
+        self._entries = []
+        self._lock = threading.Lock()
+        # Serializes writes, so that entries are written in order
+        self._flush_lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._thread = None
+
+    def add(self, entry):
+        """
+        Adds an entry to the buffer, starting the background thread if it is
+        not already running.
+        """
+        with self._lock:
+            self._entries.append(entry)
+            pending = len(self._entries)
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name='handle-history-writer', daemon=True)
+                self._thread.start()
+
+        if pending >= settings.HANDLE_HISTORY_MAX_PENDING:
+            # The background thread is falling behind (or the database is
+            # unavailable), so write the entries in this thread. As the change
+            # has already been committed, a failed write is only logged (and
+            # the entries are kept in the buffer, for the next write).
+            try:
+                self.flush()
+            except Exception:
+                logger.exception(f"Unable to write {self.pending()} handle history entries, will retry")
+        elif pending >= settings.HANDLE_HISTORY_BATCH_SIZE:
+            self._wakeup.set()
+
+    def pending(self):
+        """
+        Returns the number of entries that have not yet been written.
+        """
+        with self._lock:
+            return len(self._entries)
+
+    def flush(self):
+        """
+        Writes all the buffered entries to the database, returning the number
+        of entries written. If the write fails, the entries are returned to
+        the buffer, and the exception is raised.
+        """
+        with self._flush_lock:
+            with self._lock:
+                entries, self._entries = self._entries, []
+            if not entries:
+                return 0
+
+            try:
+                with transaction.atomic():
+                    HandleHistory.objects.bulk_create(entries, batch_size=settings.HANDLE_HISTORY_BATCH_SIZE)
+            except Exception:
+                with self._lock:
+                    self._entries[:0] = entries
+                raise
+            return len(entries)
+
+    def _run(self):
+        while True:
+            self._wakeup.wait(settings.HANDLE_HISTORY_FLUSH_SECONDS)
+            self._wakeup.clear()
+            try:
+                self.flush()
+            except Exception:
+                logger.exception('Unable to write handle history entries, will retry')
+            finally:
+                close_old_connections()
+
+
+writer = HistoryWriter()
+
+
+def flush():
+    """
+    Writes any buffered history entries to the database.
+    """
+    try:
+        return writer.flush()
+    except Exception:
+        logger.exception(f"Unable to write {writer.pending()} handle history entries")
+        return 0
+
+
+# Write any buffered entries when the process exits
+atexit.register(flush)
@@ -0,0 +1,192 @@
+"""
+Counting of handle resolutions ("hits"), to find which handles are used.
+
+So that counting does not add a database write to every resolution, hits are
+(by default) counted in memory, and added to the HandleStats table in
+batches by a background thread, every HANDLE_STATS_FLUSH_SECONDS. Each batch
+has one row for each handle hit since the last batch, however many times it
+was hit, and is written by multi-row "INSERT ... ON CONFLICT DO UPDATE SET
+hits = hits + <count>" statements, of up to MAX_CHUNK_SIZE rows each.
+
+The in-memory counts are split into HANDLE_STATS_STRIPES dictionaries, each
+with its own lock (chosen by the handle id), so that concurrent resolutions
+rarely wait for each other.
+
+Any counted hits are written when the process exits (see "atexit" below,
+and the SIGTERM handler in "umd_handle.server").
+"""
+import atexit
+import logging
+import threading
+import time
+
+from django.conf import settings
+from django.db import close_old_connections, connection, transaction
+from django.utils import timezone
+
+from .models import Handle, HandleStats
+
+logger = logging.getLogger(__name__)
+
+# The maximum number of handles written by each statement
+MAX_CHUNK_SIZE = 1000
+
+
+class HitCounter:
+    """
+    Counts hits (and the time of the last hit) of each handle in memory,
+    and writes the counts to the database in batches from a background
+    thread.
+    """
+    def __init__(self, stripes=16):
+        self._stripes = [({}, threading.Lock()) for _ in range(stripes)]
+        # Serializes writes, so that counts returned to the stripes after a
+        # failed write are not written twice
+        self._flush_lock = threading.Lock()
+        self._thread_lock = threading.Lock()
+        self._thread = None
+
+    def add(self, handle_id, timestamp):
+        """
+        Counts a hit of the given handle, at the given time.
+        """
+        counts, lock = self._stripes[handle_id % len(self._stripes)]
+        with lock:
+            hits, _ = counts.get(handle_id, (0, None))
+            counts[handle_id] = (hits + 1, timestamp)
+
+    def start(self):
+        """
+        Starts the background thread, if it is not already running.
+        """
+        if self._thread is not None and self._thread.is_alive():
+            return
+        with self._thread_lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name='handle-hit-counter', daemon=True)
+                self._thread.start()
+
+    def pending(self):
+        """
+        Returns the number of handles with hits that have not been written.
+        """
+        total = 0
+        for counts, lock in self._stripes:
+            with lock:
+                total += len(counts)
+        return total
+
+    def flush(self):
+        """
+        Writes the counted hits to the database, returning the number of
+        handles updated. If the write fails, the hits are counted again, and
+        the exception is raised.
+        """
+        with self._flush_lock:
+            batch = []
+            for counts, lock in self._stripes:
+                with lock:
+                    batch.extend(counts.items())
+                    counts.clear()
+            if not batch:
+                return 0
+
+            try:
+                write_hits(batch)
+            except Exception:
+                self._restore(batch)
+                raise
+            return len(batch)
+
+    def _restore(self, batch):
+        for handle_id, (hits, timestamp) in batch:
+            counts, lock = self._stripes[handle_id % len(self._stripes)]
+            with lock:
+                newer_hits, newer_timestamp = counts.get(handle_id, (0, timestamp))
+                counts[handle_id] = (hits + newer_hits, max(timestamp, newer_timestamp))
+
+    def _run(self):
+        while True:
+            time.sleep(settings.HANDLE_STATS_FLUSH_SECONDS)
+            try:
+                self.flush()
+            except Exception:
+                logger.exception('Unable to write handle hit counts, will retry')
+            finally:
+                close_old_connections()
+
+
+def write_hits(batch):
+    """
+    Adds the given (handle id, (hits, last accessed)) counts to the
+    HandleStats table, using one multi-row statement for each chunk of
+    handles. Counts for handles that have since been deleted are ignored.
+    """
+    quote_name = connection.ops.quote_name
+    stats_table = quote_name(HandleStats._meta.db_table)
+    handle_table = quote_name(Handle._meta.db_table)
+    fields = [HandleStats._meta.get_field(name) for name in ['handle', 'hits', 'last_accessed']]
+    handle_id, hits, last_accessed = (quote_name(field.column) for field in fields)
+    pk = quote_name(Handle._meta.pk.column)
+    greatest = 'GREATEST' if connection.vendor == 'postgresql' else 'MAX'
+    chunk_size = min(MAX_CHUNK_SIZE, connection.ops.bulk_batch_size(fields, batch))
+
+    # Sorted, so that concurrent writes (from other processes) lock the rows
+    # in the same order
+    rows = [
+        (key, count, fields[2].get_db_prep_value(timestamp, connection))
+        for key, (count, timestamp) in sorted(batch)
+    ]
+    with transaction.atomic(), connection.cursor() as cursor:
+        for start in range(0, len(rows), chunk_size):
+            chunk = rows[start:start + chunk_size]
+            # The VALUES columns are named "column1", "column2", ... (in both
+            # PostgreSQL and SQLite). The join drops the counts of deleted
+            # handles. ("WHERE true" is needed by SQLite, to tell the
+            # "ON CONFLICT" clause from a join constraint.) Unlike GREATEST,
+            # SQLite's MAX returns NULL if any argument is NULL, so a NULL
+            # "last accessed" time is replaced using COALESCE.
+            sql = (
+                f"INSERT INTO {stats_table} ({handle_id}, {hits}, {last_accessed}) "
+                f"SELECT v.column1, v.column2, v.column3 "
+                f"FROM (VALUES {', '.join(['(%s, %s, %s)'] * len(chunk))}) AS v "
+                f"JOIN {handle_table} ON {handle_table}.{pk} = v.column1 "
+                f"WHERE true ORDER BY v.column1 "
+                f"ON CONFLICT ({handle_id}) DO UPDATE SET "
+                f"{hits} = {stats_table}.{hits} + EXCLUDED.{hits}, "
+                f"{last_accessed} = {greatest}("
+                f"COALESCE({stats_table}.{last_accessed}, EXCLUDED.{last_accessed}), EXCLUDED.{last_accessed})"
+            )
+            cursor.execute(sql, [value for row in chunk for value in row])
+
+
+counter = HitCounter(stripes=settings.HANDLE_STATS_STRIPES)
+
+
+def record_hit(handle):
+    """
+    Counts a resolution of the given handle, writing it immediately if
+    HANDLE_STATS_ASYNC is False.
+    """
+    if not settings.HANDLE_STATS_ENABLED:
+        return
+    if settings.HANDLE_STATS_ASYNC:
+        counter.add(handle.pk, timezone.now())
+        counter.start()
+    else:
+        write_hits([(handle.pk, (1, timezone.now()))])
+
+
+def flush():
+    """
+    Writes any counted hits to the database.
+    """
+    try:
+        return counter.flush()
+    except Exception:
+        logger.exception(f"Unable to write hit counts of {counter.pending()} handles")
+        return 0
+
+
+# Write any counted hits when the process exits
+atexit.register(flush)
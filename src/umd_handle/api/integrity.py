@@ -0,0 +1,189 @@
+"""
+Integrity checks of the Handle table, for problems that the CSV import (which
+bypasses the mint path) may have introduced.
+
+The checks are:
+
+* "invalid_url", "invalid_prefix", "invalid_repo", "invalid_suffix" - field
+  values that fail validation (or have surrounding whitespace), found by streaming the table once (using a
+  server-side cursor on PostgreSQL), so memory use does not grow with the
+  size of the table
+* "duplicate_repo_item" - handles for the same (prefix, repo, repo_id)
+* "duplicate_suffix" - handles with the same prefix/suffix (which the unique
+  constraint should prevent)
+* "suffix_gap" - ranges of unused suffixes (from 1) below the largest suffix
+  of a prefix
+
+The duplicate and gap checks are single set-based queries, which are also
+streamed.
+
+Only field values that are valid once whitespace (and, for the repo, case) is
+normalized can be fixed (and a prefix only if that does not duplicate the
+prefix/suffix of another handle). Duplicates and gaps are only reported, as handles
+are persistent identifiers, which cannot be deleted or renumbered.
+"""
+import itertools
+from collections import namedtuple
+
+from django.core.exceptions import ValidationError
+from django.db import transaction
+from django.db.models import Exists, F, OuterRef, Window
+from django.db.models.functions import Lag
+from django.utils import timezone
+
+from .history import record_bulk_update
+from .models import Handle, validate_prefix, validate_repo, validate_url
+
+DEFAULT_CHUNK_SIZE = 2000
+
+# Columns of the CSV report
+REPORT_CSV_HEADER = ['check', 'handle', 'detail', 'fixed']
+
+CHECKS = [
+    'invalid_url',
+    'invalid_prefix',
+    'invalid_repo',
+    'invalid_suffix',
+    'duplicate_repo_item',
+    'duplicate_suffix',
+    'suffix_gap',
+]
+
+# "check" - the name of the check (see CHECKS)
+# "handle" - the handle (or, for a gap, the range of suffixes)
+# "detail" - a description of the problem
+# "fixed" - whether the problem was fixed (or would be fixed, for a dry run)
+Problem = namedtuple('Problem', ['check', 'handle', 'detail', 'fixed'])
+
+# The field checks, as (check, field, validator, normalize) tuples
+FIELD_CHECKS = [
+    ('invalid_url', 'url', validate_url, str.strip),
+    ('invalid_prefix', 'prefix', validate_prefix, str.strip),
+    ('invalid_repo', 'repo', validate_repo, lambda value: value.strip().lower()),
+]
+
+
+def check_handles(checks=CHECKS, fix=False, dry_run=False, chunk_size=DEFAULT_CHUNK_SIZE, actor=''):
+    """
+    Runs the given checks, yielding a Problem for each problem found.
+
+    With "fix", fixable field values are updated (unless "dry_run" is also
+    given), in transactions of "chunk_size" handles, and recorded in the
+    handle history.
+    """
+    field_checks = [field_check for field_check in FIELD_CHECKS if field_check[0] in checks]
+    if field_checks or 'invalid_suffix' in checks:
+        yield from _check_fields(field_checks, 'invalid_suffix' in checks, fix, dry_run, chunk_size, actor)
+    if 'duplicate_repo_item' in checks:
+        yield from _check_duplicates(['prefix', 'repo', 'repo_id'], 'duplicate_repo_item', chunk_size)
+    if 'duplicate_suffix' in checks:
+        yield from _check_duplicates(['prefix', 'suffix'], 'duplicate_suffix', chunk_size)
+    if 'suffix_gap' in checks:
+        yield from _check_gaps(chunk_size)
+
+
+def _check_fields(field_checks, check_suffix, fix, dry_run, chunk_size, actor):
+    fields = ['id', 'prefix', 'suffix'] + [field for _, field, _, _ in field_checks if field != 'prefix']
+    rows = Handle.objects.order_by().values(*fields).iterator(chunk_size=chunk_size)
+
+    fixes = []
+    # The prefix/suffix of the handles with a fixed prefix, so that two
+    # handles are not fixed to the same prefix/suffix
+    fixed_handles = set()
+    for row in rows:
+        handle = f"{row['prefix']}/{row['suffix']}"
+        if check_suffix and row['suffix'] <= 0:
+            yield Problem('invalid_suffix', handle, f"Suffix {row['suffix']} is not a positive integer", False)
+
+        after = {}
+        for check, field, validator, normalize in field_checks:
+            value = row[field]
+            fixed_value = normalize(value)
+            try:
+                validator(value)
+                if fixed_value == value:
+                    continue
+                # i.e., a URL with surrounding whitespace, which is accepted
+                # by "urlparse"
+                message = f"{value!r} has surrounding whitespace"
+            except ValidationError as e:
+                message = ' '.join(e.messages)
+
+            try:
+                validator(fixed_value)
+                fixable = fix
+            except ValidationError:
+                fixable = False
+            if fixable and field == 'prefix':
+                # Fixing the prefix must not duplicate another handle
+                fixed_handle = (fixed_value, row['suffix'])
+                exists = Handle.objects.filter(prefix=fixed_value, suffix=row['suffix']).exists()
+                if exists or fixed_handle in fixed_handles:
+                    message += f" (not fixed, as {fixed_value}/{row['suffix']} already exists)"
+                    fixable = False
+                else:
+                    fixed_handles.add(fixed_handle)
+            if fixable:
+                after[field] = fixed_value
+            yield Problem(check, handle, message, fixable)
+
+        if after:
+            fixes.append((row, {field: row[field] for field in after}, after))
+            if len(fixes) >= chunk_size:
+                if not dry_run:
+                    _apply_fixes(fixes, actor)
+                fixes = []
+
+    if fixes and not dry_run:
+        _apply_fixes(fixes, actor)
+
+
+def _apply_fixes(fixes, actor):
+    now = timezone.now()
+    with transaction.atomic():
+        # Handles with the same fixed fields are updated together
+        def fixed_fields(change):
+            return sorted(change[2])
+
+        for fields, changes in itertools.groupby(sorted(fixes, key=fixed_fields), key=fixed_fields):
+            Handle.objects.bulk_update(
+                [Handle(id=row['id'], modified=now, **after) for row, _, after in changes],
+                fields + ['modified'],
+            )
+        record_bulk_update(fixes, actor, now)
+
+
+def _check_duplicates(fields, check, chunk_size):
+    """
+    Yields a Problem for each handle that has the same values of the given
+    fields as another handle, using a single (semi-join) query.
+    """
+    others = Handle.objects.filter(**{field: OuterRef(field) for field in fields}).exclude(pk=OuterRef('pk'))
+    columns = dict.fromkeys(['id', 'prefix', 'suffix', *fields])
+    duplicates = Handle.objects.filter(Exists(others)).order_by(*fields, 'id').values(*columns)
+
+    rows = duplicates.iterator(chunk_size=chunk_size)
+    for key, group in itertools.groupby(rows, key=lambda row: tuple(row[field] for field in fields)):
+        # Only the first (oldest) handle of each group is kept in memory
+        first = next(group)
+        original = f"{first['prefix']}/{first['suffix']}"
+        description = ', '.join(f"{field}={value}" for field, value in zip(fields, key))
+        for row in group:  # noqa: B031
+            yield Problem(
+                check, f"{row['prefix']}/{row['suffix']}", f"Same {description} as {original}", False
+            )
+
+
+def _check_gaps(chunk_size):
+    """
+    Yields a Problem for each range of unused suffixes, using a single query
+    comparing each suffix with the previous suffix of the prefix (or 0).
+    """
+    previous = Window(Lag('suffix', default=0), partition_by=[F('prefix')], order_by=F('suffix').asc())
+    gaps = Handle.objects.annotate(previous=previous).filter(suffix__gt=F('previous') + 1) \
+        .order_by('prefix', 'suffix').values_list('prefix', 'previous', 'suffix')
+
+    for prefix, previous, suffix in gaps.iterator(chunk_size=chunk_size):
+        first, last = previous + 1, suffix - 1
+        suffixes = str(first) if first == last else f"{first}-{last}"
+        yield Problem('suffix_gap', f"{prefix}/{suffixes}", f"{last - first + 1} unused suffix(es)", False)
@@ -0,0 +1,223 @@
+"""
+Checking the target URLs of handles, to find handles with URLs that no
+longer exist.
+
+The URLs are checked concurrently, by an asyncio event loop running in a
+background thread, while the handles are read (and the results saved) by the
+calling thread, as the Django ORM is synchronous. Only as many handles as are
+being checked are read ahead, so memory use does not grow with the number of
+handles.
+
+Each URL (after applying the URL rewrite rules, as when the handle is
+resolved) is checked with a HEAD request, or a GET request if the server
+does not allow HEAD requests. Redirects are recorded, not followed.
+
+The requests are made using the "aiohttp" package (installed via the
+"linkcheck" extra), whose connection pool limits the number of concurrent
+requests (to each host, and in total), and reuses connections. Proxies are
+used as given by the HTTP_PROXY, HTTPS_PROXY, and NO_PROXY environment
+variables.
+"""
+import asyncio
+import datetime
+import queue
+import threading
+from collections import namedtuple
+from urllib.parse import urljoin, urlsplit
+
+from django.db.models import Exists, OuterRef
+from django.utils import timezone
+
+from .models import Handle, HandleLinkCheck
+from .rewrite_rules import rewrite_url
+
+try:
+    import aiohttp
+except ImportError:
+    # The "linkcheck" extra is not installed
+    aiohttp = None
+
+DEFAULT_CONCURRENCY = 50
+DEFAULT_PER_HOST = 4
+DEFAULT_TIMEOUT = 10.0
+DEFAULT_BATCH_SIZE = 500
+
+USER_AGENT = 'umd-handle-link-checker'
+
+# "status" - the HTTP status of the response, or None if there was no
+#            response
+# "location" - the (absolute) "Location" of a redirect response, or ""
+# "error" - the reason there was no response, or ""
+LinkCheckResult = namedtuple('LinkCheckResult', ['status', 'location', 'error'])
+
+
+class LinkCheckError(Exception):
+    pass
+
+
+class LinkChecker:
+    """
+    Checks URLs, making at most "concurrency" concurrent requests, and at
+    most "per_host" concurrent requests to each host (scheme, host, and
+    port). A request times out if connecting, or waiting for the response,
+    takes longer than "timeout" seconds.
+
+    Must only be used by the tasks of one event loop, and must be opened (in
+    that loop) before it is used.
+    """
+    def __init__(self, concurrency=DEFAULT_CONCURRENCY, per_host=DEFAULT_PER_HOST, timeout=DEFAULT_TIMEOUT):
+        if aiohttp is None:
+            raise LinkCheckError('Link checks require the "aiohttp" package (the "linkcheck" extra)')
+        self.concurrency = concurrency
+        self.per_host = per_host
+        self.timeout = timeout
+        self._session = None
+
+    async def open(self):
+        """
+        Creates the session, and its connection pool.
+        """
+        self._session = aiohttp.ClientSession(
+            connector=aiohttp.TCPConnector(limit=self.concurrency, limit_per_host=self.per_host),
+            # Time spent waiting for a pooled connection is not limited, as
+            # requests queue for the per-host limit
+            timeout=aiohttp.ClientTimeout(total=None, sock_connect=self.timeout, sock_read=self.timeout),
+            headers={'User-Agent': USER_AGENT},
+            trust_env=True,
+        )
+
+    async def check(self, url):
+        """
+        Checks the given URL, returning a LinkCheckResult.
+        """
+        url = url.strip()
+        parts = urlsplit(url)
+        if parts.scheme not in ('http', 'https') or not parts.hostname:
+            return LinkCheckResult(None, '', 'Invalid URL: Not an HTTP URL')
+
+        try:
+            status, location = await self._request('HEAD', url)
+            if status in (405, 501):
+                status, location = await self._request('GET', url)
+        except TimeoutError:
+            return LinkCheckResult(None, '', f"Timed out after {self.timeout:g}s")
+        except (aiohttp.InvalidURL, ValueError) as e:
+            return LinkCheckResult(None, '', f"Invalid URL: {e}")
+        except (aiohttp.ClientError, OSError) as e:
+            return LinkCheckResult(None, '', str(e) or e.__class__.__name__)
+
+        return LinkCheckResult(status, urljoin(url, location) if location else '', '')
+
+    async def close(self):
+        """
+        Closes the session, and its connections.
+        """
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
+
+    async def _request(self, method, url):
+        # The response body (of a GET request) is not read, so that
+        # connection is closed, rather than reused
+        async with self._session.request(method, url, allow_redirects=False) as response:
+            location = response.headers.get('Location', '') if 300 <= response.status < 400 else ''
+            return response.status, location
+
+
+def check_urls(rows, concurrency=DEFAULT_CONCURRENCY, **options):
+    """
+    Checks the URL of each (key, url) row, yielding (key, url,
+    LinkCheckResult) tuples, in the order the checks finish. At most
+    "concurrency" URLs are checked at a time, and rows are only read as
+    checks finish.
+
+    The other options are passed to the LinkChecker.
+    """
+    checker = LinkChecker(concurrency=concurrency, **options)
+    loop = asyncio.new_event_loop()
+    thread = threading.Thread(target=loop.run_forever, name='link-checker', daemon=True)
+    thread.start()
+
+    finished = queue.Queue()
+    pending = set()
+
+    def next_result():
+        key, url, future = finished.get()
+        pending.discard(future)
+        return key, url, future.result()
+
+    try:
+        asyncio.run_coroutine_threadsafe(checker.open(), loop).result()
+        for key, url in rows:
+            if len(pending) >= concurrency:
+                yield next_result()
+            future = asyncio.run_coroutine_threadsafe(checker.check(url), loop)
+            pending.add(future)
+            future.add_done_callback(lambda future, key=key, url=url: finished.put((key, url, future)))
+        while pending:
+            yield next_result()
+    finally:
+        for future in pending:
+            future.cancel()
+        asyncio.run_coroutine_threadsafe(checker.close(), loop).result()
+        loop.call_soon_threadsafe(loop.stop)
+        thread.join()
+        loop.close()
+
+
+def handles_to_check(queryset=None, recheck_seconds=0):
+    """
+    Returns the handles (from the given queryset, or all the handles) that
+    have not been checked in the last "recheck_seconds".
+    """
+    if queryset is None:
+        queryset = Handle.objects.all()
+    if recheck_seconds:
+        cutoff = timezone.now() - datetime.timedelta(seconds=recheck_seconds)
+        recent = HandleLinkCheck.objects.filter(handle=OuterRef('pk'), checked__gte=cutoff)
+        queryset = queryset.filter(~Exists(recent))
+    return queryset.order_by('id')
+
+
+def check_links(handles, batch_size=DEFAULT_BATCH_SIZE, **options):
+    """
+    Checks the URLs of the given handles (see "handles_to_check"), saving the
+    results in batches, and yielding each saved HandleLinkCheck.
+
+    The other options are passed to "check_urls".
+    """
+    rows = (
+        (Handle(id=row['id'], prefix=row['prefix'], suffix=row['suffix']), rewrite_url(row['url'], row['repo']))
+        for row in handles.values('id', 'prefix', 'suffix', 'url', 'repo').iterator(chunk_size=batch_size)
+    )
+
+    batch = []
+    for handle, url, result in check_urls(rows, **options):
+        batch.append(HandleLinkCheck(
+            handle=handle, url=url, status=result.status, location=result.location, error=result.error,
+            checked=timezone.now(),
+        ))
+        if len(batch) >= batch_size:
+            yield from save_link_checks(batch)
+            batch = []
+    if batch:
+        yield from save_link_checks(batch)
+
+
+def save_link_checks(link_checks):
+    """
+    Saves the given HandleLinkChecks (replacing the previous check of each
+    handle), returning the saved checks. Checks of handles deleted since they
+    were read are not saved.
+    """
+    existing = set(
+        Handle.objects.filter(id__in=[check.handle_id for check in link_checks]).values_list('id', flat=True)
+    )
+    link_checks = [check for check in link_checks if check.handle_id in existing]
+    HandleLinkCheck.objects.bulk_create(
+        link_checks,
+        update_conflicts=True,
+        unique_fields=['handle'],
+        update_fields=['url', 'status', 'location', 'error', 'checked'],
+    )
+    return link_checks
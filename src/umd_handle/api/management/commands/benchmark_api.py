@@ -0,0 +1,320 @@
+import http.client
+import json
+import platform
+import random
+import statistics
+import subprocess
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import UTC, datetime
+from urllib.parse import urlencode
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from urlobject import URLObject
+
+from umd_handle.api.models import Handle, HandleHistory, JWTToken, next_suffix
+from umd_handle.api.synthetic import bulk_insert, generate_handles
+from umd_handle.api.tokens import create_jwt_token
+
+OPERATIONS = ['resolve', 'exists', 'info', 'patch', 'mint']
+
+BENCHMARK_TOKEN_DESCRIPTION = 'benchmark_api token'
+
+# The number of handles inserted (or removed) by each query
+BATCH_SIZE = 1000
+
+
+class Command(BaseCommand):
+    help = (
+        "Runs a load test against the REST API, reporting latency percentiles "
+        "and throughput for each operation."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--base-url',
+            help='Base URL of a running server. If not given, a local server is started using the current settings.'
+        )
+        parser.add_argument(
+            '--listen', default='127.0.0.1:3100',
+            help='Address and port for the local server (default: 127.0.0.1:3100)'
+        )
+        parser.add_argument(
+            '--host-header',
+            help='"Host" header to send, so that the request passes ALLOWED_HOSTS (default: the BASE_URL hostname)'
+        )
+        parser.add_argument('--handles', type=int, default=1000, help='Number of synthetic handles to create (default: 1000)')
+        parser.add_argument('--requests', type=int, default=1000, help='Number of requests per operation (default: 1000)')
+        parser.add_argument('--concurrency', type=int, default=8, help='Number of concurrent clients (default: 8)')
+        parser.add_argument(
+            '--operations', default=','.join(OPERATIONS),
+            help=f"Comma-separated list of operations to run (default: {','.join(OPERATIONS)})"
+        )
+        parser.add_argument('--seed', type=int, default=42, help='Random seed, for reproducible runs (default: 42)')
+        parser.add_argument('--output', help='Path of a JSON file to write the results to')
+        parser.add_argument('--compare', help='Path of a JSON results file from a previous run to compare against')
+        parser.add_argument('--keep-data', action='store_true', help='Do not remove the synthetic handles afterwards')
+
+    def handle(self, *args, **options):
+        operations = [op.strip() for op in options['operations'].split(',') if op.strip()]
+        unknown = set(operations) - set(OPERATIONS)
+        if unknown:
+            raise CommandError(f"Unknown operations: {', '.join(sorted(unknown))}")
+        if options['handles'] < 1 or options['requests'] < 1 or options['concurrency'] < 1:
+            raise CommandError("--handles, --requests and --concurrency must be positive")
+
+        rng = random.Random(options['seed'])
+        host_header = options['host_header'] or settings.BASE_URL.hostname
+
+        # The suffixes of the handles created (and minted) by the benchmark,
+        # which are the only handles removed afterwards
+        self.suffixes = []
+        self.started = datetime.now(UTC)
+        server = None
+        try:
+            handles = self.create_dataset(options['handles'], options['seed'])
+            token = create_jwt_token(BENCHMARK_TOKEN_DESCRIPTION)
+
+            if options['base_url']:
+                base_url = URLObject(options['base_url'])
+            else:
+                base_url = URLObject(f"http://{options['listen']}")
+                server = self.start_server(options['listen'], base_url, host_header)
+
+            client = BenchmarkClient(base_url, host_header, token)
+            results = {
+                'meta': {
+                    'timestamp': datetime.now(UTC).isoformat(),
+                    'base_url': str(base_url),
+                    'database': connection.vendor,
+                    'python': platform.python_version(),
+                    'handles': options['handles'],
+                    'requests': options['requests'],
+                    'concurrency': options['concurrency'],
+                    'seed': options['seed'],
+                },
+                'operations': {},
+            }
+            for operation in operations:
+                requests = build_requests(operation, handles, options['requests'], rng)
+                minted = self.suffixes if operation == 'mint' else None
+                results['operations'][operation] = run_operation(
+                    client, requests, options['concurrency'], minted=minted
+                )
+                self.report(operation, results['operations'][operation])
+        finally:
+            if server:
+                server.terminate()
+                server.wait()
+            if not options['keep_data']:
+                self.remove_dataset()
+
+        if options['output']:
+            with open(options['output'], 'w', encoding='utf-8') as f:
+                json.dump(results, f, indent=2)
+            self.stdout.write(self.style.SUCCESS(f"Results written to {options['output']}"))
+
+        if options['compare']:
+            self.compare(options['compare'], results)
+
+    def create_dataset(self, count, seed):
+        """
+        Creates "count" synthetic handles, returning a list of
+        (prefix, suffix, repo, repo_id) tuples.
+        """
+        prefix = Handle.ALLOWED_PREFIXES[0]
+        handles = list(generate_handles(count, seed=seed, prefix=prefix, first_suffix=next_suffix(prefix)))
+        # All or none of the handles are inserted, so the suffixes are only
+        # recorded (for removal) once they are
+        bulk_insert(handles, batch_size=BATCH_SIZE)
+        self.suffixes.extend(h.suffix for h in handles)
+        self.stdout.write(f"Created {count} synthetic handles")
+        return [(h.prefix, h.suffix, h.repo, h.repo_id) for h in handles]
+
+    def remove_dataset(self):
+        """
+        Removes the synthetic handles and the handles minted by the benchmark
+        (and only those, as other clients may be using the same database),
+        along with their history since the benchmark started.
+        """
+        prefix = Handle.ALLOWED_PREFIXES[0]
+        deleted = 0
+        for i in range(0, len(self.suffixes), BATCH_SIZE):
+            suffixes = self.suffixes[i:i + BATCH_SIZE]
+            deleted += Handle.objects.filter(prefix=prefix, suffix__in=suffixes).delete()[0]
+            HandleHistory.objects.filter(prefix=prefix, suffix__in=suffixes, created__gte=self.started).delete()
+        self.suffixes = []
+        JWTToken.objects.filter(description=BENCHMARK_TOKEN_DESCRIPTION).delete()
+        self.stdout.write(f"Removed {deleted} synthetic handles")
+
+    def start_server(self, listen, base_url, host_header):
+        """
+        Starts the application server in a subprocess, and waits for the
+        health check endpoint to respond.
+        """
+        server = subprocess.Popen(
+            [sys.executable, '-c', 'from umd_handle.server import run; run()', '--listen', listen]
+        )
+        deadline = time.monotonic() + 30
+        while time.monotonic() < deadline:
+            if server.poll() is not None:
+                raise CommandError(f"Server exited with status {server.returncode}")
+            try:
+                conn = http.client.HTTPConnection(base_url.hostname, base_url.port, timeout=1)
+                conn.request('GET', '/health-check/', headers={'Host': host_header})
+                if conn.getresponse().status == 200:
+                    return server
+            except OSError:
+                pass
+            time.sleep(0.2)
+        server.terminate()
+        raise CommandError(f"Server did not start listening on {listen}")
+
+    def report(self, operation, result):
+        latency = result['latency_ms']
+        self.stdout.write(
+            f"{operation:8} requests={result['requests']} errors={result['errors']} "
+            f"throughput={result['throughput_rps']:.1f}/s "
+            f"p50={latency['p50']:.2f}ms p95={latency['p95']:.2f}ms p99={latency['p99']:.2f}ms"
+        )
+
+    def compare(self, path, results):
+        """
+        Prints the relative change of throughput and latency percentiles from
+        a previous results file.
+        """
+        try:
+            with open(path, encoding='utf-8') as f:
+                previous = json.load(f)
+        except (OSError, ValueError) as e:
+            raise CommandError(f"Could not read comparison file: {e}")
+
+        self.stdout.write(f"Comparison with {path} ({previous['meta']['timestamp']}):")
+        for operation, result in results['operations'].items():
+            before = previous['operations'].get(operation)
+            if not before:
+                continue
+            changes = [f"throughput {percent_change(before['throughput_rps'], result['throughput_rps'])}"]
+            for percentile in ('p50', 'p95', 'p99'):
+                changes.append(
+                    f"{percentile} {percent_change(before['latency_ms'][percentile], result['latency_ms'][percentile])}"
+                )
+            self.stdout.write(f"{operation:8} {' '.join(changes)}")
+
+
+class BenchmarkClient:
+    """
+    HTTP client that keeps one persistent connection per thread.
+    """
+
+    def __init__(self, base_url, host_header, token):
+        self.base_url = base_url
+        self.headers = {
+            'Host': host_header,
+            'Authorization': f"Bearer {token}",
+            'Content-Type': 'application/json',
+        }
+        self.local = threading.local()
+
+    def request(self, method, path, body=None):
+        """
+        Sends a request, returning the HTTP status (or None on a connection
+        error) and the response body.
+        """
+        conn = getattr(self.local, 'conn', None)
+        if conn is None:
+            conn = http.client.HTTPConnection(self.base_url.hostname, self.base_url.port, timeout=30)
+            self.local.conn = conn
+        try:
+            conn.request(method, path, body=body, headers=self.headers)
+            response = conn.getresponse()
+            return response.status, response.read()
+        except (OSError, http.client.HTTPException):
+            conn.close()
+            self.local.conn = None
+            return None, b''
+
+
+def build_requests(operation, handles, count, rng):
+    """
+    Returns a list of (method, path, body) tuples for the given operation.
+    """
+    requests = []
+    for i in range(count):
+        prefix, suffix, repo, repo_id = rng.choice(handles)
+        if operation == 'resolve':
+            requests.append(('GET', f"/api/v1/handles/{prefix}/{suffix}", None))
+        elif operation == 'exists':
+            requests.append(('GET', f"/api/v1/handles/exists?{urlencode({'repo': repo, 'repo_id': repo_id})}", None))
+        elif operation == 'info':
+            requests.append(('GET', f"/api/v1/handles/info?{urlencode({'prefix': prefix, 'suffix': suffix})}", None))
+        elif operation == 'patch':
+            body = {'url': f"https://{repo}.example.edu/benchmark/{rng.getrandbits(64):016x}"}
+            requests.append(('PATCH', f"/api/v1/handles/{prefix}/{suffix}", json.dumps(body)))
+        elif operation == 'mint':
+            body = {
+                'prefix': prefix,
+                'url': f"https://{repo}.example.edu/benchmark/{rng.getrandbits(64):016x}",
+                'repo': repo,
+                'repo_id': f"benchmark:mint:{i}",
+            }
+            requests.append(('POST', '/api/v1/handles', json.dumps(body)))
+    return requests
+
+
+def run_operation(client, requests, concurrency, minted=None):
+    """
+    Sends the given requests using "concurrency" threads, returning the
+    throughput and latency statistics.
+
+    If "minted" is given, the suffixes of any handles minted by the requests
+    are appended to it.
+    """
+    def timed_request(request):
+        start = time.perf_counter()
+        status, body = client.request(*request)
+        latency = (time.perf_counter() - start) * 1000
+        if minted is not None and status == 200:
+            minted.append(int(json.loads(body)['suffix']))
+        return latency, status
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        timings = list(executor.map(timed_request, requests))
+    elapsed = time.perf_counter() - start
+
+    latencies = sorted(latency for latency, _ in timings)
+    errors = sum(1 for _, status in timings if status is None or status >= 400)
+    return {
+        'requests': len(timings),
+        'errors': errors,
+        'elapsed_s': round(elapsed, 3),
+        'throughput_rps': round(len(timings) / elapsed, 3),
+        'latency_ms': {
+            'min': round(latencies[0], 3),
+            'mean': round(statistics.fmean(latencies), 3),
+            'p50': round(percentile(latencies, 50), 3),
+            'p95': round(percentile(latencies, 95), 3),
+            'p99': round(percentile(latencies, 99), 3),
+            'max': round(latencies[-1], 3),
+        },
+    }
+
+
+def percentile(sorted_values, percent):
+    """
+    Returns the given percentile of a sorted list, using the nearest-rank
+    method.
+    """
+    rank = max(1, -(-len(sorted_values) * percent // 100))
+    return sorted_values[int(rank) - 1]
+
+
+def percent_change(before, after):
+    if not before:
+        return 'n/a'
+    return f"{(after - before) / before * 100:+.1f}%"
@@ -0,0 +1,72 @@
+import csv
+from contextlib import ExitStack
+
+from django.core.management.base import BaseCommand, CommandError
+
+from umd_handle.api.integrity import CHECKS, DEFAULT_CHUNK_SIZE, REPORT_CSV_HEADER, check_handles
+
+
+class Command(BaseCommand):
+    help = (
+        "Checks the handles for invalid field values, duplicate repository "
+        "items and prefix/suffixes, and suffix gaps. With --fix, field values "
+        "that are valid once whitespace (and, for the repo, case) is "
+        "normalized are fixed; the other problems are only reported."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--check', action='append', choices=CHECKS, dest='checks',
+            help='Check to run (may be repeated; default: all checks)'
+        )
+        parser.add_argument('--fix', action='store_true', help='Fix the fixable problems')
+        parser.add_argument('--dry-run', action='store_true', help='With --fix, report the fixes, but do not save them')
+        parser.add_argument('--chunk-size', type=int, default=DEFAULT_CHUNK_SIZE,
+                            help=f"Number of rows fetched (and fixed) at a time (default: {DEFAULT_CHUNK_SIZE})")
+        parser.add_argument('--report-file', help='CSV file listing every problem found')
+        parser.add_argument(
+            '--limit', type=int, default=10,
+            help='Maximum number of problems of each check written to STDOUT (default: 10)'
+        )
+
+    def handle(self, *args, **options):
+        if options['chunk_size'] < 1:
+            raise CommandError('--chunk-size must be a positive integer')
+        checks = options['checks'] or CHECKS
+
+        counts = dict.fromkeys(checks, 0)
+        fixed = 0
+        with ExitStack() as stack:
+            report = None
+            if options['report_file']:
+                try:
+                    report_file = stack.enter_context(
+                        open(options['report_file'], 'w', newline='', encoding='utf-8')
+                    )
+                except OSError as e:
+                    raise CommandError(f"Could not open file: {e}")
+                report = csv.writer(report_file)
+                report.writerow(REPORT_CSV_HEADER)
+
+            problems = check_handles(
+                checks,
+                fix=options['fix'],
+                dry_run=options['dry_run'],
+                chunk_size=options['chunk_size'],
+                actor='db_check_handles',
+            )
+            for problem in problems:
+                counts[problem.check] += 1
+                fixed += problem.fixed
+                if report is not None:
+                    report.writerow(problem)
+                if counts[problem.check] <= options['limit']:
+                    style = self.style.WARNING if problem.fixed else self.style.ERROR
+                    self.stdout.write(style(f"{problem.check}: {problem.handle}: {problem.detail}"))
+
+        for check, count in counts.items():
+            style = self.style.ERROR if count else self.style.SUCCESS
+            self.stdout.write(style(f"{check}: {count} problem(s)"))
+        if options['fix']:
+            verb = 'Would fix' if options['dry_run'] else 'Fixed'
+            self.stdout.write(self.style.SUCCESS(f"{verb} {fixed} problem(s)"))
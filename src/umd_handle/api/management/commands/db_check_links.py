@@ -0,0 +1,82 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from umd_handle.api.link_check import (
+    DEFAULT_BATCH_SIZE, DEFAULT_CONCURRENCY, DEFAULT_PER_HOST, DEFAULT_TIMEOUT, LinkCheckError, check_links,
+    handles_to_check
+)
+from umd_handle.api.models import Handle
+
+
+class Command(BaseCommand):
+    help = (
+        "Checks the target URLs of the handles (with HEAD requests, made "
+        "concurrently), recording the status, and any redirect, of each. "
+        "Handles checked recently are skipped."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--repo', help='Only check handles for this repository')
+        parser.add_argument('--prefix', help='Only check handles with this handle prefix')
+        parser.add_argument(
+            '--recheck-hours', type=float, default=24.0,
+            help='Skip handles checked in this many hours (default: 24; 0 checks every handle)'
+        )
+        parser.add_argument('--limit', type=int, help='Maximum number of handles to check')
+        parser.add_argument(
+            '--concurrency', type=int, default=DEFAULT_CONCURRENCY,
+            help=f"Maximum number of concurrent requests (default: {DEFAULT_CONCURRENCY})"
+        )
+        parser.add_argument(
+            '--per-host', type=int, default=DEFAULT_PER_HOST,
+            help=f"Maximum number of concurrent requests to each host (default: {DEFAULT_PER_HOST})"
+        )
+        parser.add_argument(
+            '--timeout', type=float, default=DEFAULT_TIMEOUT,
+            help=f"Seconds to wait for each response (default: {DEFAULT_TIMEOUT:g})"
+        )
+        parser.add_argument(
+            '--batch-size', type=int, default=DEFAULT_BATCH_SIZE,
+            help=f"Number of results saved at a time (default: {DEFAULT_BATCH_SIZE})"
+        )
+
+    def handle(self, *args, **options):
+        for option in ['concurrency', 'per_host', 'batch_size']:
+            if options[option] < 1:
+                raise CommandError(f"--{option.replace('_', '-')} must be a positive integer")
+        if options['timeout'] <= 0:
+            raise CommandError('--timeout must be positive')
+
+        queryset = Handle.objects.all()
+        if options['repo']:
+            queryset = queryset.filter(repo=options['repo'])
+        if options['prefix']:
+            queryset = queryset.filter(prefix=options['prefix'])
+        handles = handles_to_check(queryset, recheck_seconds=options['recheck_hours'] * 3600)
+        if options['limit'] is not None:
+            handles = handles[:options['limit']]
+
+        counts = {'ok': 0, 'redirected': 0, 'broken': 0, 'failed': 0}
+        link_checks = check_links(
+            handles,
+            batch_size=options['batch_size'],
+            concurrency=options['concurrency'],
+            per_host=options['per_host'],
+            timeout=options['timeout'],
+        )
+        try:
+            for link_check in link_checks:
+                if link_check.status is None:
+                    counts['failed'] += 1
+                    self.stdout.write(self.style.ERROR(f"{link_check.handle}: {link_check.url}: {link_check.error}"))
+                elif link_check.status >= 400:
+                    counts['broken'] += 1
+                    self.stdout.write(self.style.ERROR(f"{link_check.handle}: {link_check.url}: {link_check.status}"))
+                elif link_check.location:
+                    counts['redirected'] += 1
+                else:
+                    counts['ok'] += 1
+        except LinkCheckError as e:
+            raise CommandError(str(e))
+
+        summary = ' '.join(f"{name}={count}" for name, count in counts.items())
+        self.stdout.write(self.style.SUCCESS(f"Checked {sum(counts.values())} URL(s): {summary}"))
@@ -0,0 +1,40 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from umd_handle.api.models import MintKey
+
+
+class Command(BaseCommand):
+    help = (
+        "Delete the expired mint \"Idempotency-Key\" records, in batches. "
+        "Intended to be run as a scheduled task."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size', type=int, default=1000, help='Number of keys deleted per statement (default: 1000)'
+        )
+        parser.add_argument(
+            '--pause', type=float, default=0.0, help='Seconds to wait between batches (default: 0)'
+        )
+
+    def handle(self, *args, **options):
+        if options['batch_size'] < 1:
+            raise CommandError('--batch-size must be at least 1')
+
+        expired = MintKey.objects.filter(expires__lt=timezone.now())
+
+        deleted = 0
+        while True:
+            ids = list(expired.values_list('id', flat=True)[:options['batch_size']])
+            if not ids:
+                break
+            deleted += MintKey.objects.filter(id__in=ids).delete()[0]
+            if len(ids) < options['batch_size']:
+                break
+            if options['pause']:
+                time.sleep(options['pause'])
+
+        self.stdout.write(f"Deleted {deleted} expired key(s)")
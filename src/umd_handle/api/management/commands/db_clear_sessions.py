@@ -0,0 +1,47 @@
+import time
+
+from django.apps import apps
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+
+class Command(BaseCommand):
+    help = (
+        "Delete the expired sessions from the database, in batches, so that "
+        "the table does not keep growing. Intended to be run as a scheduled "
+        "task (replaces Django's \"clearsessions\" command, which deletes every "
+        "expired session in a single statement)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size', type=int, default=1000, help='Number of sessions deleted per statement (default: 1000)'
+        )
+        parser.add_argument(
+            '--pause', type=float, default=0.0, help='Seconds to wait between batches (default: 0)'
+        )
+
+    def handle(self, *args, **options):
+        if not apps.is_installed('django.contrib.sessions'):
+            raise CommandError('Sessions are not used by this server role')
+        if options['batch_size'] < 1:
+            raise CommandError('--batch-size must be at least 1')
+
+        from django.contrib.sessions.models import Session
+
+        # Sessions expiring during the run are left for the next run
+        now = timezone.now()
+        expired = Session.objects.filter(expire_date__lt=now)
+
+        deleted = 0
+        while True:
+            keys = list(expired.values_list('session_key', flat=True)[:options['batch_size']])
+            if not keys:
+                break
+            deleted += Session.objects.filter(session_key__in=keys).delete()[0]
+            if len(keys) < options['batch_size']:
+                break
+            if options['pause']:
+                time.sleep(options['pause'])
+
+        self.stdout.write(f"Deleted {deleted} expired session(s)")
@@ -0,0 +1,59 @@
+import json
+from contextlib import ExitStack
+from pathlib import Path
+
+from django.core.management.base import BaseCommand, CommandError
+
+from umd_handle.api.changes import change_record, changed_handles
+from umd_handle.api.cursors import InvalidCursor
+
+
+class Command(BaseCommand):
+    help = (
+        "Export the handles modified after a cursor, as newline-delimited "
+        "JSON, for synchronizing downstream systems."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--since', help='Only export changes after this cursor')
+        parser.add_argument(
+            '--cursor-file',
+            help='File storing the cursor of the last exported change. The cursor is read from the file '
+                 '(unless --since is given), and the file is updated after the export.'
+        )
+        parser.add_argument('--limit', type=int, help='Maximum number of changes to export')
+        parser.add_argument('--output', help='Path of the file to write to (default: STDOUT)')
+
+    def handle(self, *args, **options):
+        cursor_file = Path(options['cursor_file']) if options['cursor_file'] else None
+
+        since = options['since']
+        if not since and cursor_file and cursor_file.exists():
+            since = cursor_file.read_text(encoding='utf-8').strip() or None
+
+        try:
+            changes = changed_handles(since=since, limit=options['limit'])
+        except InvalidCursor as e:
+            raise CommandError(str(e))
+
+        exported = 0
+        last_cursor = since
+        with ExitStack() as stack:
+            if options['output']:
+                try:
+                    output = stack.enter_context(open(options['output'], 'w', encoding='utf-8'))
+                except OSError as e:
+                    raise CommandError(f"Could not open file: {e}")
+            else:
+                output = self.stdout
+
+            for cursor, handle in changes:
+                output.write(json.dumps(change_record(cursor, handle)) + '\n')
+                last_cursor = cursor
+                exported += 1
+
+        # Only record the cursor once all the changes have been written
+        if cursor_file and last_cursor:
+            cursor_file.write_text(last_cursor + '\n', encoding='utf-8')
+
+        self.stderr.write(f"Exported {exported} changes")
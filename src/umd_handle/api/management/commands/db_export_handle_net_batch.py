@@ -0,0 +1,67 @@
+from pathlib import Path
+
+from django.core.management.base import BaseCommand, CommandError
+
+from umd_handle.api.cursors import InvalidCursor
+from umd_handle.api.handle_net import BatchFileWriter, batch_operations
+
+
+class Command(BaseCommand):
+    help = (
+        "Export the handles (or those changed after a cursor) as a Handle.net "
+        "batch file, of CREATE, MODIFY, and DELETE operations, for "
+        "registering the handles with the Handle.net server."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--since', help='Only export changes after this (change feed) cursor')
+        parser.add_argument(
+            '--cursor-file',
+            help='File storing the cursor of the last export. The cursor is read from the file '
+                 '(unless --since is given), and the file is updated after the export.'
+        )
+        parser.add_argument('--output', help='Path of the batch file to write to (default: STDOUT)')
+        parser.add_argument(
+            '--per-file', type=int,
+            help='Maximum number of operations in each batch file. The files are numbered, i.e., '
+                 '"batch-0001.txt", "batch-0002.txt" for an --output of "batch.txt".'
+        )
+
+    def handle(self, *args, **options):
+        if options['per_file'] is not None:
+            if not options['output']:
+                raise CommandError('--per-file requires --output')
+            if options['per_file'] < 1:
+                raise CommandError('--per-file must be a positive integer')
+
+        cursor_file = Path(options['cursor_file']) if options['cursor_file'] else None
+
+        since = options['since']
+        if not since and cursor_file and cursor_file.exists():
+            since = cursor_file.read_text(encoding='utf-8').strip() or None
+
+        try:
+            operations, next_cursor = batch_operations(since=since)
+        except InvalidCursor as e:
+            raise CommandError(str(e))
+
+        if options['output']:
+            try:
+                with BatchFileWriter(options['output'], per_file=options['per_file']) as writer:
+                    for operation in operations:
+                        writer.write(operation)
+            except OSError as e:
+                raise CommandError(f"Could not write file: {e}")
+            count = writer.operations
+            for path in writer.paths:
+                self.stderr.write(f"Wrote {path}")
+        else:
+            count = 0
+            for operation in operations:
+                self.stdout.write(operation + '\n')
+                count += 1
+
+        # Only record the cursor once all the operations have been written
+        if cursor_file and next_cursor:
+            cursor_file.write_text(next_cursor + '\n', encoding='utf-8')
+        self.stderr.write(f"Exported {count} operation(s)")
@@ -0,0 +1,77 @@
+import csv
+from contextlib import ExitStack
+from itertools import islice
+
+from django.core.management.base import BaseCommand, CommandError
+
+from umd_handle.api.models import Handle, next_suffix
+from umd_handle.api.synthetic import bulk_insert, generate_handles
+
+CSV_COLUMNS = [
+    'id', 'prefix', 'suffix', 'url', 'repo', 'repo_id', 'description', 'notes',
+    'created_at', 'updated_at',
+]
+
+
+class Command(BaseCommand):
+    help = "Generate synthetic handles, for load testing and benchmarking."
+
+    def add_arguments(self, parser):
+        parser.add_argument('count', type=int, help='Number of handles to generate')
+        parser.add_argument('--seed', type=int, default=42, help='Random seed (default: 42)')
+        parser.add_argument(
+            '--prefix', default=Handle.ALLOWED_PREFIXES[0],
+            help=f"Handle prefix (default: {Handle.ALLOWED_PREFIXES[0]})"
+        )
+        parser.add_argument('--chunk-size', type=int, default=5000, help='Number of handles per insert (default: 5000)')
+        parser.add_argument(
+            '--csv-file',
+            help='Also write the handles to a CSV file, in the format used by "db_import_handles_from_csv"'
+        )
+        parser.add_argument('--csv-only', action='store_true', help='Only write the CSV file, do not save to the database')
+
+    def handle(self, *args, **options):
+        count = options['count']
+        chunk_size = options['chunk_size']
+        prefix = options['prefix']
+
+        if count < 1 or chunk_size < 1:
+            raise CommandError("count and --chunk-size must be positive")
+        if prefix not in Handle.ALLOWED_PREFIXES:
+            raise CommandError(f"'{prefix}' is not an allowed prefix.")
+        if options['csv_only'] and not options['csv_file']:
+            raise CommandError("--csv-only requires --csv-file")
+
+        first_suffix = next_suffix(prefix)
+        handles = generate_handles(count, seed=options['seed'], prefix=prefix, first_suffix=first_suffix)
+
+        generated = 0
+        with ExitStack() as stack:
+            writer = None
+            if options['csv_file']:
+                try:
+                    csv_file = stack.enter_context(open(options['csv_file'], 'w', newline='', encoding='utf-8'))
+                except OSError as e:
+                    raise CommandError(f"Could not open file: {e}")
+                writer = csv.writer(csv_file)
+                writer.writerow(CSV_COLUMNS)
+
+            while chunk := list(islice(handles, chunk_size)):
+                if writer:
+                    writer.writerows(csv_row(handle) for handle in chunk)
+                if not options['csv_only']:
+                    bulk_insert(chunk, batch_size=chunk_size)
+                generated += len(chunk)
+                self.stdout.write(f"Generated {generated}/{count} handles")
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Generation finished: {generated} handles, suffixes {first_suffix}-{first_suffix + generated - 1}"
+        ))
+
+
+def csv_row(handle):
+    return [
+        handle.suffix, handle.prefix, handle.suffix, handle.url, handle.repo,
+        handle.repo_id, handle.description, handle.notes,
+        handle.created.isoformat(), handle.modified.isoformat(),
+    ]
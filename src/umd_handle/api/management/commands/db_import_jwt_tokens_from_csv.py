@@ -1,4 +1,3 @@
-import csv
 from datetime import datetime
 
 from django.core.exceptions import ValidationError
@@ -8,6 +7,7 @@ from django.utils.dateparse import parse_datetime
 
 from django.core.management.base import BaseCommand, CommandError
 
+from umd_handle.api.csv_import import CheckpointError, CSVImportReader, ImportErrors
 from umd_handle.api.models import JWTToken
 
 
@@ -15,25 +15,71 @@ class Command(BaseCommand):
     help = "Import JWT tokens from a CSV into the JWTToken model."
 
     def add_arguments(self, parser):
-        parser.add_argument('csvfile', help='Path to CSV file to import')
+        parser.add_argument(
+            'csvfile', help='Path to CSV file to import ("-" for STDIN), which may be gzip, bzip2, xz, or zstd compressed'
+        )
         parser.add_argument('--dry-run', action='store_true', help='Validate only, do not save')
+        parser.add_argument(
+            '--checkpoint-file',
+            help='File recording the last imported row, so that an interrupted import can be resumed'
+        )
+        parser.add_argument(
+            '--resume', action='store_true', help='Continue after the last imported row in the checkpoint file'
+        )
+        parser.add_argument(
+            '--errors-file', help='CSV file to write errors to, as they happen (default: written to STDOUT)'
+        )
+        parser.add_argument(
+            '--progress-seconds', type=float, default=10.0,
+            help='Seconds between progress reports and checkpoints (default: 10)'
+        )
 
     def handle(self, *args, **options):
         csvfile = options['csvfile']
         dry_run = options['dry_run']
 
+        if options['resume'] and not options['checkpoint_file']:
+            raise CommandError('--resume requires --checkpoint-file')
+
         try:
-            f = open(csvfile, newline='', encoding='utf-8')
+            reader = CSVImportReader(
+                csvfile,
+                # Nothing is saved in a dry run, so there is nothing to resume
+                checkpoint_file=None if dry_run else options['checkpoint_file'],
+                resume=options['resume'],
+                progress=self.stderr.write,
+                progress_seconds=options['progress_seconds'],
+            )
         except OSError as e:
             raise CommandError(f"Could not open file: {e}")
 
-        reader = csv.DictReader(f)
-        created = 0
-        updated = 0
-        skipped = 0
-        errors = []
+        try:
+            errors = ImportErrors(
+                options['errors_file'],
+                write=lambda line: self.stdout.write(self.style.ERROR(line)),
+                append=options['resume'],
+            )
+        except OSError as e:
+            reader.close()
+            raise CommandError(f"Could not open errors file: {e}")
+
+        with reader, errors:
+            try:
+                self.import_rows(reader, errors, dry_run)
+            except CheckpointError as e:
+                raise CommandError(str(e))
 
-        for rownum, row in enumerate(reader, start=2):
+        # Report
+        self.stdout.write(self.style.SUCCESS(f"Import finished: created={self.created} updated={self.updated} skipped={self.skipped} errors={errors.count}"))
+        if errors.count and options['errors_file']:
+            self.stdout.write(self.style.ERROR(f"Errors (row, message) written to {options['errors_file']}"))
+
+    def import_rows(self, reader, errors, dry_run):
+        self.created = 0
+        self.updated = 0
+        self.skipped = 0
+
+        for rownum, row in reader:
             # Expected columns: id,token,description,created_at,updated_at
             token = row.get('token')
             description = row.get('description')
@@ -41,7 +87,7 @@ class Command(BaseCommand):
             updated_at_raw = row.get('updated_at')
 
             if not token or not description:
-                skipped += 1
+                self.skipped += 1
                 self.stdout.write(self.style.WARNING(f"Row {rownum}: missing token or description; skipping."))
                 continue
 
@@ -77,14 +123,14 @@ class Command(BaseCommand):
                     try:
                         obj.full_clean()
                     except ValidationError as ve:
-                        errors.append((rownum, f"Validation error: {ve.message_dict if hasattr(ve, 'message_dict') else ve.messages}"))
+                        errors.add(rownum, f"Validation error: {ve.message_dict if hasattr(ve, 'message_dict') else ve.messages}")
                         continue
 
                     if dry_run:
                         if exists:
-                            updated += 1
+                            self.updated += 1
                         else:
-                            created += 1
+                            self.created += 1
                         self.stdout.write(self.style.NOTICE(f"Row {rownum} would be {'updated' if exists else 'created'}: {description}"))
                         continue
 
@@ -106,18 +152,9 @@ class Command(BaseCommand):
                         JWTToken.objects.filter(id=obj.id).update(modified = updated_at)
 
                     if exists:
-                        updated += 1
+                        self.updated += 1
                     else:
-                        created += 1
+                        self.created += 1
 
             except Exception as exc:
-                errors.append((rownum, f"Unexpected error: {exc}"))
-
-        f.close()
-
-        # Report
-        self.stdout.write(self.style.SUCCESS(f"Import finished: created={created} updated={updated} skipped={skipped} errors={len(errors)}"))
-        if errors:
-            self.stdout.write(self.style.ERROR("Errors (row, message):"))
-            for r, msg in errors:
-                self.stdout.write(self.style.ERROR(f" - {r}: {msg}"))
+                errors.add(rownum, f"Unexpected error: {exc}")
@@ -0,0 +1,72 @@
+import csv
+import re
+from contextlib import ExitStack
+
+from django.core.management.base import BaseCommand, CommandError
+
+from umd_handle.api.models import Handle
+from umd_handle.api.url_rewrite import AUDIT_CSV_HEADER, DEFAULT_CHUNK_SIZE, UrlRewrite, rewrite_urls
+
+
+class Command(BaseCommand):
+    help = (
+        "Rewrites handle URLs starting with PATTERN, replacing PATTERN with "
+        "REPLACEMENT (or, with --regex, replacing matches of the PATTERN "
+        "regular expression)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('pattern', help='URL prefix (or regular expression) to replace')
+        parser.add_argument('replacement', help='Replacement text')
+        parser.add_argument(
+            '--regex', action='store_true',
+            help='Treat PATTERN as a regular expression (REPLACEMENT may use "\\1" group references)'
+        )
+        parser.add_argument('--repo', help='Only rewrite handles for this repository')
+        parser.add_argument('--prefix', help='Only rewrite handles with this handle prefix')
+        parser.add_argument('--chunk-size', type=int, default=DEFAULT_CHUNK_SIZE,
+                            help=f"Number of handles updated in each transaction (default: {DEFAULT_CHUNK_SIZE})")
+        parser.add_argument('--audit-file', help='CSV file listing each handle, and its old and new URL')
+        parser.add_argument('--dry-run', action='store_true', help='Report the changes, but do not save them')
+
+    def handle(self, *args, **options):
+        try:
+            rewrite = UrlRewrite(options['pattern'], options['replacement'], regex=options['regex'])
+        except (ValueError, re.error) as e:
+            raise CommandError(f"Invalid pattern: {e}")
+        if options['chunk_size'] < 1:
+            raise CommandError('--chunk-size must be a positive integer')
+
+        queryset = Handle.objects.all()
+        if options['repo']:
+            queryset = queryset.filter(repo=options['repo'])
+        if options['prefix']:
+            queryset = queryset.filter(prefix=options['prefix'])
+
+        with ExitStack() as stack:
+            audit = None
+            if options['audit_file']:
+                try:
+                    audit_file = stack.enter_context(
+                        open(options['audit_file'], 'w', newline='', encoding='utf-8')
+                    )
+                except OSError as e:
+                    raise CommandError(f"Could not open file: {e}")
+                audit = csv.writer(audit_file)
+                audit.writerow(AUDIT_CSV_HEADER)
+
+            result = rewrite_urls(
+                queryset,
+                rewrite,
+                dry_run=options['dry_run'],
+                chunk_size=options['chunk_size'],
+                actor='db_rewrite_urls',
+                audit=audit,
+            )
+
+        if result.invalid:
+            self.stdout.write(self.style.WARNING(
+                f"{result.invalid} handle(s) skipped, because the rewritten URL is not valid"
+            ))
+        verb = 'Would rewrite' if options['dry_run'] else 'Rewrote'
+        self.stdout.write(self.style.SUCCESS(f"{verb} {result.rewritten} of {result.matched} matching URL(s)"))
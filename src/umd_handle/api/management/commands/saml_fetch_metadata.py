@@ -0,0 +1,23 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from umd_handle.saml_metadata import MetadataError, refresh_metadata
+
+
+class Command(BaseCommand):
+    help = (
+        "Fetches the IdP SAML metadata from SAML_METADATA_URL, and saves it to "
+        "SAML_METADATA_FILE (i.e., to pre-seed the file when building the "
+        "Docker image)."
+    )
+
+    def handle(self, *args, **options):
+        if settings.API_ONLY:
+            raise CommandError('SAML is not used by the "api" server role')
+
+        try:
+            refresh_metadata()
+        except (MetadataError, OSError, ValueError) as e:
+            raise CommandError(f"Unable to fetch IdP metadata from {settings.SAML_METADATA_URL}: {e}")
+
+        self.stdout.write(self.style.SUCCESS(f"Saved IdP metadata to {settings.SAML_METADATA_FILE}"))
@@ -0,0 +1,17 @@
+# Generated by Django 5.2.18 on 2026-10-19 11:13
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0009_alter_handle_url'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='handle',
+            index=models.Index(fields=['modified', 'id'], name='handle_modified_id_idx'),
+        ),
+    ]
@@ -0,0 +1,81 @@
+# Generated by Django 5.2.18 on 2026-10-19 11:14
+
+from django.db import migrations, models
+
+# Columns with trigram indexes in PostgreSQL
+TRIGRAM_INDEXED_COLUMNS = ['prefix', 'suffix', 'url', 'repo', 'repo_id', 'description', 'notes']
+
+SQLITE_FTS_SQL = [
+    """
+    CREATE VIRTUAL TABLE IF NOT EXISTS api_handle_fts USING fts5(
+        handle, url, repo, repo_id, description, notes, tokenize='trigram'
+    )
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS api_handle_fts_insert AFTER INSERT ON api_handle BEGIN
+        INSERT INTO api_handle_fts(rowid, handle, url, repo, repo_id, description, notes)
+        VALUES (new.id, new.prefix || '/' || new.suffix, new.url, new.repo, new.repo_id, new.description, new.notes);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS api_handle_fts_delete AFTER DELETE ON api_handle BEGIN
+        DELETE FROM api_handle_fts WHERE rowid = old.id;
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS api_handle_fts_update AFTER UPDATE ON api_handle BEGIN
+        DELETE FROM api_handle_fts WHERE rowid = old.id;
+        INSERT INTO api_handle_fts(rowid, handle, url, repo, repo_id, description, notes)
+        VALUES (new.id, new.prefix || '/' || new.suffix, new.url, new.repo, new.repo_id, new.description, new.notes);
+    END
+    """,
+    # Rebuild the index from the existing rows
+    "DELETE FROM api_handle_fts",
+    """
+    INSERT INTO api_handle_fts(rowid, handle, url, repo, repo_id, description, notes)
+    SELECT id, prefix || '/' || suffix, url, repo, repo_id, description, notes FROM api_handle
+    """,
+]
+
+
+def forwards(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == 'postgresql':
+        schema_editor.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+        # Built concurrently, so that writes to the table are not blocked
+        for column in TRIGRAM_INDEXED_COLUMNS:
+            schema_editor.execute(
+                f'CREATE INDEX CONCURRENTLY IF NOT EXISTS api_handle_{column}_trgm ON api_handle '
+                f'USING gin (UPPER("{column}"::text) gin_trgm_ops)'
+            )
+    elif vendor == 'sqlite':
+        for sql in SQLITE_FTS_SQL:
+            schema_editor.execute(sql)
+
+
+def backwards(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == 'postgresql':
+        for column in TRIGRAM_INDEXED_COLUMNS:
+            schema_editor.execute(f'DROP INDEX CONCURRENTLY IF EXISTS api_handle_{column}_trgm')
+    elif vendor == 'sqlite':
+        for trigger in ('insert', 'delete', 'update'):
+            schema_editor.execute(f'DROP TRIGGER IF EXISTS api_handle_fts_{trigger}')
+        schema_editor.execute('DROP TABLE IF EXISTS api_handle_fts')
+
+
+class Migration(migrations.Migration):
+    # "CREATE INDEX CONCURRENTLY" cannot be run in a transaction
+    atomic = False
+
+    dependencies = [
+        ('api', '0010_handle_modified_id_idx'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='handle',
+            index=models.Index(fields=['repo_id', 'repo'], name='handle_repo_id_repo_idx'),
+        ),
+        migrations.RunPython(forwards, backwards),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 5.2.18 on 2026-10-19 11:20
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0011_handle_search_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='HandleHistory',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('prefix', models.CharField()),
+                ('suffix', models.IntegerField()),
+                ('action', models.CharField(choices=[('create', 'Create'), ('update', 'Update'), ('delete', 'Delete')])),
+                ('before', models.JSONField(blank=True, null=True)),
+                ('after', models.JSONField(blank=True, null=True)),
+                ('actor', models.CharField(blank=True)),
+                ('created', models.DateTimeField(default=django.utils.timezone.now)),
+                ('handle', models.ForeignKey(db_constraint=False, null=True, on_delete=django.db.models.deletion.DO_NOTHING, related_name='history', to='api.handle')),
+            ],
+            options={
+                'verbose_name_plural': 'handle history',
+                'indexes': [models.Index(fields=['prefix', 'suffix', 'created'], name='handlehistory_handle_idx'), models.Index(fields=['created'], name='handlehistory_created_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 5.2.18 on 2026-10-19 11:25
+
+import django_extensions.db.fields
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0012_handlehistory'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='UrlRewriteRule',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created', django_extensions.db.fields.CreationDateTimeField(auto_now_add=True, verbose_name='created')),
+                ('modified', django_extensions.db.fields.ModificationDateTimeField(auto_now=True, verbose_name='modified')),
+                ('match_type', models.CharField(choices=[('prefix', 'URL prefix'), ('regex', 'Regular expression')], default='prefix')),
+                ('pattern', models.CharField(help_text='The URL prefix, or regular expression, to replace')),
+                ('replacement', models.CharField(blank=True, help_text='The replacement text (regular expression replacements may use "\\1" group references)')),
+                ('repo', models.CharField(blank=True, choices=[('aspace', 'aspace'), ('avalon', 'avalon'), ('fcrepo', 'fcrepo'), ('fedora2', 'fedora2')], help_text='Only apply to handles for this repository (all repositories, if blank)')),
+                ('priority', models.IntegerField(default=0, help_text='Rules with a higher priority are applied first')),
+                ('enabled', models.BooleanField(default=True)),
+                ('description', models.CharField(blank=True)),
+            ],
+            options={
+                'get_latest_by': 'modified',
+                'abstract': False,
+            },
+        ),
+    ]
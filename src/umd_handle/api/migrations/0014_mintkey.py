@@ -0,0 +1,26 @@
+# Generated by Django 5.2.18 on 2026-10-19 11:38
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0013_urlrewriterule'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MintKey',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('key', models.CharField(unique=True)),
+                ('request_hash', models.CharField(blank=True)),
+                ('created', models.DateTimeField(default=django.utils.timezone.now)),
+                ('expires', models.DateTimeField(blank=True, db_index=True, null=True)),
+                ('handle', models.ForeignKey(null=True, on_delete=django.db.models.deletion.CASCADE, related_name='+', to='api.handle')),
+            ],
+        ),
+    ]
@@ -0,0 +1,26 @@
+# Generated by Django 5.2.18 on 2026-10-19 11:46
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0014_mintkey'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='HandleLinkCheck',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('url', models.CharField()),
+                ('status', models.IntegerField(blank=True, null=True)),
+                ('location', models.CharField(blank=True)),
+                ('error', models.CharField(blank=True)),
+                ('checked', models.DateTimeField(db_index=True)),
+                ('handle', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='link_check', to='api.handle')),
+            ],
+        ),
+    ]
@@ -0,0 +1,27 @@
+# Generated by Django 5.2.18 on 2026-10-19 11:50
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0015_handlelinkcheck'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='HandleStats',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('hits', models.BigIntegerField(default=0)),
+                ('last_accessed', models.DateTimeField(blank=True, null=True)),
+                ('handle', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='stats', to='api.handle')),
+            ],
+            options={
+                'verbose_name_plural': 'handle stats',
+                'indexes': [models.Index(fields=['-hits', 'id'], name='handlestats_hits_idx'), models.Index(fields=['-last_accessed', 'id'], name='handlestats_last_accessed_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-19 12:09
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0016_handlestats'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='handle',
+            name='legacy_modified',
+            field=models.DateTimeField(blank=True, editable=False, null=True),
+        ),
+    ]
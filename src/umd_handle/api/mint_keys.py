@@ -0,0 +1,115 @@
+"""
+Idempotent minting, using the MintKey table.
+
+A mint request with an "Idempotency-Key" header returns the handle minted by
+the first request with the same key (and JWT token), for
+IDEMPOTENCY_KEY_SECONDS, so that a retried request (i.e., after a timeout)
+does not mint a second handle.
+
+When the MINT_RETURNS_EXISTING_HANDLE setting is True, minting a handle for a
+(prefix, repo, repo_id) that already has a handle returns the existing handle.
+
+Each key is "claimed" with a single INSERT ... ON CONFLICT DO UPDATE
+statement, which either inserts the key, or locks the existing key (waiting
+for any concurrent transaction claiming the same key to finish). The key then
+stays locked until the mint is committed, so there is no race between
+checking for an existing handle and minting a new one.
+"""
+import datetime
+import hashlib
+import json
+
+from django.conf import settings
+from django.utils import timezone
+
+from umd_handle.rate_limit import token_key
+
+from .models import Handle, MintKey
+
+# Fields of a mint request, which identify the request for an Idempotency-Key
+MINT_REQUEST_FIELDS = ['prefix', 'url', 'repo', 'repo_id', 'description', 'notes']
+
+
+class IdempotencyKeyReused(Exception):
+    pass
+
+
+def idempotency_key(jwt_token, header):
+    """
+    Returns the MintKey key for an "Idempotency-Key" header, which is scoped
+    to the JWT token, so different clients cannot see each other's handles.
+    """
+    return f"idempotency:{token_key(jwt_token)}:{header}"
+
+
+def repo_key(prefix, repo, repo_id):
+    """
+    Returns the MintKey key for the handle of a repository item.
+    """
+    return f"repo:{json.dumps([prefix, repo, repo_id])}"
+
+
+def request_hash(data):
+    """
+    Returns a hash of the fields of the given mint request.
+    """
+    fields = {field: data.get(field, '') for field in MINT_REQUEST_FIELDS}
+    return hashlib.sha256(json.dumps(fields, sort_keys=True).encode('utf-8')).hexdigest()
+
+
+def claim(key, request_hash='', expires=None):
+    """
+    Inserts, or locks, the MintKey with the given key, returning it. Must be
+    called in a transaction.
+
+    An expired key is reset (as if it had just been inserted).
+    """
+    mint_key = MintKey(key=key, request_hash=request_hash, expires=expires)
+    # The (no-op) update of the key locks an existing row, and returns its id
+    MintKey.objects.bulk_create(
+        [mint_key], update_conflicts=True, unique_fields=['key'], update_fields=['key']
+    )
+    existing = MintKey.objects.get(pk=mint_key.pk)
+    if existing.expires is not None and existing.expires <= timezone.now():
+        existing.handle = None
+        existing.request_hash = request_hash
+        existing.expires = expires
+        existing.save(update_fields=['handle', 'request_hash', 'expires'])
+    return existing
+
+
+def claim_idempotency_key(jwt_token, header, data):
+    """
+    Claims the MintKey for an "Idempotency-Key" header, returning it. Raises
+    IdempotencyKeyReused if the key was used for a different request.
+    """
+    expires = timezone.now() + datetime.timedelta(seconds=settings.IDEMPOTENCY_KEY_SECONDS)
+    mint_key = claim(idempotency_key(jwt_token, header), request_hash(data), expires)
+    if mint_key.request_hash != request_hash(data):
+        raise IdempotencyKeyReused(f"Idempotency-Key '{header}' was used for a different request")
+    return mint_key
+
+
+def claim_repo_key(prefix, repo, repo_id):
+    """
+    Claims the MintKey for a repository item, returning it. If the key has no
+    handle, it is set to the oldest existing handle for the item (if any).
+    """
+    mint_key = claim(repo_key(prefix, repo, repo_id))
+    handles = Handle.objects.filter(prefix=prefix, repo=repo, repo_id=repo_id)
+
+    # The handle may have been deleted, or changed to another item
+    if mint_key.handle_id is None or not handles.filter(pk=mint_key.handle_id).exists():
+        existing = handles.order_by('id').first()
+        if existing is not None or mint_key.handle_id is not None:
+            set_handle([mint_key], existing)
+    return mint_key
+
+
+def set_handle(mint_keys, handle):
+    """
+    Records the handle minted for the given keys.
+    """
+    MintKey.objects.filter(pk__in=[mint_key.pk for mint_key in mint_keys]).update(handle=handle)
+    for mint_key in mint_keys:
+        mint_key.handle = handle
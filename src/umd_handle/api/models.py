@@ -1,8 +1,11 @@
+import re
+
 from django.conf import settings
 from django.core.exceptions import ValidationError
-from django.db import models
+from django.db import IntegrityError, models
 from django.db.models import Max
 from django.db import transaction
+from django.utils import timezone
 from django_extensions.db.models import TimeStampedModel
 from urllib.parse import urlparse
 
@@ -41,23 +44,25 @@ def mint_new_handle(prefix, url, repo, repo_id, description='', notes=''):
 
     Returns the new Handle instance.
     """
+    handle = Handle(
+        prefix=prefix,
+        url=url,
+        repo=repo,
+        repo_id=repo_id,
+        description=description,
+        notes=notes,
+    )
+    # Validate before allocating the suffix. The uniqueness of the new
+    # prefix/suffix is enforced by the database constraint, instead of
+    # querying for it (see "Handle.save_validated").
+    handle.validate_fields(exclude=['suffix'])
+
     # Use atomic transaction to avoid race condition in generating the
     # next suffix
     with transaction.atomic():
-        handle = Handle(
-            prefix=prefix,
-            suffix=next_suffix(prefix),
-            url=url,
-            repo=repo,
-            repo_id=repo_id,
-            description=description,
-            notes=notes,
-        )
-
-        # Validate and save the handle
-        handle.full_clean()
-        handle.save()
-        return handle
+        handle.suffix = next_suffix(prefix)
+        handle.save_validated()
+    return handle
 
 
 def next_suffix(prefix):
@@ -96,6 +101,10 @@ class Handle(TimeStampedModel):
     repo_id = models.CharField()
     description = models.CharField(blank=True)
     notes = models.TextField(blank=True)
+    # The "updated_at" timestamp of handles imported from the Rails-based
+    # application. Imports set "modified" to the time of the import, so that
+    # the change feed includes the imported handles.
+    legacy_modified = models.DateTimeField(null=True, blank=True, editable=False)
 
     class Meta:
         constraints = [
@@ -104,11 +113,61 @@ class Handle(TimeStampedModel):
                 name='unique_handle_prefix_suffix'
             )
         ]
+        indexes = [
+            # Supports the default "modified" ordering in the admin
+            models.Index(fields=['modified', 'id'], name='handle_modified_id_idx'),
+            # Supports "repo_id" lookups, with or without "repo"
+            models.Index(fields=['repo_id', 'repo'], name='handle_repo_id_repo_idx'),
+        ]
 
       # Returns the fully-qualified URL to use as the handle URL
     def handle_url(self):
         return f"{settings.HANDLE_HTTP_PROXY_BASE}{self.prefix}/{self.suffix}"
 
+    def to_dict(self):
+        """
+        Returns a dictionary representation of the handle, for JSON responses.
+        """
+        return {
+            'prefix': self.prefix,
+            'suffix': str(self.suffix),
+            'handle_url': self.handle_url(),
+            'url': self.url,
+            'repo': self.repo,
+            'repo_id': self.repo_id,
+            'description': self.description,
+            'notes': self.notes,
+            'created': self.created.isoformat(),
+            'modified': self.modified.isoformat(),
+            'legacy_modified': self.legacy_modified.isoformat() if self.legacy_modified else None,
+        }
+
+    def validate_fields(self, fields=None, exclude=None):
+        """
+        Validates the given fields (or all the fields, except those in
+        "exclude"), raising a ValidationError if any are invalid.
+
+        Unlike "full_clean", the unique constraints are not checked, as each
+        check is an additional query. Use "save_validated" to save the handle,
+        so that a duplicate prefix/suffix is reported as a ValidationError.
+        """
+        if fields is not None:
+            exclude = [f.name for f in self._meta.fields if f.name not in fields]
+        self.full_clean(exclude=exclude, validate_unique=False, validate_constraints=False)
+
+    def save_validated(self, *args, **kwargs):
+        """
+        Saves the handle (after "validate_fields"), raising a ValidationError,
+        instead of an IntegrityError, if the prefix/suffix is already used.
+        """
+        try:
+            self.save(*args, **kwargs)
+        except IntegrityError:
+            duplicate = Handle.objects.filter(prefix=self.prefix, suffix=self.suffix).exclude(pk=self.pk)
+            if not duplicate.exists():
+                raise
+            raise self.unique_error_message(Handle, ['prefix', 'suffix'])
+
     def save(self, *args, **kwargs):
         # Use atomic transaction to avoid race condition in generating the
         # next suffix
@@ -127,3 +186,158 @@ class Handle(TimeStampedModel):
 class JWTToken(TimeStampedModel):
     token = models.CharField()
     description = models.CharField()
+
+
+class HandleHistory(models.Model):
+    """
+    An audit trail entry, recording the values of a handle before and after
+    it was created, updated, or deleted, and who made the change.
+
+    Entries are usually written in batches, some time after the change (see
+    "umd_handle.api.history"), so the "handle" foreign key is not enforced by
+    the database, and the handle is also identified by its prefix and suffix
+    (which remain after a handle has been deleted).
+    """
+    ACTION_CREATE = 'create'
+    ACTION_UPDATE = 'update'
+    ACTION_DELETE = 'delete'
+
+    handle = models.ForeignKey(
+        Handle,
+        null=True,
+        on_delete=models.DO_NOTHING,
+        db_constraint=False,
+        related_name='history',
+    )
+    prefix = models.CharField()
+    suffix = models.IntegerField()
+    action = models.CharField(
+        choices=[(ACTION_CREATE, 'Create'), (ACTION_UPDATE, 'Update'), (ACTION_DELETE, 'Delete')]
+    )
+    # The changed fields, and their values, before and after the change
+    before = models.JSONField(null=True, blank=True)
+    after = models.JSONField(null=True, blank=True)
+    # The JWT token description, or SAML user, that made the change
+    actor = models.CharField(blank=True)
+    # The time of the change (not the time the entry was written)
+    created = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        verbose_name_plural = 'handle history'
+        indexes = [
+            models.Index(fields=['prefix', 'suffix', 'created'], name='handlehistory_handle_idx'),
+            models.Index(fields=['created'], name='handlehistory_created_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.action} {self.prefix}/{self.suffix}"
+
+
+class UrlRewriteRule(TimeStampedModel):
+    """
+    A rule rewriting handle URLs when they are resolved (i.e., after a
+    repository has moved to a new hostname), without changing the stored
+    URLs.
+
+    The rule with the highest priority that matches the URL (and the repo of
+    the handle, if "repo" is set) is applied. See "umd_handle.api.rewrite_rules".
+    """
+    MATCH_PREFIX = 'prefix'
+    MATCH_REGEX = 'regex'
+
+    match_type = models.CharField(
+        choices=[(MATCH_PREFIX, 'URL prefix'), (MATCH_REGEX, 'Regular expression')],
+        default=MATCH_PREFIX,
+    )
+    pattern = models.CharField(help_text='The URL prefix, or regular expression, to replace')
+    replacement = models.CharField(
+        blank=True,
+        help_text='The replacement text (regular expression replacements may use "\\1" group references)'
+    )
+    repo = models.CharField(
+        blank=True,
+        choices=[(repo, repo) for repo in Handle.ALLOWED_REPOS],
+        help_text='Only apply to handles for this repository (all repositories, if blank)'
+    )
+    priority = models.IntegerField(default=0, help_text='Rules with a higher priority are applied first')
+    enabled = models.BooleanField(default=True)
+    description = models.CharField(blank=True)
+
+    def clean(self):
+        if self.match_type == self.MATCH_REGEX:
+            try:
+                re.compile(self.pattern)
+            except re.error as e:
+                raise ValidationError({'pattern': f"Invalid regular expression: {e}"})
+
+    def __str__(self):
+        return f"{self.pattern} -> {self.replacement}"
+
+
+class MintKey(models.Model):
+    """
+    The handle minted for a key, so that repeated mint requests with the
+    same key return the same handle, instead of minting another one.
+
+    The key is either an "Idempotency-Key" header (for the JWT token that sent
+    it), which expires, or a (prefix, repo, repo_id), when minting returns
+    the existing handle for a repository item (see the
+    MINT_RETURNS_EXISTING_HANDLE setting). See "umd_handle.api.mint_keys".
+    """
+    key = models.CharField(unique=True)
+    handle = models.ForeignKey(Handle, null=True, on_delete=models.CASCADE, related_name='+')
+    # A hash of the mint request, so that reusing an "Idempotency-Key" for a
+    # different request can be detected
+    request_hash = models.CharField(blank=True)
+    created = models.DateTimeField(default=timezone.now)
+    # When the key expires (or null, if it does not)
+    expires = models.DateTimeField(null=True, blank=True, db_index=True)
+
+    def __str__(self):
+        return self.key
+
+
+class HandleLinkCheck(models.Model):
+    """
+    The result of the last check of the URL of a handle (i.e., whether the
+    target URL still exists). See "umd_handle.api.link_check".
+    """
+    handle = models.OneToOneField(Handle, on_delete=models.CASCADE, related_name='link_check')
+    # The URL that was checked (after applying the URL rewrite rules)
+    url = models.CharField()
+    # The HTTP status of the response, or null if there was no response
+    status = models.IntegerField(null=True, blank=True)
+    # The "Location" of a redirect response
+    location = models.CharField(blank=True)
+    # The error, if there was no response (i.e., a timeout)
+    error = models.CharField(blank=True)
+    checked = models.DateTimeField(db_index=True)
+
+    @property
+    def ok(self):
+        return self.status is not None and self.status < 400
+
+    def __str__(self):
+        return f"{self.url}: {self.status or self.error}"
+
+
+class HandleStats(models.Model):
+    """
+    The number of times a handle has been resolved, and when it was last
+    resolved. Resolutions are counted in memory, and added to these counts
+    in batches (see "umd_handle.api.hits").
+    """
+    handle = models.OneToOneField(Handle, on_delete=models.CASCADE, related_name='stats')
+    hits = models.BigIntegerField(default=0)
+    last_accessed = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        verbose_name_plural = 'handle stats'
+        indexes = [
+            # Support the "top N" and "recently accessed" orderings
+            models.Index(fields=['-hits', 'id'], name='handlestats_hits_idx'),
+            models.Index(fields=['-last_accessed', 'id'], name='handlestats_last_accessed_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.handle_id}: {self.hits}"
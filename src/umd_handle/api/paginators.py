@@ -0,0 +1,74 @@
+import hashlib
+import json
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.paginator import Paginator
+from django.db import connections
+from django.utils.functional import cached_property
+
+
+class EstimatedCountPaginator(Paginator):
+    """
+    Paginator for large tables, that uses the database query planner's row
+    estimate instead of "SELECT COUNT(*)" when the estimate is at least the
+    ADMIN_COUNT_ESTIMATE_THRESHOLD setting.
+
+    Counts of more than one page are cached for ADMIN_COUNT_CACHE_SECONDS,
+    keyed by the query.
+    """
+
+    @cached_property
+    def count(self):
+        return estimated_count(self.object_list, min_cached_count=self.per_page + 1)
+
+
+def estimated_count(queryset, min_cached_count=0):
+    """
+    Returns the planner estimate of the number of rows returned by the
+    queryset if it is large, otherwise the exact count.
+
+    Counts of at least "min_cached_count" are cached, so that a stale count
+    does not hide rows from results that fit on a single page.
+    """
+    sql, params = queryset.order_by().query.sql_with_params()
+    key = 'estimated_count:' + hashlib.sha256(f"{sql}{params!r}".encode()).hexdigest()
+
+    count = cache.get(key)
+    if count is not None:
+        return count
+
+    estimate = planner_estimate(queryset)
+    if estimate is not None and estimate >= settings.ADMIN_COUNT_ESTIMATE_THRESHOLD:
+        count = estimate
+    else:
+        count = queryset.count()
+
+    if count >= min_cached_count:
+        cache.set(key, count, settings.ADMIN_COUNT_CACHE_SECONDS)
+    return count
+
+
+def planner_estimate(queryset):
+    """
+    Returns the PostgreSQL query planner estimate of the number of rows
+    returned by the queryset, or None if no estimate is available.
+    """
+    connection = connections[queryset.db]
+    if connection.vendor != 'postgresql':
+        return None
+
+    queryset = queryset.order_by()
+    if not queryset.query.where:
+        # Unfiltered, so use the table statistics
+        with connection.cursor() as cursor:
+            cursor.execute(
+                'SELECT reltuples FROM pg_class WHERE oid = %s::regclass',
+                [queryset.model._meta.db_table]
+            )
+            row = cursor.fetchone()
+        # "reltuples" is -1 if the table has never been analyzed
+        return int(row[0]) if row and row[0] >= 0 else None
+
+    plan = json.loads(queryset.explain(format='json'))
+    return int(plan[0]['Plan']['Plan Rows'])
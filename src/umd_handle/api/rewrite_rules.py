@@ -0,0 +1,174 @@
+"""
+Resolution-time URL rewriting, using the UrlRewriteRule table.
+
+The enabled rules are compiled into a RuleMatcher, which is cached in the
+process, so that applying the rules does not query the database:
+
+* prefix rules are stored in a dictionary for each prefix length, so finding
+  every matching prefix takes one dictionary lookup per distinct length
+  (equivalent to walking a prefix trie, without a Python loop over each
+  character of the URL)
+* regular expression rules are only tried if they have a higher priority
+  than the best matching prefix rule
+
+The cached matcher is discarded when a rule is saved or deleted in this
+process. Every URL_REWRITE_RULES_CHECK_SECONDS, each process checks the
+version of the rules in the database (the number of rules, and the latest
+"modified" timestamp), so that changes made by other processes are noticed
+without relying on a cache shared by the processes.
+"""
+import logging
+import re
+import threading
+import time
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, Max
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .models import UrlRewriteRule
+
+logger = logging.getLogger(__name__)
+
+
+class RuleMatcher:
+    """
+    Applies a set of rewrite rules, given as (priority, order, rule) tuples.
+    """
+
+    def __init__(self, rules):
+        # The rules for each repo, including the rules for all repos
+        repo_rules = {}
+        global_rules = [rule for rule in rules if not rule[2].repo]
+        for rule in rules:
+            if rule[2].repo:
+                repo_rules.setdefault(rule[2].repo, list(global_rules)).append(rule)
+
+        self._global = _RepoMatcher(global_rules)
+        self._repos = {repo: _RepoMatcher(rules) for repo, rules in repo_rules.items()}
+        self.empty = not rules
+
+    def apply(self, url, repo):
+        """
+        Returns the URL rewritten by the best matching rule for the repo, or
+        the URL unchanged, if no rule matches.
+        """
+        if self.empty:
+            return url
+        return self._repos.get(repo, self._global).apply(url)
+
+
+class _RepoMatcher:
+    def __init__(self, rules):
+        # Highest priority first; ties are broken by the order the rules
+        # were created
+        rules = sorted(rules, key=lambda rule: (-rule[0], rule[1]))
+
+        # Maps each prefix length to a {prefix: (sort key, replacement)}
+        # dictionary, keeping the best rule for each prefix
+        self._prefixes = {}
+        # (sort key, compiled regular expression, replacement) tuples, in
+        # priority order
+        self._regexes = []
+
+        for index, (_, _, rule) in enumerate(rules):
+            if rule.match_type == UrlRewriteRule.MATCH_REGEX:
+                try:
+                    self._regexes.append((index, re.compile(rule.pattern), rule.replacement))
+                except re.error:
+                    logger.warning(f"Ignoring URL rewrite rule {rule.pk} with invalid pattern: {rule.pattern}")
+            else:
+                self._prefixes.setdefault(len(rule.pattern), {}).setdefault(rule.pattern, (index, rule.replacement))
+
+        # Longest prefixes first
+        self._lengths = sorted(self._prefixes, reverse=True)
+
+    def apply(self, url):
+        best = None
+        for length in self._lengths:
+            match = self._prefixes[length].get(url[:length])
+            if match is not None and (best is None or match[0] < best[0]):
+                best = match + (length,)
+
+        for index, regex, replacement in self._regexes:
+            if best is not None and index > best[0]:
+                break
+            try:
+                new_url, count = regex.subn(replacement, url, count=1)
+            except (re.error, IndexError):
+                # Invalid group reference in the replacement
+                continue
+            if count:
+                return new_url
+
+        if best is None:
+            return url
+        _, replacement, length = best
+        return replacement + url[length:]
+
+
+_matcher = None
+_matcher_version = None
+_next_version_check = 0.0
+_lock = threading.Lock()
+
+
+def get_matcher():
+    """
+    Returns the (cached) RuleMatcher for the enabled rules.
+    """
+    global _matcher, _matcher_version, _next_version_check
+
+    now = time.monotonic()
+    matcher = _matcher
+    if matcher is not None and now < _next_version_check:
+        return matcher
+
+    with _lock:
+        # The version is read before the rules, so that a change made while
+        # the rules are read is noticed at the next check
+        version = rules_version()
+        if _matcher is None or version != _matcher_version:
+            rules = UrlRewriteRule.objects.filter(enabled=True)
+            _matcher = RuleMatcher([(rule.priority, rule.pk, rule) for rule in rules])
+            _matcher_version = version
+        _next_version_check = now + settings.URL_REWRITE_RULES_CHECK_SECONDS
+        return _matcher
+
+
+def rules_version():
+    """
+    Returns the version of the rules in the database, which changes when a
+    rule is added, changed, or deleted.
+    """
+    version = UrlRewriteRule.objects.aggregate(count=Count('id'), modified=Max('modified'))
+    return version['count'], version['modified']
+
+
+def rewrite_url(url, repo):
+    """
+    Returns the URL to use for a handle with the given URL and repo, after
+    applying the URL rewrite rules.
+    """
+    return get_matcher().apply(url, repo)
+
+
+def invalidate():
+    """
+    Discards the cached matcher in this process. (Other processes reload the
+    rules when they next check the version of the rules.)
+    """
+    global _matcher
+    with _lock:
+        _matcher = None
+
+
+@receiver(post_save, sender=UrlRewriteRule)
+@receiver(post_delete, sender=UrlRewriteRule)
+def rules_changed(sender, **kwargs):
+    # Invalidate again once committed, in case the rules were reloaded
+    # (without the change) before the commit
+    invalidate()
+    transaction.on_commit(invalidate)
@@ -0,0 +1,76 @@
+"""
+Indexed search for handles, used by the Handle admin.
+
+In PostgreSQL, the "icontains" lookups used by the admin search are supported
+by trigram (GIN) indexes on each of the searched columns.
+
+In SQLite (used for local development), a "api_handle_fts" FTS5 table, using
+the "trigram" tokenizer, is kept in sync with the "api_handle" table by
+triggers.
+
+The indexes (and the SQLite table and triggers) are created by migration
+0011. Note: On SQLite, migrations that rebuild the "api_handle" table (such
+as changing a column) drop its triggers, so such migrations must create the
+triggers again (using the SQL in migration 0011).
+"""
+import re
+
+from django.db import connection
+from django.db.models.expressions import RawSQL
+from django.utils.text import smart_split, unescape_string_literal
+
+# Search terms of the form "<PREFIX>/<SUFFIX>"
+HANDLE_PATTERN = re.compile(r'^(?P<prefix>[^/\s]+)/(?P<suffix>\d+)$')
+
+# The trigram tokenizer cannot match terms shorter than three characters
+MIN_FULL_TEXT_TERM_LENGTH = 3
+
+
+def exact_match(queryset, search_term):
+    """
+    Returns a queryset using an indexed equality lookup when the search term
+    is a "<PREFIX>/<SUFFIX>" handle, otherwise returns None.
+    """
+    match = HANDLE_PATTERN.match(search_term.strip())
+    if match:
+        return queryset.filter(prefix=match['prefix'], suffix=int(match['suffix']))
+    return None
+
+
+def with_repo_id_match(search_queryset, queryset, search_term):
+    """
+    Returns the search results, combined (in the same query) with the
+    handles (from the unsearched queryset) with the search term as their
+    "repo_id", which are found using an indexed equality lookup.
+    """
+    search_term = search_term.strip()
+    if not search_term:
+        return search_queryset
+    return search_queryset | queryset.filter(repo_id=search_term)
+
+
+def full_text_search(queryset, search_term):
+    """
+    Returns a queryset using the SQLite full-text index, or None if the
+    full-text index cannot be used (in which case the "icontains" lookups,
+    which are indexed in PostgreSQL, should be used).
+    """
+    if connection.vendor != 'sqlite':
+        return None
+
+    phrases = []
+    for bit in smart_split(search_term):
+        if bit.startswith(('"', "'")) and bit[0] == bit[-1]:
+            bit = unescape_string_literal(bit)
+        if len(bit) < MIN_FULL_TEXT_TERM_LENGTH:
+            return None
+        # Quote each term as an FTS5 string, so it matches as a substring
+        phrases.append('"' + bit.replace('"', '""') + '"')
+
+    if not phrases:
+        return None
+
+    return queryset.filter(
+        id__in=RawSQL('SELECT rowid FROM api_handle_fts WHERE api_handle_fts MATCH %s', [' '.join(phrases)])
+    )
+
@@ -0,0 +1,137 @@
+import random
+import string
+import uuid
+from datetime import UTC, datetime, timedelta
+from itertools import islice
+
+from django.db import transaction
+
+from umd_handle.api.models import Handle
+
+# Fixed date range for the "created"/"modified" timestamps, so that the same
+# seed always generates the same handles.
+DEFAULT_START = datetime(2012, 1, 1, tzinfo=UTC)
+DEFAULT_END = datetime(2025, 12, 31, tzinfo=UTC)
+
+NOID_CHARACTERS = string.digits + 'bcdfghjkmnpqrstvwxz'
+
+WORDS = [
+    'archives', 'baltimore', 'campus', 'collection', 'correspondence',
+    'diamondback', 'digital', 'faculty', 'football', 'history', 'interview',
+    'library', 'maryland', 'map', 'newspaper', 'oral', 'papers', 'photograph',
+    'poster', 'records', 'report', 'senate', 'student', 'terrapin',
+    'university', 'yearbook',
+]
+
+
+def generate_handles(count, seed=0, prefix=Handle.ALLOWED_PREFIXES[0], first_suffix=1,
+                     start=DEFAULT_START, end=DEFAULT_END):
+    """
+    Yields "count" unsaved synthetic Handle instances, with sequential
+    suffixes beginning at "first_suffix".
+
+    The handles are spread across all the allowed repositories, with URL and
+    repo_id values shaped like the ones used by each repository. The same
+    seed always yields the same handles.
+    """
+    rng = random.Random(seed)
+    span = (end - start).total_seconds()
+
+    for suffix in range(first_suffix, first_suffix + count):
+        repo = rng.choice(Handle.ALLOWED_REPOS)
+        url, repo_id = REPO_SHAPES[repo](rng)
+
+        created = start + timedelta(seconds=rng.uniform(0, span))
+        # Most handles are never modified after they are created
+        if rng.random() < 0.7:
+            modified = created
+        else:
+            modified = created + timedelta(seconds=rng.uniform(0, (end - created).total_seconds()))
+
+        handle = Handle(
+            prefix=prefix,
+            suffix=suffix,
+            url=url,
+            repo=repo,
+            repo_id=repo_id,
+            description=_description(rng),
+            notes=_notes(rng),
+            created=created,
+            modified=modified,
+        )
+        # Prevents the "modified" field from being reset when saved
+        handle.update_modified = False
+        yield handle
+
+
+def bulk_insert(handles, batch_size=1000):
+    """
+    Inserts the given unsaved handles (e.g., from "generate_handles"), in
+    batches of "batch_size", keeping their "created" and "modified"
+    timestamps.
+
+    Unlike "bulk_create", the rows are inserted "raw" (as when loading
+    fixtures), so the timestamps are not replaced with the current time, and
+    the primary keys of the handles are not set.
+    """
+    fields = [field for field in Handle._meta.concrete_fields if not field.primary_key]
+    handles = iter(handles)
+    inserted = 0
+    with transaction.atomic():
+        while batch := list(islice(handles, batch_size)):
+            Handle.objects._insert(batch, fields=fields, raw=True)
+            inserted += len(batch)
+    return inserted
+
+
+def _fedora2_shape(rng):
+    pid = f"umd:{rng.randint(1, 999999)}"
+    return f"https://digital.lib.umd.edu/resultsnew/id/{pid}", pid
+
+
+def _fcrepo_shape(rng):
+    item_uuid = uuid.UUID(int=rng.getrandbits(128), version=4)
+    pairtree = '/'.join(str(item_uuid)[i:i + 2] for i in range(0, 8, 2))
+    repo_id = f"https://fcrepo.lib.umd.edu/fcrepo/rest/dc/{rng.randint(2014, 2025)}/1/{pairtree}/{item_uuid}"
+    return f"https://digital.lib.umd.edu/result/id/{item_uuid}", repo_id
+
+
+def _avalon_shape(rng):
+    noid = ''.join(rng.choice(NOID_CHARACTERS) for _ in range(9))
+    return f"https://av.lib.umd.edu/media_objects/{noid}", noid
+
+
+def _aspace_shape(rng):
+    path = f"/repositories/{rng.randint(2, 5)}/{rng.choice(['resources', 'archival_objects'])}/{rng.randint(1, 250000)}"
+    return f"https://archives.lib.umd.edu{path}", path
+
+
+REPO_SHAPES = {
+    'aspace': _aspace_shape,
+    'avalon': _avalon_shape,
+    'fcrepo': _fcrepo_shape,
+    'fedora2': _fedora2_shape,
+}
+
+
+def _words(rng, mean_length):
+    """
+    Returns a string of random words, with a log-normally distributed length
+    (in characters) around "mean_length".
+    """
+    length = max(1, int(rng.lognormvariate(0, 0.6) * mean_length))
+    words = []
+    while sum(len(w) + 1 for w in words) < length:
+        words.append(rng.choice(WORDS))
+    return ' '.join(words).capitalize()
+
+
+def _description(rng):
+    # About a third of handles have no description, the rest have a
+    # title-length description
+    return '' if rng.random() < 0.3 else _words(rng, 40)
+
+
+def _notes(rng):
+    # Most handles have no notes, but some have long notes
+    return '' if rng.random() < 0.85 else _words(rng, 200)
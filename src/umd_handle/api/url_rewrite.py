@@ -0,0 +1,136 @@
+"""
+Bulk rewriting of handle URLs, i.e., when a repository moves to a new
+hostname.
+
+URLs are rewritten in chunks of handles (in "id" order), each in its own
+transaction. Prefix substitutions are applied by a single set-based UPDATE
+for each chunk. Regular expression substitutions are applied in Python (as
+regular expression support differs between databases), and written using a
+single bulk UPDATE for each chunk.
+
+Each rewritten URL is recorded in the handle history.
+"""
+import re
+from collections import namedtuple
+
+from django.core.exceptions import ValidationError
+from django.db import transaction
+from django.db.models import CharField, Value
+from django.db.models.functions import Concat, Substr
+from django.utils import timezone
+
+from .history import record_bulk_update
+from .models import Handle, validate_url
+
+DEFAULT_CHUNK_SIZE = 1000
+
+# Columns of the CSV audit output
+AUDIT_CSV_HEADER = ['handle', 'old_url', 'new_url']
+
+# "matched" - handles with URLs matching the pattern
+# "rewritten" - handles with rewritten URLs (or that would be rewritten, for
+#               a dry run)
+# "invalid" - handles skipped, because the rewritten URL is not valid
+RewriteResult = namedtuple('RewriteResult', ['matched', 'rewritten', 'invalid'])
+
+
+class UrlRewrite:
+    """
+    A URL substitution, replacing either a URL prefix, or the matches of a
+    regular expression.
+    """
+
+    def __init__(self, pattern, replacement, regex=False):
+        if not pattern:
+            raise ValueError('The pattern to replace is required')
+        self.pattern = pattern
+        self.replacement = replacement
+        self.regex = re.compile(pattern) if regex else None
+
+    def filter(self, queryset):
+        """
+        Returns the queryset limited (as far as is possible in the database)
+        to handles with URLs that may match.
+        """
+        if self.regex:
+            return queryset
+        return queryset.filter(url__startswith=self.pattern)
+
+    def apply(self, url):
+        """
+        Returns the rewritten URL, or None if the URL does not match.
+        """
+        if self.regex:
+            new_url, count = self.regex.subn(self.replacement, url)
+            return new_url if count else None
+        if url.startswith(self.pattern):
+            return self.replacement + url[len(self.pattern):]
+        return None
+
+
+def rewrite_urls(queryset, rewrite, dry_run=False, chunk_size=DEFAULT_CHUNK_SIZE, actor='', audit=None):
+    """
+    Rewrites the URLs of the handles in the queryset using the given
+    UrlRewrite, returning a RewriteResult.
+
+    When "audit" (a "csv.writer") is provided, a row is written for each
+    rewritten URL. Handles with rewritten URLs that are not valid are not
+    changed.
+    """
+    matches = rewrite.filter(queryset).order_by('id')
+    matched = rewritten = invalid = 0
+    last_id = 0
+
+    while True:
+        with transaction.atomic():
+            chunk = matches.filter(id__gt=last_id)
+            if not dry_run:
+                chunk = chunk.select_for_update()
+            rows = list(chunk.values('id', 'prefix', 'suffix', 'url')[:chunk_size])
+            if not rows:
+                break
+            last_id = rows[-1]['id']
+
+            changes = []
+            for row in rows:
+                new_url = rewrite.apply(row['url'])
+                if new_url is None or new_url == row['url']:
+                    continue
+                matched += 1
+                try:
+                    validate_url(new_url)
+                except ValidationError:
+                    invalid += 1
+                    continue
+                changes.append((row, new_url))
+
+            if changes and not dry_run:
+                _update_chunk(rewrite, changes, actor)
+            rewritten += len(changes)
+
+        if audit is not None:
+            for row, new_url in changes:
+                audit.writerow([f"{row['prefix']}/{row['suffix']}", row['url'], new_url])
+
+    return RewriteResult(matched, rewritten, invalid)
+
+
+def _update_chunk(rewrite, changes, actor):
+    now = timezone.now()
+    ids = [row['id'] for row, _ in changes]
+    if rewrite.regex:
+        Handle.objects.bulk_update(
+            [Handle(id=row['id'], url=new_url, modified=now) for row, new_url in changes],
+            ['url', 'modified'],
+        )
+    else:
+        Handle.objects.filter(id__in=ids).update(
+            url=Concat(Value(rewrite.replacement), Substr('url', len(rewrite.pattern) + 1), output_field=CharField()),
+            modified=now,
+        )
+
+    record_bulk_update(
+        [(row, {'url': row['url']}, {'url': new_url}) for row, new_url in changes],
+        actor,
+        now,
+    )
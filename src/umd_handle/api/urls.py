@@ -10,8 +10,8 @@ urlpatterns = [
     ),
     path(
         "v1/handles",
-        views.handles_mint_new_handle,
-        name="handles_mint_new_handle"
+        views.handles,
+        name="handles"
     ),
     path(
         "v1/handles/exists",
@@ -23,4 +23,14 @@ urlpatterns = [
         views.handles_info,
         name="handles_info"
     ),
+    path(
+        "v1/handles/changes",
+        views.handles_changes,
+        name="handles_changes"
+    ),
+    path(
+        "v1/handles/stats",
+        views.handles_stats,
+        name="handles_stats"
+    ),
 ]
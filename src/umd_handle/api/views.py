@@ -1,11 +1,22 @@
 import json
+from django.conf import settings
+from django.db import transaction
 from django.shortcuts import get_object_or_404
-from django.http import Http404, HttpResponseNotAllowed, JsonResponse
+from django.http import Http404, HttpResponseNotAllowed, JsonResponse, StreamingHttpResponse
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
 from django.views.decorators.http import require_http_methods
 from django.views.decorators.csrf import csrf_exempt
 from django.core.exceptions import ValidationError
 
-from .models import Handle, mint_new_handle
+from .changes import change_record, changed_handles
+from .conditional import PreconditionFailed, conditional_update, handle_etag, if_match_versions
+from .cursors import ORDERINGS, InvalidCursor, after_cursor, encode_cursor
+from .history import handle_values, record_create, record_update, request_actor
+from .hits import record_hit
+from .mint_keys import IdempotencyKeyReused, claim_idempotency_key, claim_repo_key, set_handle
+from .models import Handle, HandleStats, mint_new_handle
+from .rewrite_rules import rewrite_url
 
 @csrf_exempt
 def handles_exists(request):
@@ -38,7 +49,7 @@ def handles_exists(request):
                 'handle_url': handle.handle_url(),
                 'prefix': handle.prefix,
                 'suffix': str(handle.suffix),
-                'url': handle.url,
+                'url': rewrite_url(handle.url, handle.repo),
                 'request': request_dict
             }
         else:
@@ -81,7 +92,7 @@ def handles_info(request):
                 'handle_url': handle.handle_url(),
                 'repo': handle.repo,
                 'repo_id': handle.repo_id,
-                'url': handle.url,
+                'url': rewrite_url(handle.url, handle.repo),
                 'request': request_dict
             }
         else:
@@ -93,6 +104,36 @@ def handles_info(request):
         return JsonResponse(json_response)
 
 
+@csrf_exempt
+@require_http_methods(["GET"])
+def handles_changes(request):
+    """
+    Streams the handles modified after the "since" cursor (or all handles, if
+    "since" is not provided), oldest first, as newline-delimited JSON. Each
+    line contains a "cursor" that can be provided as the "since" parameter to
+    continue after that change. The optional "limit" parameter limits the
+    number of changes returned.
+    """
+    since = request.GET.get('since', '')
+    limit = request.GET.get('limit', '')
+
+    if limit:
+        try:
+            limit = int(limit)
+            if limit < 1:
+                raise ValueError()
+        except ValueError:
+            return JsonResponse({'errors': ["'limit' parameter must be a positive integer"]}, status=400)
+
+    try:
+        changes = changed_handles(since=since or None, limit=limit or None)
+    except InvalidCursor as e:
+        return JsonResponse({'errors': [str(e)]}, status=400)
+
+    lines = (json.dumps(change_record(cursor, handle)) + '\n' for cursor, handle in changes)
+    return StreamingHttpResponse(lines, content_type='application/x-ndjson')
+
+
 @csrf_exempt
 def handles_prefix_suffix(request, prefix, suffix):
     """
@@ -100,6 +141,12 @@ def handles_prefix_suffix(request, prefix, suffix):
     handle is found.
     """
     try:
+        if request.method == 'PATCH' and 'HTTP_IF_MATCH' in request.META:
+            versions = if_match_versions(request.META['HTTP_IF_MATCH'])
+            # "If-Match: *" matches any version, so is an unconditional update
+            if versions is not None:
+                return handles_prefix_suffix_conditional_patch(request, prefix, suffix, versions)
+
         handle = get_object_or_404(Handle, prefix=prefix, suffix=suffix)
 
         if request.method == 'GET':
@@ -118,14 +165,16 @@ def handles_prefix_suffix(request, prefix, suffix):
 def handles_prefix_suffix_get(handle):
     """
     For GET requests to the "handles_prefix_suffix" endpoint, returns a
-    JsonResponse containing the URL associated with the given handle.
+    JsonResponse containing the URL associated with the given handle, after
+    applying any URL rewrite rules.
 
     Returns a JsonResponse on success or error.
     """
+    record_hit(handle)
     json_response = {
-        "url": f"{handle.url}"
+        "url": rewrite_url(handle.url, handle.repo)
     }
-    return JsonResponse(json_response)
+    return JsonResponse(json_response, headers={'ETag': handle_etag(handle)})
 
 
 def handles_prefix_suffix_patch(request, handle):
@@ -137,35 +186,83 @@ def handles_prefix_suffix_patch(request, handle):
     """
 
     try:
-        body = request.body.decode('utf-8')
-        data = json.loads(body) if body else {}
-    except json.JSONDecodeError:
+        data = _patch_data(request)
+    except (TypeError, ValueError):
         return JsonResponse({'errors': ['Invalid JSON']}, status=400)
 
-    allowed_fields = ['repo', 'repo_id', 'url', 'description', 'notes']
-
-    for key in allowed_fields:
-        if key in data:
-            setattr(handle, key, data.get(key))
+    before = handle_values(handle)
+    changed_fields = []
+    for key, value in data.items():
+        if value != before[key]:
+            setattr(handle, key, value)
+            changed_fields.append(key)
 
     try:
-        handle.full_clean()
-        handle.save()
+        # Only the changed fields are validated and saved, and an unchanged
+        # handle is not saved at all
+        if changed_fields:
+            handle.validate_fields(changed_fields)
+            handle.save_validated(update_fields=changed_fields + ['modified'])
+            record_update(handle, before, request_actor(request))
     except ValidationError as e:
-        messages = []
-        if hasattr(e, 'message_dict'):
-            for v in e.message_dict.values():
-                if isinstance(v, (list, tuple)):
-                    messages.extend([str(x) for x in v])
-                else:
-                    messages.append(str(v))
-        else:
-            messages = list(e.messages)
-        return JsonResponse({'errors': messages}, status=400)
+        return JsonResponse({'errors': _validation_messages(e)}, status=400)
     except Exception as e:
         return JsonResponse({'errors': [str(e)]}, status=400)
 
-    # Success response
+    return _patch_response(handle)
+
+
+def handles_prefix_suffix_conditional_patch(request, prefix, suffix, versions):
+    """
+    For PATCH requests to the "handles_prefix_suffix" endpoint with an
+    "If-Match" header, updates the given fields of the handle only if it has
+    one of the versions in the header, without first reading the handle (see
+    "umd_handle.api.conditional").
+
+    Returns a JsonResponse on success or error, with a 412 status if the
+    handle has been modified.
+    """
+    try:
+        data = _patch_data(request)
+    except (TypeError, ValueError):
+        return JsonResponse({'errors': ['Invalid JSON']}, status=400)
+
+    try:
+        # Validate the given fields, on an unsaved handle
+        values = Handle(**data)
+        values.validate_fields(list(data))
+        handle, before = conditional_update(prefix, suffix, versions, {key: getattr(values, key) for key in data})
+        record_update(handle, before, request_actor(request))
+    except Handle.DoesNotExist:
+        return JsonResponse({}, status=404)
+    except PreconditionFailed as e:
+        return JsonResponse({'errors': [str(e)]}, status=412)
+    except ValidationError as e:
+        return JsonResponse({'errors': _validation_messages(e)}, status=400)
+    except Exception as e:  # noqa: BLE001 - reported as for an unconditional PATCH
+        return JsonResponse({'errors': [str(e)]}, status=400)
+
+    return _patch_response(handle)
+
+
+# The fields that can be updated by a PATCH request
+PATCH_FIELDS = ['repo', 'repo_id', 'url', 'description', 'notes']
+
+
+def _patch_data(request):
+    """
+    Returns the fields to update from the JSON body of a PATCH request,
+    raising ValueError if the body is not valid JSON, or TypeError if it is
+    not a JSON object.
+    """
+    body = request.body.decode('utf-8')
+    data = json.loads(body) if body else {}
+    if not isinstance(data, dict):
+        raise TypeError('JSON body must be an object')
+    return {key: data.get(key) for key in PATCH_FIELDS if key in data}
+
+
+def _patch_response(handle):
     json_response = {
         'handle_url': handle.handle_url(),
         'request': {
@@ -175,10 +272,181 @@ def handles_prefix_suffix_patch(request, handle):
             'url': handle.url
         }
     }
+    return JsonResponse(json_response, headers={'ETag': handle_etag(handle)})
+
+
+def _validation_messages(e):
+    """
+    Returns the list of messages of a ValidationError.
+    """
+    messages = []
+    if hasattr(e, 'message_dict'):
+        for v in e.message_dict.values():
+            if isinstance(v, (list, tuple)):
+                messages.extend([str(x) for x in v])
+            else:
+                messages.append(str(v))
+    else:
+        messages = list(e.messages)
+    return messages
+
+
+# The orderings of the "handles_stats" endpoint
+STATS_ORDERINGS = {
+    'hits': ['-hits', 'id'],
+    'last_accessed': ['-last_accessed', 'id'],
+}
+
+
+@csrf_exempt
+@require_http_methods(["GET"])
+def handles_stats(request):
+    """
+    Returns the most resolved handles (the default), or the most recently
+    resolved handles, when the "order" parameter is "last_accessed", with the
+    number of times each handle was resolved, and when it was last resolved.
+    The number of handles is limited to "limit" (capped at the
+    HANDLES_LIST_MAX_PAGE_SIZE setting), and may be filtered by the "repo"
+    and "prefix" parameters.
+
+    Returns a JsonResponse on success or error.
+    """
+    params = {key: request.GET[key] for key in ['repo', 'prefix', 'order', 'limit'] if request.GET.get(key)}
+    ordering = params.get('order', 'hits')
+
+    errors = []
+    if ordering not in STATS_ORDERINGS:
+        errors.append(f"'order' parameter must be one of: {', '.join(STATS_ORDERINGS)}")
+
+    limit = settings.HANDLES_LIST_DEFAULT_PAGE_SIZE
+    if 'limit' in params:
+        try:
+            limit = int(params['limit'])
+            if limit < 1:
+                raise ValueError()
+        except ValueError:
+            errors.append("'limit' parameter must be a positive integer")
+    limit = min(limit, settings.HANDLES_LIST_MAX_PAGE_SIZE)
+
+    if errors:
+        return JsonResponse({'errors': errors}, status=400)
+
+    queryset = HandleStats.objects.select_related('handle').filter(last_accessed__isnull=False)
+    if 'repo' in params:
+        queryset = queryset.filter(handle__repo=params['repo'])
+    if 'prefix' in params:
+        queryset = queryset.filter(handle__prefix=params['prefix'])
+
+    json_response = {
+        'handles': [
+            {
+                **stats.handle.to_dict(),
+                'hits': stats.hits,
+                'last_accessed': stats.last_accessed.isoformat(),
+            }
+            for stats in queryset.order_by(*STATS_ORDERINGS[ordering])[:limit]
+        ],
+        'request': params,
+    }
     return JsonResponse(json_response)
 
 
 @csrf_exempt
+def handles(request):
+    """
+    Lists handles (GET), or mints a new handle (POST).
+    """
+    if request.method == 'GET':
+        return handles_list(request)
+    elif request.method == 'POST':
+        return handles_mint_new_handle(request)
+    else:
+        # Return 405 Method Not Allowed for any other method
+        return HttpResponseNotAllowed(['GET', 'POST'])
+
+
+def handles_list(request):
+    """
+    For GET requests to the "handles" endpoint, returns a page of handles,
+    optionally filtered by the "repo", "prefix", "modified_after" and
+    "modified_before" parameters.
+
+    Handles are ordered by prefix/suffix (the default), or by modified date
+    when the "order" parameter is "modified". Pages are retrieved using the
+    opaque "next_cursor" value from the previous page as the "cursor"
+    parameter, and are limited to "limit" handles (capped at the
+    HANDLES_LIST_MAX_PAGE_SIZE setting).
+
+    Returns a JsonResponse on success or error.
+    """
+    params = {
+        key: request.GET[key]
+        for key in ['repo', 'prefix', 'modified_after', 'modified_before', 'order', 'limit', 'cursor']
+        if request.GET.get(key)
+    }
+    ordering = params.get('order', 'handle')
+
+    errors = []
+    if ordering not in ORDERINGS:
+        errors.append(f"'order' parameter must be one of: {', '.join(ORDERINGS)}")
+
+    limit = settings.HANDLES_LIST_DEFAULT_PAGE_SIZE
+    if 'limit' in params:
+        try:
+            limit = int(params['limit'])
+            if limit < 1:
+                raise ValueError()
+        except ValueError:
+            errors.append("'limit' parameter must be a positive integer")
+    limit = min(limit, settings.HANDLES_LIST_MAX_PAGE_SIZE)
+
+    queryset = Handle.objects.all()
+    if 'repo' in params:
+        queryset = queryset.filter(repo=params['repo'])
+    if 'prefix' in params:
+        queryset = queryset.filter(prefix=params['prefix'])
+    for key, lookup in [('modified_after', 'modified__gt'), ('modified_before', 'modified__lt')]:
+        if key in params:
+            timestamp = _parse_timestamp(params[key])
+            if timestamp is None:
+                errors.append(f"'{key}' parameter must be an ISO 8601 timestamp")
+            else:
+                queryset = queryset.filter(**{lookup: timestamp})
+
+    if errors:
+        return JsonResponse({'errors': errors}, status=400)
+
+    try:
+        queryset = after_cursor(queryset, ordering, params.get('cursor'))
+    except InvalidCursor as e:
+        return JsonResponse({'errors': [str(e)]}, status=400)
+
+    # Retrieve one extra handle to determine whether there is another page
+    page = list(queryset[:limit + 1])
+    next_cursor = encode_cursor(ordering, page[limit - 1]) if len(page) > limit else None
+
+    json_response = {
+        'handles': [handle.to_dict() for handle in page[:limit]],
+        'next_cursor': next_cursor,
+        'request': params,
+    }
+    return JsonResponse(json_response)
+
+
+def _parse_timestamp(value):
+    """
+    Returns the timezone-aware datetime for the given ISO 8601 string, or None
+    if it is not valid.
+    """
+    try:
+        timestamp = parse_datetime(value)
+    except ValueError:
+        return None
+    if timestamp is not None and timezone.is_naive(timestamp):
+        timestamp = timezone.make_aware(timestamp, timezone.get_default_timezone())
+    return timestamp
+
+
 @require_http_methods(["POST"])
 def handles_mint_new_handle(request):
     """
@@ -206,26 +474,23 @@ def handles_mint_new_handle(request):
     if errors:
         return JsonResponse({'errors': errors}, status=400)
 
+    idempotency_header = request.headers.get('Idempotency-Key')
+    if idempotency_header is not None and not 0 < len(idempotency_header) <= 255:
+        return JsonResponse({'errors': ["'Idempotency-Key' header must be 1 to 255 characters"]}, status=400)
+
     try:
-        handle = mint_new_handle(
-            prefix=data['prefix'],
-            url=data['url'],
-            repo=data['repo'],
-            repo_id=data['repo_id'],
-            description=data.get('description', ''),
-            notes=data.get('notes', ''),
-        )
-    except ValidationError as e:
-        messages = []
-        if hasattr(e, 'message_dict'):
-            for v in e.message_dict.values():
-                if isinstance(v, (list, tuple)):
-                    messages.extend([str(x) for x in v])
-                else:
-                    messages.append(str(v))
+        if idempotency_header is None and not settings.MINT_RETURNS_EXISTING_HANDLE:
+            handle = _mint(data)
+            record_create(handle, request_actor(request))
         else:
-            messages = list(e.messages)
-        return JsonResponse({'errors': messages}, status=400)
+            with transaction.atomic():
+                handle, created = _mint_once(request, data, idempotency_header)
+            if created:
+                record_create(handle, request_actor(request))
+    except IdempotencyKeyReused as e:
+        return JsonResponse({'errors': [str(e)]}, status=422)
+    except ValidationError as e:
+        return JsonResponse({'errors': _validation_messages(e)}, status=400)
     except Exception as e:
         return JsonResponse({'errors': [str(e)]}, status=400)
 
@@ -239,5 +504,45 @@ def handles_mint_new_handle(request):
                 'repo_id':data['repo_id'],
                 'url':data['url']
             }
-        }
+        },
+        headers={'ETag': handle_etag(handle)}
     )
+
+
+def _mint(data):
+    return mint_new_handle(
+        prefix=data['prefix'],
+        url=data['url'],
+        repo=data['repo'],
+        repo_id=data['repo_id'],
+        description=data.get('description', ''),
+        notes=data.get('notes', ''),
+    )
+
+
+def _mint_once(request, data, idempotency_header):
+    """
+    Mints a handle for the request, unless the "Idempotency-Key" header, or
+    the repository item (if MINT_RETURNS_EXISTING_HANDLE is True), already
+    has a handle (see "umd_handle.api.mint_keys").
+
+    Returns a (handle, created) tuple. Must be called in a transaction, so
+    that the keys remain locked until the handle is committed.
+    """
+    mint_keys = []
+    if idempotency_header is not None:
+        mint_key = claim_idempotency_key(getattr(request, 'jwt_token', ''), idempotency_header, data)
+        if mint_key.handle_id is not None:
+            return mint_key.handle, False
+        mint_keys.append(mint_key)
+
+    if settings.MINT_RETURNS_EXISTING_HANDLE:
+        mint_key = claim_repo_key(data['prefix'], data['repo'], data['repo_id'])
+        if mint_key.handle_id is not None:
+            set_handle(mint_keys, mint_key.handle)
+            return mint_key.handle, False
+        mint_keys.append(mint_key)
+
+    handle = _mint(data)
+    set_handle(mint_keys, handle)
+    return handle, True
@@ -1,7 +1,112 @@
-from django.http import HttpResponse
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connection
+from django.db.migrations.executor import MigrationExecutor
+from django.http import HttpResponse, JsonResponse
+
+# Checks are run in worker threads, so that a hung database or cache
+# connection cannot block the probe for longer than the timeout.
+_executor = ThreadPoolExecutor(max_workers=4, thread_name_prefix='readiness-check')
+
+# The most recent readiness result, as a (expiry time, status, body) tuple
+_cached_result = None
+_cached_result_lock = threading.Lock()
+
 
 def health_check(request):
     """
     Simple health check endpoint that returns an HTTP 200 OK response.
     """
-    return HttpResponse("OK", status=200)
\ No newline at end of file
+    return HttpResponse("OK", status=200)
+
+
+def health_check_ready(request):
+    """
+    Readiness check endpoint that verifies that the database and cache are
+    reachable, and that there are no unapplied migrations.
+
+    Returns an HTTP 200 response if all the checks pass, or an HTTP 503
+    response otherwise. The JSON body contains the status and latency of
+    each check. Results are cached for READINESS_CACHE_SECONDS, so that
+    frequent probes do not add load.
+    """
+    global _cached_result
+
+    with _cached_result_lock:
+        if _cached_result is None or _cached_result[0] <= time.monotonic():
+            status, body = run_readiness_checks()
+            _cached_result = (time.monotonic() + settings.READINESS_CACHE_SECONDS, status, body)
+        _, status, body = _cached_result
+
+    return JsonResponse(body, status=status)
+
+
+def run_readiness_checks():
+    """
+    Runs each of the readiness checks, returning an (HTTP status, body) tuple.
+    """
+    checks = {
+        'database': check_database,
+        'cache': check_cache,
+    }
+    if settings.READINESS_CHECK_MIGRATIONS:
+        checks['migrations'] = check_migrations
+
+    futures = {name: (time.perf_counter(), _executor.submit(check)) for name, check in checks.items()}
+
+    results = {}
+    for name, (start, future) in futures.items():
+        remaining = max(0, start + settings.READINESS_CHECK_TIMEOUT - time.perf_counter())
+        try:
+            result = {'status': 'ok', **(future.result(timeout=remaining) or {})}
+        except TimeoutError:
+            result = {'status': 'error', 'error': f"Timed out after {settings.READINESS_CHECK_TIMEOUT}s"}
+        except Exception as e:  # noqa: BLE001 - any failure means the server is not ready
+            result = {'status': 'error', 'error': str(e)}
+        result['latency_ms'] = round((time.perf_counter() - start) * 1000, 3)
+        results[name] = result
+
+    ok = all(result['status'] == 'ok' for result in results.values())
+    return (200 if ok else 503), {'status': 'ok' if ok else 'error', 'checks': results}
+
+
+def check_database():
+    """
+    Verifies that a database connection can be opened and queried.
+    """
+    try:
+        with connection.cursor() as cursor:
+            cursor.execute('SELECT 1')
+            cursor.fetchone()
+    finally:
+        # Worker thread connections are not closed by the request cycle
+        connection.close()
+
+
+def check_cache():
+    """
+    Verifies that a value can be written to, and read from, the cache.
+    """
+    value = str(time.time())
+    cache.set('health_check_ready', value, 30)
+    if cache.get('health_check_ready') != value:
+        raise RuntimeError('Value written to cache could not be read back')
+
+
+def check_migrations():
+    """
+    Verifies that all the database migrations have been applied.
+    """
+    try:
+        executor = MigrationExecutor(connection)
+        plan = executor.migration_plan(executor.loader.graph.leaf_nodes())
+    finally:
+        connection.close()
+
+    if plan:
+        raise RuntimeError(f"{len(plan)} unapplied migration(s)")
+    return {'pending': 0}
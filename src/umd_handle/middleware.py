@@ -1,8 +1,50 @@
 import jwt
+import math
+import time
+from importlib import import_module
+
+from djangosaml2.middleware import SamlSessionMiddleware as BaseSamlSessionMiddleware
 from django.shortcuts import HttpResponseRedirect, reverse
 from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connection
 from django.http import JsonResponse
 
+from umd_handle.profiling import QueryProfiler, log_slow_query, log_slow_request
+from umd_handle.rate_limit import CacheRateLimiter, ConcurrencyLimiter, LocalRateLimiter, token_key
+
+
+class QueryProfilingMiddleware:
+    """
+    Records the number of SQL queries, and the total database time, for each
+    request, and reports them in a "Server-Timing" response header.
+
+    Requests, and individual queries, that exceed the SLOW_REQUEST_THRESHOLD_MS
+    and SLOW_QUERY_THRESHOLD_MS settings are written to the slow log.
+
+    Only enabled when the QUERY_PROFILING_ENABLED setting is True.
+    """
+    def __init__(self, get_response):
+        if not settings.QUERY_PROFILING_ENABLED:
+            raise MiddlewareNotUsed()
+        self.get_response = get_response
+
+    def __call__(self, request):
+        profiler = QueryProfiler(settings.SLOW_QUERY_THRESHOLD_MS)
+        start = time.perf_counter()
+        with connection.execute_wrapper(profiler):
+            response = self.get_response(request)
+        total_ms = (time.perf_counter() - start) * 1000
+
+        response['Server-Timing'] = profiler.server_timing(total_ms)
+
+        for query in profiler.slow_queries:
+            log_slow_query(request, query)
+        if total_ms >= settings.SLOW_REQUEST_THRESHOLD_MS:
+            log_slow_request(request, response, profiler, total_ms)
+
+        return response
+
 
 class LoginRequiredMiddleware:
     def __init__(self, get_response):
@@ -28,6 +70,18 @@ class LoginRequiredMiddleware:
         return response
 
 
+class SamlSessionMiddleware(BaseSamlSessionMiddleware):
+    """
+    djangosaml2 SAML session middleware, storing the SAML session using the
+    SAML_SESSION_ENGINE setting (instead of SESSION_ENGINE), so that the SAML
+    session can be kept out of the database, independently of the admin
+    interface session.
+    """
+    def __init__(self, get_response):
+        super().__init__(get_response)
+        self.SessionStore = import_module(settings.SAML_SESSION_ENGINE).SessionStore
+
+
 class JWTAuthenticationMiddleware:
     def __init__(self, get_response):
         self.get_response = get_response
@@ -42,7 +96,9 @@ class JWTAuthenticationMiddleware:
         if len(auth_header) == 2 and auth_header[0].lower() == 'bearer':
             jwt_token = auth_header[1]
             if self.verify_jwt_token(jwt_token):
-                # Token verified
+                # Token verified -- kept on the request to identify the
+                # client (i.e., in the handle history)
+                request.jwt_token = jwt_token
                 return  self.get_response(request)
             else:
                 # Invalid token
@@ -61,3 +117,62 @@ class JWTAuthenticationMiddleware:
             return (role == 'rest_api')
         except (KeyError, jwt.ExpiredSignatureError, jwt.DecodeError):
             return False
+
+
+class APIRateLimitMiddleware:
+    """
+    Limits the rate of REST API requests for each JWT token, so that a single
+    client cannot use all the server threads.
+
+    Requests are limited by token buckets with separate limits for reads,
+    and for writes (minting and updating handles), and by the number of
+    in-flight requests for each token. Requests over a limit receive an
+    HTTP 429 response, with a "Retry-After" header.
+
+    Must follow JWTAuthenticationMiddleware, which identifies the token.
+    Only enabled when the API_RATE_LIMIT_ENABLED setting is True.
+    """
+    WRITE_METHODS = ('POST', 'PUT', 'PATCH', 'DELETE')
+
+    def __init__(self, get_response):
+        if not settings.API_RATE_LIMIT_ENABLED:
+            raise MiddlewareNotUsed()
+        self.get_response = get_response
+
+        limits = {
+            'read': (settings.API_RATE_LIMIT_READ_RATE, settings.API_RATE_LIMIT_READ_BURST),
+            'write': (settings.API_RATE_LIMIT_WRITE_RATE, settings.API_RATE_LIMIT_WRITE_BURST),
+        }
+        if settings.API_RATE_LIMIT_CACHE:
+            self.rate_limiter = CacheRateLimiter(limits, settings.API_RATE_LIMIT_CACHE)
+        else:
+            self.rate_limiter = LocalRateLimiter(limits)
+
+        max_concurrent = settings.API_MAX_CONCURRENT_REQUESTS_PER_TOKEN
+        self.concurrency_limiter = ConcurrencyLimiter(max_concurrent) if max_concurrent else None
+
+    def __call__(self, request):
+        jwt_token = getattr(request, 'jwt_token', None)
+        if not jwt_token:
+            return self.get_response(request)
+
+        key = token_key(jwt_token)
+        limit = 'write' if request.method in self.WRITE_METHODS else 'read'
+        retry_after = self.rate_limiter.take(key, limit)
+        if retry_after:
+            return self.too_many_requests(f"Rate limit exceeded for {limit} requests", retry_after)
+
+        if self.concurrency_limiter is None:
+            return self.get_response(request)
+
+        if not self.concurrency_limiter.acquire(key):
+            return self.too_many_requests('Too many concurrent requests', 1)
+        try:
+            return self.get_response(request)
+        finally:
+            self.concurrency_limiter.release(key)
+
+    def too_many_requests(self, error, retry_after):
+        response = JsonResponse({'error': error}, status=429)
+        response['Retry-After'] = str(max(1, math.ceil(retry_after)))
+        return response
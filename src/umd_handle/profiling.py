@@ -0,0 +1,77 @@
+import json
+import logging
+import time
+
+logger = logging.getLogger('umd_handle.slow_log')
+
+
+class QueryProfiler:
+    """
+    Database "execute wrapper" (see
+    https://docs.djangoproject.com/en/5.2/topics/db/instrumentation/) that
+    records the number of queries, and the time spent executing them.
+    """
+
+    def __init__(self, slow_query_threshold_ms):
+        self.slow_query_threshold_ms = slow_query_threshold_ms
+        self.count = 0
+        self.duration_ms = 0.0
+        self.slow_queries = []
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            duration_ms = (time.perf_counter() - start) * 1000
+            self.count += 1
+            self.duration_ms += duration_ms
+            if duration_ms >= self.slow_query_threshold_ms:
+                self.slow_queries.append({'duration_ms': round(duration_ms, 3), 'sql': sql})
+
+    def server_timing(self, total_ms):
+        """
+        Returns the value for the "Server-Timing" response header.
+        """
+        return (
+            f'db;desc="{self.count} queries";dur={self.duration_ms:.3f}, '
+            f'total;dur={total_ms:.3f}'
+        )
+
+
+def log_slow_query(request, query):
+    """
+    Writes a slow query entry to the slow log, as a JSON object.
+    """
+    entry = {
+        'event': 'slow_query',
+        'method': request.method,
+        'path': request.path,
+        'url_name': _url_name(request),
+        **query,
+    }
+    logger.warning(json.dumps(entry))
+
+
+def log_slow_request(request, response, profiler, total_ms):
+    """
+    Writes a slow request entry to the slow log, as a JSON object. The entry
+    includes the SQL of the slowest queries made by the request.
+    """
+    entry = {
+        'event': 'slow_request',
+        'method': request.method,
+        'path': request.path,
+        'url_name': _url_name(request),
+        'status': response.status_code,
+        'duration_ms': round(total_ms, 3),
+        'db_duration_ms': round(profiler.duration_ms, 3),
+        'queries': profiler.count,
+        'slow_queries': sorted(profiler.slow_queries, key=lambda q: q['duration_ms'], reverse=True)[:5],
+    }
+    logger.warning(json.dumps(entry))
+
+
+def _url_name(request):
+    resolver_match = getattr(request, 'resolver_match', None)
+    return resolver_match.url_name if resolver_match else None
@@ -0,0 +1,128 @@
+import hashlib
+import math
+import threading
+import time
+
+from django.core.cache import caches
+
+
+class TokenBucket:
+    """
+    Token bucket holding up to "burst" tokens, refilled at "rate" tokens per
+    second. Each request takes one token.
+    """
+
+    def __init__(self, rate, burst, now):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = float(burst)
+        self.updated = now
+
+    def take(self, now):
+        """
+        Takes a token from the bucket, returning 0 if successful, or the
+        number of seconds until a token is available.
+        """
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return 0
+        return (1 - self.tokens) / self.rate
+
+
+class LocalRateLimiter:
+    """
+    Rate limiter keeping a token bucket for each key in (process) memory.
+    """
+
+    def __init__(self, limits):
+        # Maps a limit name to a (rate, burst) tuple
+        self.limits = limits
+        self.buckets = {}
+        self.lock = threading.Lock()
+
+    def take(self, key, limit):
+        """
+        Returns 0 if the request for the key is allowed, otherwise the number
+        of seconds until it would be allowed.
+        """
+        now = time.monotonic()
+        with self.lock:
+            bucket = self.buckets.get((key, limit))
+            if bucket is None:
+                rate, burst = self.limits[limit]
+                bucket = self.buckets[(key, limit)] = TokenBucket(rate, burst, now)
+            return bucket.take(now)
+
+
+class CacheRateLimiter:
+    """
+    Rate limiter shared between processes, using the given Django cache.
+
+    As the cache does not support atomic updates of a bucket, each bucket is
+    approximated by a fixed window of "burst / rate" seconds that allows
+    "burst" requests, counted using atomic cache increments.
+    """
+
+    def __init__(self, limits, cache_alias):
+        self.limits = limits
+        self.cache = caches[cache_alias]
+
+    def take(self, key, limit):
+        rate, burst = self.limits[limit]
+        window = burst / rate
+        now = time.time()
+        window_number = int(now // window)
+        cache_key = f"rate_limit:{key}:{limit}:{window_number}"
+
+        self.cache.add(cache_key, 0, timeout=math.ceil(window) + 1)
+        try:
+            count = self.cache.incr(cache_key)
+        except ValueError:
+            # The window expired between "add" and "incr"
+            self.cache.add(cache_key, 1, timeout=math.ceil(window) + 1)
+            count = 1
+
+        if count <= burst:
+            return 0
+        return (window_number + 1) * window - now
+
+
+class ConcurrencyLimiter:
+    """
+    Limits the number of in-flight requests for each key, in this process.
+    """
+
+    def __init__(self, max_concurrent):
+        self.max_concurrent = max_concurrent
+        self.in_flight = {}
+        self.lock = threading.Lock()
+
+    def acquire(self, key):
+        """
+        Returns True (and counts the request as in-flight) if the key has
+        fewer than the maximum number of in-flight requests, otherwise False.
+        """
+        with self.lock:
+            count = self.in_flight.get(key, 0)
+            if count >= self.max_concurrent:
+                return False
+            self.in_flight[key] = count + 1
+            return True
+
+    def release(self, key):
+        with self.lock:
+            count = self.in_flight[key] - 1
+            if count:
+                self.in_flight[key] = count
+            else:
+                del self.in_flight[key]
+
+
+def token_key(jwt_token):
+    """
+    Returns a key identifying the given JWT token, without including the
+    token itself (i.e., in cache keys).
+    """
+    return hashlib.sha256(jwt_token.encode('utf-8')).hexdigest()[:32]
@@ -0,0 +1,162 @@
+"""
+Local, on-disk cache of the identity provider (IdP) SAML metadata.
+
+Instead of fetching the IdP metadata from SAML_METADATA_URL every time the
+SAML configuration is loaded (i.e., for every login), the metadata is read
+from SAML_METADATA_FILE, and only re-parsed when the file changes.
+
+The file is refreshed in a background thread every
+SAML_METADATA_REFRESH_SECONDS. A refreshed copy only replaces the file after
+it has been validated (and its signature verified, if SAML_METADATA_CERT_FILE
+is set), so a failed refresh leaves the last good copy in place.
+
+The file can be pre-seeded (i.e., when building the Docker image) using the
+"saml_fetch_metadata" management command.
+"""
+import copy
+import logging
+import os
+import tempfile
+import threading
+import time
+import urllib.request
+
+from django.conf import settings
+from saml2.config import SPConfig
+from saml2.mdstore import InMemoryMetaData
+from saml2.sigver import security_context
+
+logger = logging.getLogger(__name__)
+
+
+class MetadataError(Exception):
+    pass
+
+
+def fetch_metadata():
+    """
+    Returns the IdP metadata (as bytes) from SAML_METADATA_URL.
+    """
+    with urllib.request.urlopen(settings.SAML_METADATA_URL, timeout=settings.SAML_METADATA_TIMEOUT) as response:
+        return response.read()
+
+
+def validate_metadata(xml, conf):
+    """
+    Raises MetadataError if the metadata cannot be parsed, has expired, fails
+    signature verification, or does not describe the SAML_IDP_ENTITY_ID IdP.
+    """
+    metadata = InMemoryMetaData(conf.attribute_converters)
+    if settings.SAML_METADATA_CERT_FILE:
+        metadata.cert = settings.SAML_METADATA_CERT_FILE
+        metadata.security = security_context(conf)
+    try:
+        metadata.parse_and_check_signature(xml)
+    except Exception as e:
+        raise MetadataError(f"Invalid IdP metadata: {e}") from e
+
+    entity = metadata.entity.get(settings.SAML_IDP_ENTITY_ID)
+    if not entity or 'idpsso_descriptor' not in entity:
+        raise MetadataError(f"IdP metadata does not describe '{settings.SAML_IDP_ENTITY_ID}'")
+
+
+def write_metadata(xml):
+    """
+    Replaces SAML_METADATA_FILE with the given metadata, so that readers
+    always see either the old or the new file.
+    """
+    path = settings.SAML_METADATA_FILE
+    directory = os.path.dirname(os.path.abspath(path))
+    os.makedirs(directory, exist_ok=True)
+    fd, temp_path = tempfile.mkstemp(dir=directory, prefix='.metadata-')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(xml)
+        os.replace(temp_path, path)
+    except BaseException:
+        os.unlink(temp_path)
+        raise
+
+
+def refresh_metadata(conf=None):
+    """
+    Fetches, validates, and saves the IdP metadata, raising an exception if
+    any step fails (in which case, the existing file is unchanged).
+    """
+    xml = fetch_metadata()
+    validate_metadata(xml, conf or base_config())
+    write_metadata(xml)
+
+
+def base_config():
+    """
+    Returns the SPConfig for the SAML_CONFIG setting, without any metadata.
+    """
+    cnf = copy.deepcopy(settings.SAML_CONFIG)
+    cnf.pop('metadata', None)
+    conf = SPConfig()
+    conf.load(cnf)
+    return conf
+
+
+# The parsed metadata, as a ((file path, modification time), MetadataStore)
+# tuple
+_metadata = None
+_metadata_lock = threading.Lock()
+_refresher = None
+
+
+def config_loader(request=None):
+    """
+    djangosaml2 configuration loader (see the SAML_CONFIG_LOADER setting),
+    using the cached metadata.
+    """
+    global _metadata
+
+    start_refresher()
+    conf = base_config()
+    path = settings.SAML_METADATA_FILE
+
+    with _metadata_lock:
+        if not os.path.exists(path):
+            # Not pre-seeded, so the metadata must be fetched now
+            refresh_metadata(conf)
+        version = (path, os.stat(path).st_mtime_ns)
+        if _metadata is None or _metadata[0] != version:
+            _metadata = (version, conf.load_metadata({'local': [path]}))
+        conf.metadata = _metadata[1]
+
+    return conf
+
+
+def start_refresher():
+    """
+    Starts the background metadata refresh thread, if it is not running, and
+    SAML_METADATA_REFRESH_SECONDS is greater than 0.
+    """
+    global _refresher
+
+    if settings.SAML_METADATA_REFRESH_SECONDS <= 0:
+        return
+    with _metadata_lock:
+        if _refresher is None or not _refresher.is_alive():
+            _refresher = threading.Thread(target=_refresh_periodically, name='saml-metadata-refresh', daemon=True)
+            _refresher.start()
+
+
+def _refresh_periodically():
+    interval = settings.SAML_METADATA_REFRESH_SECONDS
+    while True:
+        try:
+            age = time.time() - os.stat(settings.SAML_METADATA_FILE).st_mtime
+        except OSError:
+            age = interval
+        time.sleep(max(0, interval - age))
+
+        try:
+            refresh_metadata()
+            logger.info(f"Refreshed IdP metadata from {settings.SAML_METADATA_URL}")
+        except Exception:
+            logger.exception('Unable to refresh IdP metadata, keeping the existing copy')
+            # Retry sooner than the full interval, without hammering the IdP
+            time.sleep(min(interval, 300))
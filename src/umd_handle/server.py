@@ -1,11 +1,12 @@
 #!/usr/bin/env python
 """Server startup script."""
 
+import os
+import signal
+
 import click
 from waitress import serve
 
-from umd_handle.wsgi import application
-
 
 @click.command()
 @click.option(
@@ -14,5 +15,29 @@ from umd_handle.wsgi import application
     help='Address and port to listen on. Default is "0.0.0.0:3000".',
     metavar='[ADDRESS]:PORT',
 )
-def run(listen: str):
+@click.option(
+    '--role',
+    type=click.Choice(['full', 'api']),
+    envvar='UMD_HANDLE_ROLE',
+    default='full',
+    help=(
+        'Server role: "full" (REST API, admin interface, and SAML login), or "api" '
+        '(REST API and health checks only). Default is the UMD_HANDLE_ROLE '
+        'environment variable, or "full".'
+    ),
+)
+def run(listen: str, role: str):
+    # The role must be set before the settings are loaded (by importing the
+    # WSGI application)
+    os.environ['UMD_HANDLE_ROLE'] = role
+    from umd_handle.wsgi import application
+
+    # Exit normally on SIGTERM (i.e., when the pod is stopped), so that
+    # "atexit" handlers run, and buffered handle history (and hit counts) are
+    # written
+    signal.signal(signal.SIGTERM, _exit_on_sigterm)
     serve(application, listen=listen, threads=8)
+
+
+def _exit_on_sigterm(signum, frame):
+    raise SystemExit(0)
@@ -13,10 +13,9 @@ https://docs.djangoproject.com/en/5.2/ref/settings/
 from csp.constants import SELF
 from django.core.management.commands.runserver import Command as runserver
 from django.core.management.utils import get_random_secret_key
+from django.core.exceptions import ImproperlyConfigured
 from environ import Env
 from pathlib import Path
-import saml2.saml
-import saml2.xmldsig
 from socket import gethostname, gethostbyname
 from urlobject import URLObject
 
@@ -65,6 +64,16 @@ except OSError:
 K8S_INTERNAL_HOST = URLObject(env.str('K8S_INTERNAL_HOST', 'umd-handle-app'))
 ALLOWED_HOSTS.append(K8S_INTERNAL_HOST)
 
+# The server role:
+# "full" - the REST API, admin interface, and SAML login
+# "api" - only the REST API and health checks. The admin interface and SAML
+#         login (including the "saml2" library) are not loaded, so that
+#         pods only serving the REST API start faster and use less memory.
+SERVER_ROLE = env.str('UMD_HANDLE_ROLE', 'full')
+if SERVER_ROLE not in ('full', 'api'):
+    raise ImproperlyConfigured(f"UMD_HANDLE_ROLE must be 'full' or 'api', not '{SERVER_ROLE}'")
+API_ONLY = SERVER_ROLE == 'api'
+
 # The base URL (including a trailing slash) for the handle proxy server
 # associated with this application. For example: "https://hdl-test.lib.umd.edu/"
 HANDLE_HTTP_PROXY_BASE=URLObject(env.str('HANDLE_HTTP_PROXY_BASE', '<SET HANDLE_HTTP_PROXY_BASE>'))
@@ -85,6 +94,7 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'umd_handle.middleware.QueryProfilingMiddleware',
     'django.middleware.security.SecurityMiddleware',
     "whitenoise.middleware.WhiteNoiseMiddleware",
     'django.contrib.sessions.middleware.SessionMiddleware',
@@ -93,9 +103,10 @@ MIDDLEWARE = [
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
-    'djangosaml2.middleware.SamlSessionMiddleware',
+    'umd_handle.middleware.SamlSessionMiddleware',
     'umd_handle.middleware.LoginRequiredMiddleware',
     'umd_handle.middleware.JWTAuthenticationMiddleware',
+    'umd_handle.middleware.APIRateLimitMiddleware',
 ]
 
 ROOT_URLCONF = 'umd_handle.urls'
@@ -118,6 +129,26 @@ TEMPLATES = [
 
 WSGI_APPLICATION = 'umd_handle.wsgi.application'
 
+if API_ONLY:
+    INSTALLED_APPS = [
+        'django.contrib.contenttypes',
+        'umd_handle.api',
+    ]
+
+    MIDDLEWARE = [
+        'umd_handle.middleware.QueryProfilingMiddleware',
+        'django.middleware.security.SecurityMiddleware',
+        'django.middleware.common.CommonMiddleware',
+        'umd_handle.middleware.JWTAuthenticationMiddleware',
+        'umd_handle.middleware.APIRateLimitMiddleware',
+    ]
+
+    ROOT_URLCONF = 'umd_handle.urls_api'
+
+    TEMPLATES[0]['OPTIONS']['context_processors'] = [
+        'django.template.context_processors.request',
+    ]
+
 
 # Database
 # https://docs.djangoproject.com/en/5.2/ref/settings/#databases
@@ -132,6 +163,118 @@ DATABASES = {
     }
 }
 
+# Per-request SQL query profiling
+# QUERY_PROFILING_ENABLED - adds a "Server-Timing" header with the query count
+#                           and database time to each response
+# SLOW_REQUEST_THRESHOLD_MS - requests taking longer than this (in
+#                             milliseconds) are written to the slow log
+# SLOW_QUERY_THRESHOLD_MS - queries taking longer than this (in milliseconds)
+#                           are written to the slow log
+QUERY_PROFILING_ENABLED = env.bool('QUERY_PROFILING_ENABLED', False)
+SLOW_REQUEST_THRESHOLD_MS = env.float('SLOW_REQUEST_THRESHOLD_MS', 500.0)
+SLOW_QUERY_THRESHOLD_MS = env.float('SLOW_QUERY_THRESHOLD_MS', 100.0)
+
+# Readiness check ("/health-check/ready") settings
+# READINESS_CHECK_TIMEOUT - seconds to wait for each check before failing it
+# READINESS_CACHE_SECONDS - seconds to reuse the previous readiness result
+# READINESS_CHECK_MIGRATIONS - whether unapplied migrations fail the check
+READINESS_CHECK_TIMEOUT = env.float('READINESS_CHECK_TIMEOUT', 2.0)
+READINESS_CACHE_SECONDS = env.float('READINESS_CACHE_SECONDS', 5.0)
+READINESS_CHECK_MIGRATIONS = env.bool('READINESS_CHECK_MIGRATIONS', True)
+
+# Handle admin pagination settings
+# ADMIN_COUNT_ESTIMATE_THRESHOLD - results with a (PostgreSQL) planner estimate
+#                                  of at least this many rows use the estimate
+#                                  instead of an exact count
+# ADMIN_COUNT_CACHE_SECONDS - seconds to cache the count for each search/filter
+ADMIN_COUNT_ESTIMATE_THRESHOLD = env.int('ADMIN_COUNT_ESTIMATE_THRESHOLD', 100000)
+ADMIN_COUNT_CACHE_SECONDS = env.int('ADMIN_COUNT_CACHE_SECONDS', 60)
+
+# Handle list API page size settings
+HANDLES_LIST_DEFAULT_PAGE_SIZE = env.int('HANDLES_LIST_DEFAULT_PAGE_SIZE', 100)
+HANDLES_LIST_MAX_PAGE_SIZE = env.int('HANDLES_LIST_MAX_PAGE_SIZE', 1000)
+
+# Change feed settings
+# CHANGE_FEED_SETTLE_SECONDS - changes more recent than this are not returned,
+#                              so that changes from transactions that have not
+#                              yet committed are not skipped
+# CHANGE_FEED_CHUNK_SIZE - number of handles retrieved from the database at a
+#                          time when streaming changes
+CHANGE_FEED_SETTLE_SECONDS = env.float('CHANGE_FEED_SETTLE_SECONDS', 5.0)
+CHANGE_FEED_CHUNK_SIZE = env.int('CHANGE_FEED_CHUNK_SIZE', 2000)
+
+# Handle history (audit trail) settings
+# HANDLE_HISTORY_ASYNC - buffer history entries in memory, and write them in
+#                        batches from a background thread. When False, each
+#                        entry is written as part of the request.
+# HANDLE_HISTORY_FLUSH_SECONDS - maximum seconds between batch writes
+# HANDLE_HISTORY_BATCH_SIZE - number of buffered entries that triggers an
+#                             immediate batch write
+# HANDLE_HISTORY_MAX_PENDING - number of buffered entries at which requests
+#                              write the buffer themselves (e.g., when the
+#                              background writer is falling behind)
+HANDLE_HISTORY_ASYNC = env.bool('HANDLE_HISTORY_ASYNC', True)
+HANDLE_HISTORY_FLUSH_SECONDS = env.float('HANDLE_HISTORY_FLUSH_SECONDS', 1.0)
+HANDLE_HISTORY_BATCH_SIZE = env.int('HANDLE_HISTORY_BATCH_SIZE', 500)
+HANDLE_HISTORY_MAX_PENDING = env.int('HANDLE_HISTORY_MAX_PENDING', 10000)
+
+# Idempotent minting settings (see "umd_handle.api.mint_keys")
+# IDEMPOTENCY_KEY_SECONDS - how long the handle minted for an
+#                           "Idempotency-Key" header is returned for repeated
+#                           requests with the same key
+# MINT_RETURNS_EXISTING_HANDLE - minting a handle for a prefix, repo, and
+#                                repo_id that already has a handle returns
+#                                the existing handle
+IDEMPOTENCY_KEY_SECONDS = env.int('IDEMPOTENCY_KEY_SECONDS', 86400)
+MINT_RETURNS_EXISTING_HANDLE = env.bool('MINT_RETURNS_EXISTING_HANDLE', False)
+
+# Handle resolution counting settings (see "umd_handle.api.hits")
+# HANDLE_STATS_ENABLED - whether handle resolutions are counted
+# HANDLE_STATS_ASYNC - count resolutions in memory, and write the counts in
+#                      batches from a background thread. When False, each
+#                      resolution is written as part of the request.
+# HANDLE_STATS_FLUSH_SECONDS - seconds between batch writes
+# HANDLE_STATS_STRIPES - number of separately locked dictionaries the counts
+#                        are split between
+HANDLE_STATS_ENABLED = env.bool('HANDLE_STATS_ENABLED', True)
+HANDLE_STATS_ASYNC = env.bool('HANDLE_STATS_ASYNC', True)
+HANDLE_STATS_FLUSH_SECONDS = env.float('HANDLE_STATS_FLUSH_SECONDS', 10.0)
+HANDLE_STATS_STRIPES = env.int('HANDLE_STATS_STRIPES', 16)
+
+# Handle.net batch file settings (see "umd_handle.api.handle_net")
+# HANDLE_NET_ADMIN - the HS_ADMIN value of created handles, as
+#                    "<index>:<admin handle>", where "{prefix}" is replaced
+#                    by the prefix of the handle
+# HANDLE_NET_TTL - the time-to-live (in seconds) of the handle values
+HANDLE_NET_ADMIN = env('HANDLE_NET_ADMIN', default='300:0.NA/{prefix}')
+HANDLE_NET_TTL = env.int('HANDLE_NET_TTL', 86400)
+
+# REST API rate limiting, per JWT token
+# API_RATE_LIMIT_ENABLED - whether REST API requests are rate limited
+# API_RATE_LIMIT_READ_RATE/API_RATE_LIMIT_READ_BURST - sustained requests per
+#                               second, and burst size, for read (GET) requests
+# API_RATE_LIMIT_WRITE_RATE/API_RATE_LIMIT_WRITE_BURST - sustained requests per
+#                               second, and burst size, for mint/update requests
+# API_RATE_LIMIT_CACHE - the cache alias (i.e., "default") used to share the
+#                        limits between processes. When empty, each process
+#                        keeps its own limits in memory.
+# API_MAX_CONCURRENT_REQUESTS_PER_TOKEN - maximum in-flight requests for each
+#                                         token, in each process (0 for no
+#                                         limit)
+API_RATE_LIMIT_ENABLED = env.bool('API_RATE_LIMIT_ENABLED', False)
+API_RATE_LIMIT_READ_RATE = env.float('API_RATE_LIMIT_READ_RATE', 50.0)
+API_RATE_LIMIT_READ_BURST = env.int('API_RATE_LIMIT_READ_BURST', 100)
+API_RATE_LIMIT_WRITE_RATE = env.float('API_RATE_LIMIT_WRITE_RATE', 5.0)
+API_RATE_LIMIT_WRITE_BURST = env.int('API_RATE_LIMIT_WRITE_BURST', 20)
+API_RATE_LIMIT_CACHE = env.str('API_RATE_LIMIT_CACHE', '')
+API_MAX_CONCURRENT_REQUESTS_PER_TOKEN = env.int('API_MAX_CONCURRENT_REQUESTS_PER_TOKEN', 4)
+
+# URL rewrite rules
+# URL_REWRITE_RULES_CHECK_SECONDS - how often (in seconds) each process checks
+#                                   (in the database) whether the rules have
+#                                   been changed by another process
+URL_REWRITE_RULES_CHECK_SECONDS = env.float('URL_REWRITE_RULES_CHECK_SECONDS', 5.0)
+
 AUTHENTICATION_BACKENDS = (
     'django.contrib.auth.backends.ModelBackend',
     'umd_handle.auth.ModifiedSaml2Backend',
@@ -143,6 +286,35 @@ LOGIN_URL_NAME = 'saml2_login' # A name for use in reverse() if needed
 LOGIN_REDIRECT_URL = '/admin'
 SESSION_EXPIRE_AT_BROWSER_CLOSE = True
 
+# Cache settings
+# CACHE_URL - the default cache (i.e., "redis://redis:6379/0"). Defaults to a
+#             per-process, in-memory cache
+CACHES = {
+    'default': env.cache_url('CACHE_URL', default='locmemcache://'),
+}
+
+# Session storage settings
+# SESSION_BACKEND - where admin interface sessions are stored:
+#   "db" - in the database (the default)
+#   "cached_db" - in the database, with reads served from the cache. Only use
+#                 with a cache shared by all the pods (see CACHE_URL)
+#   "signed_cookies" - in a signed cookie, so that sessions are not written
+#                      to the database at all
+# SESSION_BACKEND_ENGINES - the session engine for each SESSION_BACKEND
+#
+# Expired database sessions are removed by the "db_clear_sessions" command.
+SESSION_BACKEND_ENGINES = {
+    'db': 'django.contrib.sessions.backends.db',
+    'cached_db': 'django.contrib.sessions.backends.cached_db',
+    'signed_cookies': 'django.contrib.sessions.backends.signed_cookies',
+}
+SESSION_BACKEND = env.str('SESSION_BACKEND', 'db')
+if SESSION_BACKEND not in SESSION_BACKEND_ENGINES:
+    raise ImproperlyConfigured(
+        f"SESSION_BACKEND must be one of {', '.join(SESSION_BACKEND_ENGINES)}, not '{SESSION_BACKEND}'"
+    )
+SESSION_ENGINE = SESSION_BACKEND_ENGINES[SESSION_BACKEND]
+
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
 
@@ -184,155 +356,182 @@ STATIC_URL = 'staticfiles/'
 
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
-# SameSite Cookies
-# The storage linked to it is accessible by default at request.saml_session.
-SAML_SESSION_COOKIE_NAME = 'saml_session'
-# By default, djangosaml2 will set “SameSite=None” for the SAML session cookie.
-SAML_SESSION_COOKIE_SAMESITE = env('SAML_SESSION_COOKIE_SAMESITE', default='None')
-# Remember that in your browser “SameSite=None” attribute MUST also have the “Secure” attribute,
-# which is required in order to use “SameSite=None”, otherwise the cookie will be blocked.
-SESSION_COOKIE_SECURE = env.bool('SESSION_COOKIE_SECURE', default=True)
-
-# Handling Post-Login Redirects
-SAML_ALLOWED_HOSTS = env('SAML_ALLOWED_HOSTS', cast=[str], default=ALLOWED_HOSTS)
-
-SAML_DEFAULT_BINDING = saml2.BINDING_HTTP_POST
-SAML_LOGOUT_REQUEST_PREFERRED_BINDING = saml2.BINDING_HTTP_POST
-SAML_IGNORE_LOGOUT_ERRORS = True
-
-# Users, attributes and account linking
-SAML_CREATE_UNKNOWN_USER = True
-SAML_ATTRIBUTE_MAPPING = {
-    'uid': ('username',),
-    'mail': ('email',),
-    'givenName': ('first_name',),
-    'urn:mace:umd.edu:sn': ('last_name',),
-}
-SAML_KEY_FILE = env('SAML_KEY_FILE', default='/etc/umd_handle/saml/key.pem')
-SAML_CERT_FILE = env('SAML_CERT_FILE', default='/etc/umd_handle/saml/cert.pem')
-
-SAML_CONFIG = {
-    # full path to the xmlsec1 binary program
-    'xmlsec_binary': env('XMLSEC1_PATH', default='/usr/bin/xmlsec1'),
-
-    # your entity id, usually your subdomain plus the url to the metadata view
-    'entityid': str(BASE_URL.netloc),
-
-    # directory with attribute mapping
-    'attribute_map_dir': str(BASE_DIR / 'attribute-maps'),
-
-    # Permits to have attributes not configured in attribute-mappings
-    # otherwise...without OID will be rejected
-    'allow_unknown_attributes': True,
-
-    # this block states what services we provide
-    'service': {
-        # we are just a lonely SP
-        'sp': {
-            'name': 'handle-local',
-            'name_id_format': saml2.saml.NAMEID_FORMAT_TRANSIENT,
-            # Define the authentication context
-            'requested_authn_context': {
-                'authn_context_class_ref': [
-                    'urn:oasis:names:tc:SAML:2.0:ac:classes:PasswordProtectedTransport',
-                    'urn:oasis:names:tc:SAML:2.0:ac:classes:TLSClient',
-                ],
-                'comparison': 'minimum',
-            },
-
-            # For Okta add signed logout requests. Enable this:
-            # "logout_requests_signed": True,
-
-            'endpoints': {
-                # url and binding to the assertion consumer service view
-                # do not change the binding or service name
-                'assertion_consumer_service': [
-                    # Path provided in the "AssertionConsumerService" tag in
-                    # the service provider XML configuration provided to DIT
-                    # when setting up the Rails "umd-handle" application.
-                    (str(BASE_URL.with_path('/users/auth/saml/callback')), saml2.BINDING_HTTP_POST),
-                ],
-                # url and binding to the single logout service view
-                # do not change the binding or service name
-                'single_logout_service': [
-                    # Disable next two lines for HTTP_REDIRECT for IDPs that only support HTTP_POST. Ex. Okta:
-                    (str(BASE_URL.with_path('/saml2/ls/')), saml2.BINDING_HTTP_REDIRECT),
-                    (str(BASE_URL.with_path('/saml2/ls/post/')), saml2.BINDING_HTTP_POST),
-                ],
-            },
-
-            'signing_algorithm': saml2.xmldsig.SIG_RSA_SHA256,
-            'digest_algorithm': saml2.xmldsig.DIGEST_SHA256,
-
-            # Mandates that the identity provider MUST authenticate the
-            # presenter directly rather than rely on a previous security context.
-            'force_authn': False,
-
-            # Enable AllowCreate in NameIDPolicy.
-            'name_id_format_allow_create': False,
-
-            # attributes that this project need to identify a user
-            'required_attributes': ['givenName', 'sn', 'mail', 'eduPersonEntitlement'],
-
-            # attributes that may be useful to have but not required
-            'optional_attributes': [],
-
-            'want_response_signed': False,
-            'authn_requests_signed': True,
-            'logout_requests_signed': True,
-            # Indicates that Authentication Responses to this SP must
-            # be signed. If set to True, the SP will not consume
-            # any SAML Responses that are not signed.
-            'want_assertions_signed': True,
-
-            'only_use_keys_in_metadata': True,
-
-            # When set to true, the SP will consume unsolicited SAML
-            # Responses, i.e. SAML Responses for which it has not sent
-            # a respective SAML Authentication Request.
-            'allow_unsolicited': True,
+# SAML login settings (not used by the "api" server role)
+if not API_ONLY:
+    import saml2.saml
+    import saml2.xmldsig
+
+    # SameSite Cookies
+    # The storage linked to it is accessible by default at request.saml_session.
+    SAML_SESSION_COOKIE_NAME = 'saml_session'
+    # By default, djangosaml2 will set “SameSite=None” for the SAML session cookie.
+    SAML_SESSION_COOKIE_SAMESITE = env('SAML_SESSION_COOKIE_SAMESITE', default='None')
+    # Remember that in your browser “SameSite=None” attribute MUST also have the “Secure” attribute,
+    # which is required in order to use “SameSite=None”, otherwise the cookie will be blocked.
+    SESSION_COOKIE_SECURE = env.bool('SESSION_COOKIE_SECURE', default=True)
+    # SAML_SESSION_BACKEND - where the SAML session (only needed while logging
+    #                        in or out) is stored, as for SESSION_BACKEND.
+    #                        Defaults to SESSION_BACKEND.
+    SAML_SESSION_BACKEND = env.str('SAML_SESSION_BACKEND', SESSION_BACKEND)
+    if SAML_SESSION_BACKEND not in SESSION_BACKEND_ENGINES:
+        raise ImproperlyConfigured(
+            f"SAML_SESSION_BACKEND must be one of {', '.join(SESSION_BACKEND_ENGINES)}, not '{SAML_SESSION_BACKEND}'"
+        )
+    SAML_SESSION_ENGINE = SESSION_BACKEND_ENGINES[SAML_SESSION_BACKEND]
+
+    # Handling Post-Login Redirects
+    SAML_ALLOWED_HOSTS = env('SAML_ALLOWED_HOSTS', cast=[str], default=ALLOWED_HOSTS)
+
+    SAML_DEFAULT_BINDING = saml2.BINDING_HTTP_POST
+    SAML_LOGOUT_REQUEST_PREFERRED_BINDING = saml2.BINDING_HTTP_POST
+    SAML_IGNORE_LOGOUT_ERRORS = True
+
+    # Users, attributes and account linking
+    SAML_CREATE_UNKNOWN_USER = True
+    SAML_ATTRIBUTE_MAPPING = {
+        'uid': ('username',),
+        'mail': ('email',),
+        'givenName': ('first_name',),
+        'urn:mace:umd.edu:sn': ('last_name',),
+    }
+    # IdP metadata, cached in a local file (see "umd_handle.saml_metadata")
+    # SAML_METADATA_FILE - the local copy of the IdP metadata
+    # SAML_METADATA_REFRESH_SECONDS - how often the local copy is refreshed
+    #                                 from SAML_METADATA_URL (0 to disable)
+    # SAML_METADATA_CERT_FILE - certificate used to verify the signature of
+    #                           the metadata (not verified, if empty)
+    SAML_IDP_ENTITY_ID = 'https://shib.idm.umd.edu/shibboleth-idp/shibboleth'
+    SAML_METADATA_URL = env.str('SAML_METADATA_URL', SAML_IDP_ENTITY_ID)
+    SAML_METADATA_FILE = env.str('SAML_METADATA_FILE', str(BASE_DIR / 'saml-metadata' / 'idp-metadata.xml'))
+    SAML_METADATA_REFRESH_SECONDS = env.float('SAML_METADATA_REFRESH_SECONDS', 6 * 60 * 60)
+    SAML_METADATA_TIMEOUT = env.float('SAML_METADATA_TIMEOUT', 10.0)
+    SAML_METADATA_CERT_FILE = env.str('SAML_METADATA_CERT_FILE', '')
+    SAML_CONFIG_LOADER = 'umd_handle.saml_metadata.config_loader'
+
+    SAML_KEY_FILE = env('SAML_KEY_FILE', default='/etc/umd_handle/saml/key.pem')
+    SAML_CERT_FILE = env('SAML_CERT_FILE', default='/etc/umd_handle/saml/cert.pem')
+
+    SAML_CONFIG = {
+        # full path to the xmlsec1 binary program
+        'xmlsec_binary': env('XMLSEC1_PATH', default='/usr/bin/xmlsec1'),
+
+        # your entity id, usually your subdomain plus the url to the metadata view
+        'entityid': str(BASE_URL.netloc),
+
+        # directory with attribute mapping
+        'attribute_map_dir': str(BASE_DIR / 'attribute-maps'),
+
+        # Permits to have attributes not configured in attribute-mappings
+        # otherwise...without OID will be rejected
+        'allow_unknown_attributes': True,
+
+        # this block states what services we provide
+        'service': {
+            # we are just a lonely SP
+            'sp': {
+                'name': 'handle-local',
+                'name_id_format': saml2.saml.NAMEID_FORMAT_TRANSIENT,
+                # Define the authentication context
+                'requested_authn_context': {
+                    'authn_context_class_ref': [
+                        'urn:oasis:names:tc:SAML:2.0:ac:classes:PasswordProtectedTransport',
+                        'urn:oasis:names:tc:SAML:2.0:ac:classes:TLSClient',
+                    ],
+                    'comparison': 'minimum',
+                },
 
-            # in this section the list of IdPs we talk to are defined
-            # This is not mandatory! All the IdP available in the metadata will be considered instead.
-            'idp': {
-                # we do not need a WAYF service since there is
-                # only an IdP defined here. This IdP should be
-                # present in our metadata
+                # For Okta add signed logout requests. Enable this:
+                # "logout_requests_signed": True,
+
+                'endpoints': {
+                    # url and binding to the assertion consumer service view
+                    # do not change the binding or service name
+                    'assertion_consumer_service': [
+                        # Path provided in the "AssertionConsumerService" tag in
+                        # the service provider XML configuration provided to DIT
+                        # when setting up the Rails "umd-handle" application.
+                        (str(BASE_URL.with_path('/users/auth/saml/callback')), saml2.BINDING_HTTP_POST),
+                    ],
+                    # url and binding to the single logout service view
+                    # do not change the binding or service name
+                    'single_logout_service': [
+                        # Disable next two lines for HTTP_REDIRECT for IDPs that only support HTTP_POST. Ex. Okta:
+                        (str(BASE_URL.with_path('/saml2/ls/')), saml2.BINDING_HTTP_REDIRECT),
+                        (str(BASE_URL.with_path('/saml2/ls/post/')), saml2.BINDING_HTTP_POST),
+                    ],
+                },
 
-                # the keys of this dictionary are entity ids
-                'https://shib.idm.umd.edu/shibboleth-idp/shibboleth': {
-                    'single_sign_on_service': {
-                        saml2.BINDING_HTTP_POST: 'https://shib.idm.umd.edu/shibboleth-idp/profile/SAML2/POST/SSO',
-                    },
-                    'single_logout_service': {
-                        saml2.BINDING_HTTP_REDIRECT: 'https://shib.idm.umd.edu/shibboleth-idp/profile/Logout',
+                'signing_algorithm': saml2.xmldsig.SIG_RSA_SHA256,
+                'digest_algorithm': saml2.xmldsig.DIGEST_SHA256,
+
+                # Mandates that the identity provider MUST authenticate the
+                # presenter directly rather than rely on a previous security context.
+                'force_authn': False,
+
+                # Enable AllowCreate in NameIDPolicy.
+                'name_id_format_allow_create': False,
+
+                # attributes that this project need to identify a user
+                'required_attributes': ['givenName', 'sn', 'mail', 'eduPersonEntitlement'],
+
+                # attributes that may be useful to have but not required
+                'optional_attributes': [],
+
+                'want_response_signed': False,
+                'authn_requests_signed': True,
+                'logout_requests_signed': True,
+                # Indicates that Authentication Responses to this SP must
+                # be signed. If set to True, the SP will not consume
+                # any SAML Responses that are not signed.
+                'want_assertions_signed': True,
+
+                'only_use_keys_in_metadata': True,
+
+                # When set to true, the SP will consume unsolicited SAML
+                # Responses, i.e. SAML Responses for which it has not sent
+                # a respective SAML Authentication Request.
+                'allow_unsolicited': True,
+
+                # in this section the list of IdPs we talk to are defined
+                # This is not mandatory! All the IdP available in the metadata will be considered instead.
+                'idp': {
+                    # we do not need a WAYF service since there is
+                    # only an IdP defined here. This IdP should be
+                    # present in our metadata
+
+                    # the keys of this dictionary are entity ids
+                    SAML_IDP_ENTITY_ID: {
+                        'single_sign_on_service': {
+                            saml2.BINDING_HTTP_POST: 'https://shib.idm.umd.edu/shibboleth-idp/profile/SAML2/POST/SSO',
+                        },
+                        'single_logout_service': {
+                            saml2.BINDING_HTTP_REDIRECT: 'https://shib.idm.umd.edu/shibboleth-idp/profile/Logout',
+                        },
                     },
                 },
             },
         },
-    },
-
-    # where the remote metadata is stored, local, remote or mdq server.
-    # One metadata store or many ...
-    'metadata': {
-        'remote': [
-            {'url': 'https://shib.idm.umd.edu/shibboleth-idp/shibboleth'},
-        ],
-    },
 
-    # set to 1 to output debugging information
-    'debug': 1,
+        # where the remote metadata is stored, local, remote or mdq server.
+        # One metadata store or many ...
+        # (The local copy of SAML_METADATA_URL, refreshed in the background)
+        'metadata': {
+            'local': [SAML_METADATA_FILE],
+        },
 
-    # Signing
-    'key_file': SAML_KEY_FILE,
-    'cert_file': SAML_CERT_FILE,
+        # set to 1 to output debugging information
+        'debug': 1,
 
-    # Encryption
-    'encryption_keypairs': [{
+        # Signing
         'key_file': SAML_KEY_FILE,
         'cert_file': SAML_CERT_FILE,
-    }],
-}
+
+        # Encryption
+        'encryption_keypairs': [{
+            'key_file': SAML_KEY_FILE,
+            'cert_file': SAML_CERT_FILE,
+        }],
+    }
 
 # Content security policy largely taken from
 # https://django-csp.readthedocs.io/en/v4.0/configuration.html#configuration
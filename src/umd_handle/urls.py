@@ -18,7 +18,7 @@ from django.contrib import admin
 from django.urls import include, path
 from django.views.generic.base import RedirectView
 from djangosaml2 import views as saml_views
-from umd_handle.health_check import health_check
+from umd_handle.health_check import health_check, health_check_ready
 
 urlpatterns = [
     # Redirect root to admin view
@@ -27,6 +27,7 @@ urlpatterns = [
     path('admin/', admin.site.urls),
     path('saml2/', include('djangosaml2.urls')),
     path('health-check/', health_check, name='health-check'),
+    path('health-check/ready', health_check_ready, name='health-check-ready'),
 
     # Following path is necessary because "users/auth/saml/callback" was the
     # path in the "AssertionConsumerService" tag provided in the service
@@ -0,0 +1,13 @@
+"""
+URL configuration for the "api" server role (see the SERVER_ROLE setting),
+which only serves the REST API and the health checks.
+"""
+from django.urls import include, path
+
+from umd_handle.health_check import health_check, health_check_ready
+
+urlpatterns = [
+    path("api/", include("umd_handle.api.urls")),
+    path('health-check/', health_check, name='health-check'),
+    path('health-check/ready', health_check_ready, name='health-check-ready'),
+]
@@ -0,0 +1,18 @@
+import pytest
+
+
+@pytest.fixture(autouse=True)
+def synchronous_handle_history(settings):
+    """
+    Writes handle history entries as part of each request, instead of from a
+    background thread, so that entries are written to the test database.
+    """
+    settings.HANDLE_HISTORY_ASYNC = False
+
+@pytest.fixture(autouse=True)
+def synchronous_handle_stats(settings):
+    """
+    Writes handle resolution counts as part of each request, instead of from
+    a background thread, so that the counts are written to the test database.
+    """
+    settings.HANDLE_STATS_ASYNC = False
@@ -0,0 +1,62 @@
+import json
+import pytest
+from datetime import UTC, datetime
+from django.core.management import call_command
+from umd_handle.api.management.commands.benchmark_api import Command, percentile
+from umd_handle.api.models import Handle
+
+
+@pytest.fixture(autouse=True)
+def jwt_secret_for_tests(settings):
+    settings.JWT_SECRET = 'jwt_secret_for_tests'
+
+def test_percentile_uses_nearest_rank():
+    values = list(range(1, 101))
+    assert percentile(values, 50) == 50
+    assert percentile(values, 95) == 95
+    assert percentile(values, 99) == 99
+    assert percentile([7], 99) == 7
+
+@pytest.mark.django_db(transaction=True)
+def test_benchmark_api_writes_results(live_server, tmp_path):
+    output = tmp_path / 'results.json'
+    call_command(
+        'benchmark_api', base_url=live_server.url, host_header='localhost',
+        handles=10, requests=5, concurrency=1, output=str(output)
+    )
+
+    results = json.loads(output.read_text())
+    assert results['meta']['handles'] == 10
+    for operation in ['resolve', 'exists', 'info', 'patch', 'mint']:
+        result = results['operations'][operation]
+        assert result['requests'] == 5
+        assert result['errors'] == 0
+        assert set(result['latency_ms']) == {'min', 'mean', 'p50', 'p95', 'p99', 'max'}
+
+    # Synthetic handles, including minted handles, are removed afterwards
+    assert not Handle.objects.exists()
+
+@pytest.mark.django_db
+def test_remove_dataset_only_removes_benchmark_handles():
+    command = Command()
+    command.suffixes = []
+    command.started = datetime.now(UTC)
+    command.create_dataset(5, seed=1)
+    # A handle minted by another client during the benchmark
+    other = Handle.objects.create(
+        prefix='1903.1', suffix=max(command.suffixes) + 1, repo='aspace', repo_id='other', url='https://example.com/'
+    )
+
+    command.remove_dataset()
+
+    assert list(Handle.objects.all()) == [other]
+
+@pytest.mark.django_db
+def test_create_dataset_does_not_change_created_field():
+    command = Command()
+    command.suffixes = []
+    command.create_dataset(5, seed=1)
+
+    assert Handle._meta.get_field('created').auto_now_add
+    # The generated timestamps are kept
+    assert Handle.objects.filter(created__year__lt=2026).count() == 5
@@ -0,0 +1,44 @@
+import datetime
+import pytest
+from django.db import connection
+from django.utils import timezone
+from umd_handle.api.conditional import _update_returning_previous
+from umd_handle.api.models import Handle
+
+requires_postgresql = pytest.mark.skipif(connection.vendor != 'postgresql', reason='requires PostgreSQL')
+
+
+@pytest.fixture
+def handle1():
+    return Handle.objects.create(
+        prefix='1903.1', suffix=1, url='http://example.com/', repo='fcrepo', repo_id='fcrepo-1'
+    )
+
+@requires_postgresql
+@pytest.mark.django_db
+def test_update_returning_previous_returns_handle_before_update(handle1):
+    modified = timezone.now()
+
+    previous = _update_returning_previous(
+        '1903.1', 1, [handle1.modified], {'url': 'http://example.com/new', 'notes': 'Moved'}, modified
+    )
+
+    assert previous.pk == handle1.pk
+    assert (previous.url, previous.notes, previous.modified) == ('http://example.com/', '', handle1.modified)
+    handle1.refresh_from_db()
+    assert (handle1.url, handle1.notes, handle1.modified) == ('http://example.com/new', 'Moved', modified)
+
+@requires_postgresql
+@pytest.mark.django_db
+def test_update_returning_previous_does_not_update_other_versions(handle1):
+    other_version = handle1.modified - datetime.timedelta(seconds=1)
+
+    assert _update_returning_previous(
+        '1903.1', 1, [other_version], {'url': 'http://example.com/new'}, timezone.now()
+    ) is None
+    assert _update_returning_previous(
+        '1903.1', 2, [handle1.modified], {'url': 'http://example.com/new'}, timezone.now()
+    ) is None
+
+    handle1.refresh_from_db()
+    assert handle1.url == 'http://example.com/'
@@ -0,0 +1,61 @@
+import pytest
+from django.core.exceptions import ImproperlyConfigured
+from django.db import connection
+from umd_handle.api.cursors import after_cursor, encode_cursor
+from umd_handle.api.models import Handle
+
+try:
+    from django.db.backends.postgresql.base import DatabaseWrapper
+except ImproperlyConfigured:
+    # psycopg is not installed
+    DatabaseWrapper = None
+
+requires_psycopg = pytest.mark.skipif(DatabaseWrapper is None, reason='requires psycopg')
+requires_postgresql = pytest.mark.skipif(connection.vendor != 'postgresql', reason='requires PostgreSQL')
+
+
+@pytest.fixture
+def handles():
+    return Handle.objects.bulk_create([
+        Handle(prefix=prefix, suffix=suffix, url='http://example.com/', repo='fcrepo', repo_id=f"{prefix}-{suffix}")
+        for prefix in ['1903.1', '1903.2']
+        for suffix in range(1, 4)
+    ])
+
+@pytest.mark.django_db
+def test_after_cursor_returns_rows_after_the_sort_key(handles):
+    cursor = encode_cursor('handle', Handle.objects.get(prefix='1903.1', suffix=2))
+
+    queryset = after_cursor(Handle.objects.all(), 'handle', cursor)
+
+    assert [(h.prefix, h.suffix) for h in queryset] == [
+        ('1903.1', 3), ('1903.2', 1), ('1903.2', 2), ('1903.2', 3)
+    ]
+
+@requires_psycopg
+@pytest.mark.django_db
+def test_after_cursor_uses_a_row_value_comparison_in_postgresql(handles):
+    # Compiled for PostgreSQL, whatever the test database is
+    postgresql = DatabaseWrapper({**connection.settings_dict, 'ENGINE': 'django.db.backends.postgresql'})
+    for ordering, columns in [('handle', ('prefix', 'suffix')), ('modified', ('modified', 'id'))]:
+        cursor = encode_cursor(ordering, handles[0])
+
+        query = after_cursor(Handle.objects.all(), ordering, cursor).query
+        sql, _ = query.get_compiler(connection=postgresql).as_sql()
+
+        assert f'("api_handle"."{columns[0]}", "api_handle"."{columns[1]}") > (%s, %s)' in sql
+        assert ' OR ' not in sql
+
+@requires_postgresql
+@pytest.mark.django_db
+def test_after_cursor_starts_an_index_range_scan(handles):
+    cursor = encode_cursor('handle', handles[0])
+    with connection.cursor() as db_cursor:
+        # The table is too small for an index scan to be chosen otherwise
+        db_cursor.execute('SET LOCAL enable_seqscan = off')
+
+        plan = after_cursor(Handle.objects.all(), 'handle', cursor).explain()
+
+    index_conditions = [line for line in plan.splitlines() if 'Index Cond' in line]
+    assert index_conditions
+    assert 'ROW(' in index_conditions[0]
@@ -0,0 +1,108 @@
+import csv
+import pytest
+from io import StringIO
+from django.core.management import call_command
+from umd_handle.api.integrity import check_handles
+from umd_handle.api.models import Handle, HandleHistory
+
+
+@pytest.fixture
+def handles():
+    """
+    Creates (bypassing validation, as the CSV import may) handles with
+    suffixes 1, 2, 5, 6 and 9, where suffix 2 is for the same repository item
+    as suffix 1, suffix 5 has a URL with surrounding whitespace, suffix 6 has
+    an invalid URL, and suffix 9 has an upper-case repo
+    """
+    values = {
+        1: {},
+        2: {'repo_id': 'fc-1'},
+        5: {'url': ' http://example.com/5\n'},
+        6: {'url': 'ftp://example.com/6'},
+        9: {'repo': 'FCREPO'},
+    }
+    return Handle.objects.bulk_create([
+        Handle(**{
+            'prefix': '1903.1', 'suffix': suffix, 'url': f"http://example.com/{suffix}",
+            'repo': 'fcrepo', 'repo_id': f"fc-{suffix}", **overrides,
+        })
+        for suffix, overrides in values.items()
+    ])
+
+def problems(**options):
+    return sorted((p.check, p.handle, p.fixed) for p in check_handles(**options))
+
+@pytest.mark.django_db
+def test_check_handles_reports_each_class_of_problem(handles):
+    assert problems() == [
+        ('duplicate_repo_item', '1903.1/2', False),
+        ('invalid_repo', '1903.1/9', False),
+        ('invalid_url', '1903.1/5', False),
+        ('invalid_url', '1903.1/6', False),
+        ('suffix_gap', '1903.1/3-4', False),
+        ('suffix_gap', '1903.1/7-8', False),
+    ]
+
+@pytest.mark.django_db
+def test_check_handles_uses_a_constant_number_of_queries(handles, django_assert_num_queries):
+    # One query for each of the field pass, the two duplicate checks, and the
+    # gap check, regardless of the number of handles
+    with django_assert_num_queries(4):
+        list(check_handles(chunk_size=2))
+
+@pytest.mark.django_db
+def test_check_handles_fixes_normalizable_values(handles):
+    assert problems(fix=True, chunk_size=1) == [
+        ('duplicate_repo_item', '1903.1/2', False),
+        ('invalid_repo', '1903.1/9', True),
+        ('invalid_url', '1903.1/5', True),
+        ('invalid_url', '1903.1/6', False),
+        ('suffix_gap', '1903.1/3-4', False),
+        ('suffix_gap', '1903.1/7-8', False),
+    ]
+    assert Handle.objects.get(suffix=5).url == 'http://example.com/5'
+    assert Handle.objects.get(suffix=6).url == 'ftp://example.com/6'
+    assert Handle.objects.get(suffix=9).repo == 'fcrepo'
+
+    history = HandleHistory.objects.get(suffix=5)
+    assert history.before == {'url': ' http://example.com/5\n'}
+    assert history.after == {'url': 'http://example.com/5'}
+
+    assert [p.check for p in check_handles(checks=['invalid_url', 'invalid_repo'])] == ['invalid_url']
+
+@pytest.mark.django_db
+def test_check_handles_does_not_fix_a_prefix_to_an_existing_handle(handles):
+    Handle.objects.bulk_create([
+        Handle(prefix=prefix, suffix=suffix, url='http://example.com/', repo='fcrepo', repo_id=f"fc-{prefix}-{suffix}")
+        for prefix, suffix in [(' 1903.1', 1), (' 1903.1', 20), ('1903.1 ', 20), ('1903.1 ', 21)]
+    ])
+
+    fixed = {p.handle: p.fixed for p in check_handles(checks=['invalid_prefix'], fix=True, chunk_size=1)}
+    assert fixed[' 1903.1/1'] is False
+    assert fixed['1903.1 /21'] is True
+    # Only one of the handles with the same fixed prefix/suffix is fixed
+    assert sorted([fixed[' 1903.1/20'], fixed['1903.1 /20']]) == [False, True]
+    assert Handle.objects.filter(prefix='1903.1', suffix__in=[20, 21]).count() == 2
+    assert Handle.objects.filter(prefix=' 1903.1', suffix=1).exists()
+
+@pytest.mark.django_db
+def test_db_check_handles_dry_run_reports_but_does_not_fix(handles, tmp_path):
+    report_file = tmp_path / 'report.csv'
+    out = StringIO()
+    call_command('db_check_handles', '--fix', '--dry-run', '--report-file', str(report_file), '--limit', '1', stdout=out)
+
+    output = out.getvalue()
+    assert 'invalid_url: 2 problem(s)' in output
+    assert 'duplicate_suffix: 0 problem(s)' in output
+    assert 'Would fix 2 problem(s)' in output
+    # Only the first problem of each check is listed
+    assert 'suffix_gap: 1903.1/3-4: 2 unused suffix(es)' in output
+    assert '1903.1/7-8' not in output
+
+    with open(report_file, newline='', encoding='utf-8') as f:
+        rows = list(csv.DictReader(f))
+    assert len(rows) == 6
+    assert {'check': 'suffix_gap', 'handle': '1903.1/7-8', 'detail': '2 unused suffix(es)', 'fixed': 'False'} in rows
+
+    assert Handle.objects.get(suffix=9).repo == 'FCREPO'
+    assert not HandleHistory.objects.exists()
@@ -0,0 +1,133 @@
+import pytest
+import threading
+import time
+from datetime import timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from io import StringIO
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.utils import timezone
+from umd_handle.api import link_check
+from umd_handle.api.link_check import check_urls
+from umd_handle.api.models import Handle, HandleLinkCheck
+
+# Path -> (status of a HEAD request, status of a GET request, headers)
+RESPONSES = {
+    '/ok': (200, 200, {}),
+    '/moved': (301, 301, {'Location': '/ok'}),
+    '/no-head': (405, 200, {}),
+}
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def do_HEAD(self):
+        self.respond(head=True)
+
+    def do_GET(self):
+        self.respond(head=False)
+
+    def respond(self, head):
+        path = self.path.split('?')[0]
+        if path == '/slow':
+            time.sleep(1)
+        head_status, get_status, headers = RESPONSES.get(path, (404, 404, {}))
+        body = b'stub'
+        self.send_response(head_status if head else get_status)
+        for name, value in headers.items():
+            self.send_header(name, value)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        if not head:
+            self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+class StubServer(ThreadingHTTPServer):
+    daemon_threads = True
+    connections = 0
+
+    def verify_request(self, request, client_address):
+        self.connections += 1
+        return True
+
+
+@pytest.fixture
+def server():
+    server = StubServer(('127.0.0.1', 0), StubHandler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    server.base_url = f"http://127.0.0.1:{server.server_address[1]}"
+    yield server
+    server.shutdown()
+    server.server_close()
+
+@pytest.fixture
+def handles(server):
+    paths = ['/ok', '/moved', '/no-head', '/missing', '/slow']
+    return [
+        Handle.objects.create(
+            prefix='1903.1', suffix=suffix, url=f"{server.base_url}{path}", repo='fcrepo', repo_id=f"fc-{suffix}"
+        )
+        for suffix, path in enumerate(paths, start=1)
+    ]
+
+def check_links(*args):
+    out = StringIO()
+    call_command('db_check_links', '--timeout', '0.5', *args, stdout=out)
+    return out.getvalue()
+
+@pytest.mark.django_db
+def test_db_check_links_records_status_and_redirect_of_each_handle(server, handles):
+    out = check_links()
+    assert 'Checked 5 URL(s): ok=2 redirected=1 broken=1 failed=1' in out
+    assert f"1903.1/4: {server.base_url}/missing: 404" in out
+
+    checks = {check.handle.suffix: check for check in HandleLinkCheck.objects.select_related('handle')}
+    assert checks[1].status == 200
+    assert checks[2].status == 301
+    assert checks[2].location == f"{server.base_url}/ok"
+    # Falls back to GET, when HEAD is not allowed
+    assert checks[3].status == 200
+    assert checks[4].status == 404
+    assert checks[5].status is None
+    assert checks[5].error == 'Timed out after 0.5s'
+
+@pytest.mark.django_db
+def test_db_check_links_skips_recently_checked_handles(server, handles):
+    check_links()
+    assert 'Checked 0 URL(s)' in check_links()
+
+    HandleLinkCheck.objects.filter(handle=handles[0]).update(checked=timezone.now() - timedelta(days=2))
+    assert 'Checked 1 URL(s): ok=1' in check_links()
+    assert HandleLinkCheck.objects.count() == 5
+
+    assert 'Checked 5 URL(s)' in check_links('--recheck-hours', '0')
+
+@pytest.mark.django_db
+def test_check_urls_reuses_connections_to_each_host(server):
+    rows = [(i, f"{server.base_url}/ok") for i in range(20)]
+    results = list(check_urls(rows, concurrency=10, per_host=2))
+
+    assert sorted(key for key, _, _ in results) == list(range(20))
+    assert {result.status for _, _, result in results} == {200}
+    # At most two concurrent requests, each on a reused connection
+    assert server.connections <= 2
+
+def test_check_urls_reports_invalid_urls(server):
+    rows = [(1, 'ftp://example.edu/'), (2, 'not a URL'), (3, f"{server.base_url}/ok?x=1 2")]
+    results = {key: result for key, _, result in check_urls(rows)}
+
+    assert results[1].error == 'Invalid URL: Not an HTTP URL'
+    assert results[2].error == 'Invalid URL: Not an HTTP URL'
+    # Unquoted characters are quoted
+    assert results[3].status == 200
+
+@pytest.mark.django_db
+def test_db_check_links_requires_aiohttp(handles, monkeypatch):
+    monkeypatch.setattr(link_check, 'aiohttp', None)
+    with pytest.raises(CommandError, match='"aiohttp" package'):
+        check_links()
@@ -0,0 +1,63 @@
+import json
+import pytest
+from io import StringIO
+from django.core.management import call_command
+from umd_handle.api.models import Handle
+
+
+@pytest.fixture(autouse=True)
+def no_settle_time(settings):
+    settings.CHANGE_FEED_SETTLE_SECONDS = 0
+
+@pytest.fixture
+def handles():
+    return [
+        Handle.objects.create(
+            prefix='1903.1', suffix=suffix, url=f"http://example.com/{suffix}",
+            repo='aspace', repo_id=f"r{suffix}"
+        )
+        for suffix in range(1, 4)
+    ]
+
+def export_changes(**options):
+    out = StringIO()
+    call_command('db_export_changes', stdout=out, stderr=StringIO(), **options)
+    return [json.loads(line) for line in out.getvalue().splitlines()]
+
+@pytest.mark.django_db
+def test_db_export_changes_exports_all_handles(handles):
+    changes = export_changes()
+    assert [c['handle']['suffix'] for c in changes] == ['1', '2', '3']
+
+@pytest.mark.django_db
+def test_db_export_changes_resumes_from_cursor_file(handles, tmp_path):
+    cursor_file = tmp_path / 'cursor'
+
+    assert len(export_changes(cursor_file=str(cursor_file), limit=2)) == 2
+    changes = export_changes(cursor_file=str(cursor_file))
+    assert [c['handle']['suffix'] for c in changes] == ['3']
+    assert export_changes(cursor_file=str(cursor_file)) == []
+
+    handles[0].notes = 'Updated'
+    handles[0].save()
+    changes = export_changes(cursor_file=str(cursor_file))
+    assert [c['handle']['notes'] for c in changes] == ['Updated']
+
+@pytest.mark.django_db
+def test_db_export_changes_includes_imported_handles(handles, tmp_path):
+    cursor_file = tmp_path / 'cursor'
+    export_changes(cursor_file=str(cursor_file))
+
+    # An import (of handles last updated long before the cursor) after the
+    # last export
+    csv_file = tmp_path / 'handles.csv'
+    csv_file.write_text(
+        'id,prefix,suffix,url,repo,repo_id,description,notes,created_at,updated_at\n'
+        '2,1903.1,2,http://example.com/imported,aspace,r2,,,2020-01-01T00:00:00Z,2020-01-02T00:00:00Z\n'
+        '9,1903.1,9,http://example.com/9,aspace,r9,,,2020-01-01T00:00:00Z,2020-01-02T00:00:00Z\n'
+    )
+    call_command('db_import_handles_from_csv', str(csv_file), stdout=StringIO(), stderr=StringIO())
+
+    changes = export_changes(cursor_file=str(cursor_file))
+    assert [c['handle']['suffix'] for c in changes] == ['2', '9']
+    assert changes[0]['handle']['url'] == 'http://example.com/imported'
@@ -0,0 +1,97 @@
+import pytest
+from io import StringIO
+from django.core.management import call_command
+from django.utils import timezone
+from umd_handle.api.models import Handle, HandleHistory
+
+
+@pytest.fixture(autouse=True)
+def no_settle_time(settings):
+    settings.CHANGE_FEED_SETTLE_SECONDS = 0
+
+@pytest.fixture
+def handles():
+    return [
+        Handle.objects.create(
+            prefix='1903.1', suffix=suffix, url=f"http://example.com/{suffix}",
+            repo='aspace', repo_id=f"r{suffix}"
+        )
+        for suffix in range(1, 4)
+    ]
+
+def export_batch(*args):
+    out = StringIO()
+    call_command('db_export_handle_net_batch', *args, stdout=out, stderr=StringIO())
+    return out.getvalue()
+
+@pytest.mark.django_db
+def test_db_export_handle_net_batch_creates_every_handle(handles):
+    batch = export_batch()
+    assert batch.startswith(
+        'CREATE 1903.1/1\n'
+        '100 HS_ADMIN 86400 1110 ADMIN 300:111111111111:0.NA/1903.1\n'
+        '1 URL 86400 1110 UTF8 http://example.com/1\n'
+        '\n'
+        'CREATE 1903.1/2\n'
+    )
+    assert batch.count('CREATE ') == 3
+
+@pytest.mark.django_db
+def test_db_export_handle_net_batch_exports_changes_since_cursor(handles, tmp_path):
+    cursor_file = tmp_path / 'cursor'
+    export_batch('--cursor-file', str(cursor_file))
+    assert export_batch('--cursor-file', str(cursor_file)) == ''
+
+    handles[0].url = 'https://example.com/new'
+    handles[0].save()
+    Handle.objects.create(prefix='1903.1', suffix=4, url='http://example.com/4', repo='aspace', repo_id='r4')
+    HandleHistory.objects.create(
+        prefix='1903.1', suffix=3, action=HandleHistory.ACTION_DELETE, created=timezone.now()
+    )
+    handles[2].delete()
+
+    batch = export_batch('--cursor-file', str(cursor_file))
+    assert batch.split('\n\n') == [
+        'MODIFY 1903.1/1\n1 URL 86400 1110 UTF8 https://example.com/new',
+        (
+            'CREATE 1903.1/4\n'
+            '100 HS_ADMIN 86400 1110 ADMIN 300:111111111111:0.NA/1903.1\n'
+            '1 URL 86400 1110 UTF8 http://example.com/4'
+        ),
+        'DELETE 1903.1/3',
+        '',
+    ]
+    assert export_batch('--cursor-file', str(cursor_file)) == ''
+
+@pytest.mark.django_db
+def test_db_export_handle_net_batch_splits_output_into_files(handles, tmp_path, settings):
+    settings.HANDLE_NET_ADMIN = '200:1903.1/ADMIN'
+    output = tmp_path / 'batch.txt'
+    call_command(
+        'db_export_handle_net_batch', '--output', str(output), '--per-file', '2', stdout=StringIO(), stderr=StringIO()
+    )
+
+    assert not output.exists()
+    first = (tmp_path / 'batch-0001.txt').read_text()
+    second = (tmp_path / 'batch-0002.txt').read_text()
+    assert first.count('CREATE ') == 2
+    assert '300:111111111111:0.NA' not in first
+    assert '200:111111111111:1903.1/ADMIN' in first
+    assert second.startswith('CREATE 1903.1/3\n')
+    assert second.count('CREATE ') == 1
+
+@pytest.mark.django_db
+def test_db_export_handle_net_batch_includes_imported_handles(handles, tmp_path):
+    cursor_file = tmp_path / 'cursor'
+    export_batch('--cursor-file', str(cursor_file))
+
+    # Handles imported from the Rails-based application are already
+    # registered, so are modified
+    csv_file = tmp_path / 'handles.csv'
+    csv_file.write_text(
+        'id,prefix,suffix,url,repo,repo_id,description,notes,created_at,updated_at\n'
+        '9,1903.1,9,http://example.com/9,aspace,r9,,,2020-01-01T00:00:00Z,2020-01-02T00:00:00Z\n'
+    )
+    call_command('db_import_handles_from_csv', str(csv_file), stdout=StringIO(), stderr=StringIO())
+
+    assert export_batch('--cursor-file', str(cursor_file)) == 'MODIFY 1903.1/9\n1 URL 86400 1110 UTF8 http://example.com/9\n\n'
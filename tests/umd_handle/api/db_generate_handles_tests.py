@@ -0,0 +1,47 @@
+import pytest
+from django.core.management import call_command
+from umd_handle.api.models import Handle
+from umd_handle.api.synthetic import DEFAULT_END
+
+
+@pytest.mark.django_db
+def test_db_generate_handles_creates_handles():
+    call_command('db_generate_handles', 50, chunk_size=20)
+
+    assert Handle.objects.count() == 50
+    suffixes = sorted(Handle.objects.values_list('suffix', flat=True))
+    assert suffixes == list(range(1, 51))
+    assert set(Handle.objects.values_list('repo', flat=True)) == set(Handle.ALLOWED_REPOS)
+
+    # Generated timestamps are preserved, rather than set to the current time
+    for handle in Handle.objects.all():
+        assert handle.created <= handle.modified <= DEFAULT_END
+        handle.full_clean()
+
+@pytest.mark.django_db
+def test_db_generate_handles_continues_from_max_suffix():
+    Handle.objects.create(prefix='1903.1', suffix=100, url='http://example.com/', repo='aspace', repo_id='r1')
+
+    call_command('db_generate_handles', 5)
+
+    assert Handle.objects.filter(suffix__gt=100).count() == 5
+
+@pytest.mark.django_db
+def test_db_generate_handles_is_reproducible(tmp_path):
+    csv1 = tmp_path / 'handles1.csv'
+    csv2 = tmp_path / 'handles2.csv'
+
+    call_command('db_generate_handles', 25, seed=7, csv_file=str(csv1), csv_only=True)
+    call_command('db_generate_handles', 25, seed=7, csv_file=str(csv2), csv_only=True)
+
+    assert csv1.read_text() == csv2.read_text()
+    assert not Handle.objects.exists()
+
+@pytest.mark.django_db
+def test_db_generate_handles_csv_can_be_imported(tmp_path):
+    csv_file = tmp_path / 'handles.csv'
+    call_command('db_generate_handles', 25, csv_file=str(csv_file), csv_only=True)
+
+    call_command('db_import_handles_from_csv', str(csv_file))
+
+    assert Handle.objects.count() == 25
@@ -0,0 +1,154 @@
+import bz2
+import csv
+import gzip
+import io
+import json
+import lzma
+import pytest
+import sys
+from io import StringIO
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from umd_handle.api.csv_import import CSVImportReader
+from umd_handle.api.models import Handle
+
+HEADER = ['id', 'prefix', 'suffix', 'url', 'repo', 'repo_id', 'description', 'notes', 'created_at', 'updated_at']
+
+
+@pytest.fixture
+def csv_file(tmp_path):
+    """
+    Creates a CSV file of 10 handles, where row 5 (suffix 4) has an invalid
+    URL, and row 8 (suffix 7) has a multi-line description
+    """
+    path = tmp_path / 'handles.csv'
+    with open(path, 'w', newline='', encoding='utf-8') as f:
+        writer = csv.writer(f)
+        writer.writerow(HEADER)
+        for suffix in range(1, 11):
+            url = 'ftp://example.com/' if suffix == 4 else f"http://example.com/{suffix}"
+            description = 'Line 1\nLine 2' if suffix == 7 else f"Handle {suffix}"
+            writer.writerow([
+                suffix, '1903.1', suffix, url, 'fcrepo', f"fc-{suffix}", description, '',
+                '2020-01-01T00:00:00Z', '2020-01-02T00:00:00Z',
+            ])
+    return path
+
+def import_handles(*args, **options):
+    out = StringIO()
+    err = StringIO()
+    call_command('db_import_handles_from_csv', *args, stdout=out, stderr=err, **options)
+    return out.getvalue(), err.getvalue()
+
+@pytest.mark.django_db
+def test_import_writes_errors_to_errors_file(csv_file, tmp_path):
+    errors_file = tmp_path / 'errors.csv'
+    out, _ = import_handles(str(csv_file), errors_file=str(errors_file))
+
+    assert 'created=9 updated=0 skipped=0 errors=1' in out
+    with open(errors_file, newline='') as f:
+        rows = list(csv.reader(f))
+    assert rows[0] == ['row', 'message']
+    assert rows[1][0] == '5'
+    assert 'ftp://example.com/' in rows[1][1]
+    assert Handle.objects.get(suffix=7).description == 'Line 1\nLine 2'
+
+@pytest.mark.django_db
+def test_import_keeps_csv_timestamps(csv_file):
+    import_handles(str(csv_file))
+
+    handle = Handle.objects.get(suffix=1)
+    assert handle.created.isoformat() == '2020-01-01T00:00:00+00:00'
+    assert handle.legacy_modified.isoformat() == '2020-01-02T00:00:00+00:00'
+    # The "modified" timestamp is the time of the import
+    assert handle.modified > handle.legacy_modified
+
+@pytest.mark.django_db
+def test_import_reports_progress(csv_file):
+    _, err = import_handles(str(csv_file), progress_seconds=0)
+    assert 'rows/sec' in err
+    assert '100.0% done, ETA 0:00:00' in err
+
+@pytest.mark.django_db
+def test_interrupted_import_can_be_resumed(csv_file, tmp_path):
+    checkpoint_file = tmp_path / 'import.checkpoint'
+
+    # Simulates an import that stops while importing row 9 (suffix 8)
+    with CSVImportReader(str(csv_file), checkpoint_file=str(checkpoint_file), progress_seconds=0) as reader:
+        for rownum, row in reader:
+            if rownum == 9:
+                break
+
+    checkpoint = json.loads(checkpoint_file.read_text())
+    assert checkpoint['row'] == 8
+    assert not checkpoint['complete']
+
+    out, err = import_handles(str(csv_file), checkpoint_file=str(checkpoint_file), resume=True)
+    assert 'Resuming after row 8' in err
+    assert 'created=3 updated=0 skipped=0 errors=0' in out
+    assert sorted(Handle.objects.values_list('suffix', flat=True)) == [8, 9, 10]
+    assert json.loads(checkpoint_file.read_text())['complete']
+
+    # Resuming a completed import does nothing
+    out, _ = import_handles(str(csv_file), checkpoint_file=str(checkpoint_file), resume=True)
+    assert 'created=0 updated=0 skipped=0 errors=0' in out
+
+@pytest.mark.django_db
+def test_resume_requires_checkpoint_for_same_file(csv_file, tmp_path):
+    checkpoint_file = tmp_path / 'import.checkpoint'
+    checkpoint_file.write_text(json.dumps({'path': '/other.csv', 'row': 2, 'offset': 10, 'complete': False}))
+
+    with pytest.raises(CommandError, match='another CSV file'):
+        import_handles(str(csv_file), checkpoint_file=str(checkpoint_file), resume=True)
+    with pytest.raises(CommandError, match='--resume requires --checkpoint-file'):
+        import_handles(str(csv_file), resume=True)
+
+def compress(path, compression):
+    data = path.read_bytes()
+    if compression == 'zstd':
+        zstandard = pytest.importorskip('zstandard')
+        return zstandard.ZstdCompressor().compress(data)
+    module = {'gzip': gzip, 'bzip2': bz2, 'xz': lzma}[compression]
+    return module.compress(data)
+
+@pytest.mark.django_db
+@pytest.mark.parametrize('compression,extension', [('gzip', 'gz'), ('bzip2', 'bz2'), ('xz', 'xz'), ('zstd', 'zst')])
+def test_import_decompresses_compressed_files(csv_file, tmp_path, compression, extension):
+    compressed_file = tmp_path / f"handles.csv.{extension}"
+    compressed_file.write_bytes(compress(csv_file, compression))
+
+    out, err = import_handles(str(compressed_file), progress_seconds=0)
+    assert 'created=9 updated=0 skipped=0 errors=1' in out
+    assert 'Row 11: 10 rows' in err
+    assert Handle.objects.get(suffix=7).description == 'Line 1\nLine 2'
+
+@pytest.mark.django_db
+@pytest.mark.parametrize('compression,extension', [('gzip', 'gz'), ('zstd', 'zst')])
+def test_resume_of_compressed_file_continues_after_checkpoint(csv_file, tmp_path, compression, extension):
+    # Seeks to the checkpoint in a gzip file, but the zstd stream is not
+    # seekable, so the imported rows are skipped
+    compressed_file = tmp_path / f"handles.csv.{extension}"
+    compressed_file.write_bytes(compress(csv_file, compression))
+    checkpoint_file = tmp_path / 'import.checkpoint'
+
+    with CSVImportReader(str(compressed_file), checkpoint_file=str(checkpoint_file), progress_seconds=0) as reader:
+        for rownum, row in reader:
+            if rownum == 9:
+                break
+
+    out, _ = import_handles(str(compressed_file), checkpoint_file=str(checkpoint_file), resume=True)
+    assert 'created=3 updated=0 skipped=0 errors=0' in out
+    assert sorted(Handle.objects.values_list('suffix', flat=True)) == [8, 9, 10]
+
+@pytest.mark.django_db
+@pytest.mark.parametrize('compression', [None, 'gzip'])
+def test_import_reads_stdin(csv_file, tmp_path, monkeypatch, compression):
+    data = compress(csv_file, compression) if compression else csv_file.read_bytes()
+    monkeypatch.setattr(sys, 'stdin', io.TextIOWrapper(io.BufferedReader(io.BytesIO(data))))
+    checkpoint_file = tmp_path / 'import.checkpoint'
+    checkpoint_file.write_text(json.dumps({'path': '-', 'row': 8, 'offset': 0, 'complete': False}))
+
+    # Rows that cannot be seeked to are skipped
+    out, _ = import_handles('-', checkpoint_file=str(checkpoint_file), resume=True)
+    assert 'created=3 updated=0 skipped=0 errors=0' in out
+    assert sorted(Handle.objects.values_list('suffix', flat=True)) == [8, 9, 10]
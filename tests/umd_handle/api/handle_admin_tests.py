@@ -0,0 +1,132 @@
+import pytest
+from django.contrib import admin
+from django.core.cache import cache
+from umd_handle.api import paginators
+from umd_handle.api.models import Handle
+
+CHANGELIST_URL = '/admin/api/handle/'
+
+
+@pytest.fixture
+def handles():
+    """
+    Creates handles with suffixes that sort differently as strings and as
+    integers.
+    """
+    return [
+        Handle.objects.create(
+            prefix='1903.1', suffix=suffix, url='http://example.com/',
+            repo='fcrepo', repo_id=f"repo-id-{suffix}"
+        )
+        for suffix in (2, 10, 1)
+    ]
+
+def changelist_suffixes(response):
+    return [handle.suffix for handle in response.context['cl'].result_list]
+
+@pytest.mark.django_db
+def test_changelist_default_ordering_is_modified_descending(admin_client, handles):
+    response = admin_client.get(CHANGELIST_URL)
+    assert response.status_code == 200
+    assert response.context['cl'].queryset.query.order_by[:2] == ('-modified', '-id')
+    assert changelist_suffixes(response) == [1, 10, 2]
+
+@pytest.mark.django_db
+def test_changelist_handle_column_sorts_by_prefix_and_suffix(admin_client, handles):
+    # "o=1" is the "Handle" column (column 0 is the action checkbox)
+    response = admin_client.get(CHANGELIST_URL, {'o': '1'})
+    assert response.context['cl'].queryset.query.order_by == ('prefix', 'suffix')
+    assert changelist_suffixes(response) == [1, 2, 10]
+
+    response = admin_client.get(CHANGELIST_URL, {'o': '-1'})
+    assert response.context['cl'].queryset.query.order_by == ('-prefix', '-suffix')
+    assert changelist_suffixes(response) == [10, 2, 1]
+
+@pytest.fixture
+def searchable_handles():
+    return [
+        Handle.objects.create(
+            prefix='1903.1', suffix=1, url='https://digital.lib.umd.edu/result/id/abc',
+            repo='fcrepo', repo_id='fcrepo:abc', description='Diamondback newspaper'
+        ),
+        Handle.objects.create(
+            prefix='1903.1', suffix=12, url='https://av.lib.umd.edu/media_objects/vq27zn67m',
+            repo='avalon', repo_id='vq27zn67m', notes='Oral history interview'
+        ),
+    ]
+
+def search_suffixes(admin_client, search_term):
+    response = admin_client.get(CHANGELIST_URL, {'q': search_term})
+    assert response.status_code == 200
+    return sorted(changelist_suffixes(response))
+
+@pytest.mark.django_db
+def test_search_by_handle_uses_exact_match(admin_client, searchable_handles):
+    assert search_suffixes(admin_client, '1903.1/1') == [1]
+    assert search_suffixes(admin_client, '1903.1/12') == [12]
+
+@pytest.mark.django_db
+def test_search_by_repo_id_uses_exact_match(admin_client, searchable_handles):
+    assert search_suffixes(admin_client, 'vq27zn67m') == [12]
+
+@pytest.mark.django_db
+def test_search_by_repo_id_also_matches_substrings(admin_client, searchable_handles):
+    Handle.objects.filter(suffix=1).update(notes='Digitized from vq27zn67m')
+    assert search_suffixes(admin_client, 'vq27zn67m') == [1, 12]
+
+@pytest.mark.django_db
+def test_search_matches_substrings_of_any_field(admin_client, searchable_handles):
+    assert search_suffixes(admin_client, 'diamond') == [1]
+    assert search_suffixes(admin_client, 'HISTORY') == [12]
+    assert search_suffixes(admin_client, 'media_objects') == [12]
+    assert search_suffixes(admin_client, 'lib.umd.edu') == [1, 12]
+    assert search_suffixes(admin_client, 'oral interview') == [12]
+    assert search_suffixes(admin_client, 'oral newspaper') == []
+    # Short terms fall back to "icontains" lookups
+    assert search_suffixes(admin_client, '12') == [12]
+
+@pytest.mark.django_db
+def test_search_index_is_updated_when_handles_change(admin_client, searchable_handles):
+    handle = searchable_handles[0]
+    handle.description = 'Terrapin yearbook'
+    handle.save()
+
+    assert search_suffixes(admin_client, 'diamond') == []
+    assert search_suffixes(admin_client, 'yearbook') == [1]
+
+    handle.delete()
+    assert search_suffixes(admin_client, 'yearbook') == []
+
+@pytest.fixture
+def handle_admin(monkeypatch):
+    """
+    The Handle admin, with two handles per page.
+    """
+    handle_admin = admin.site._registry[Handle]
+    monkeypatch.setattr(handle_admin, 'list_per_page', 2)
+    cache.clear()
+    yield handle_admin
+    cache.clear()
+
+@pytest.mark.django_db
+def test_changelist_paginates_and_filters(admin_client, handles, handle_admin):
+    Handle.objects.create(prefix='1903.1', suffix=3, url='http://example.com/', repo='aspace', repo_id='aspace-3')
+
+    response = admin_client.get(CHANGELIST_URL, {'repo__exact': 'fcrepo', 'o': '1', 'p': '2'})
+    assert response.status_code == 200
+    cl = response.context['cl']
+    assert cl.result_count == 3
+    assert cl.paginator.num_pages == 2
+    assert changelist_suffixes(response) == [10]
+    assert cl.full_result_count is None
+
+@pytest.mark.django_db
+def test_changelist_page_count_uses_estimated_count(admin_client, handles, handle_admin, settings, monkeypatch):
+    settings.ADMIN_COUNT_ESTIMATE_THRESHOLD = 100
+    monkeypatch.setattr(paginators, 'planner_estimate', lambda queryset: 1000)
+
+    response = admin_client.get(CHANGELIST_URL, {'repo__exact': 'fcrepo', 'o': '1', 'p': '2'})
+    cl = response.context['cl']
+    assert cl.result_count == 1000
+    assert cl.paginator.num_pages == 500
+    assert changelist_suffixes(response) == [10]
@@ -1,7 +1,12 @@
+import datetime
 import json
 import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
-from umd_handle.api.models import Handle
+from umd_handle.api import models
+from umd_handle.api.conditional import handle_etag, if_match_versions
+from umd_handle.api.models import Handle, HandleHistory
 from umd_handle.api.tokens import create_jwt_token
 
 
@@ -177,7 +182,7 @@ def test_handles_prefix_suffix_get_returns_404_for_unknown_handle(client, jwt_to
 
 @pytest.mark.django_db
 def test_handles_mint_new_handle_success(settings, client, jwt_token):
-    url = reverse('handles_mint_new_handle')
+    url = reverse('handles')
     headers = {'Authorization': f"Bearer {jwt_token}"}
     body = {
         'prefix': '1903.1',
@@ -207,7 +212,7 @@ def test_handles_mint_new_handle_with_trailing_colon_in_hostname(settings, clien
     As of Django 5.2, the Django URLValidator does not accept this as a valid
     URL, but the Python"urllib.parse" method does.
     """
-    url = reverse('handles_mint_new_handle')
+    url = reverse('handles')
     headers = {'Authorization': f"Bearer {jwt_token}"}
     body = {
         'prefix': '1903.1',
@@ -229,7 +234,7 @@ def test_handles_mint_new_handle_with_trailing_colon_in_hostname(settings, clien
 
 @pytest.mark.django_db
 def test_handles_mint_new_handle_requires_jwt_token(client):
-    url = reverse('handles_mint_new_handle')
+    url = reverse('handles')
     body = {
         'prefix': '1903.1',
         'url': 'http://example.com/test',
@@ -244,7 +249,7 @@ def test_handles_mint_new_handle_requires_jwt_token(client):
 
 @pytest.mark.django_db
 def test_handles_mint_new_handle_validation_errors(client, jwt_token):
-    url = reverse('handles_mint_new_handle')
+    url = reverse('handles')
     headers = {'Authorization': f"Bearer {jwt_token}"}
 
     # missing required parameter 'repo'
@@ -275,6 +280,41 @@ def test_handles_mint_new_handle_validation_errors(client, jwt_token):
     assert any("BAD_PREFIX" in e for e in errors)
 
 
+def handle_queries(queries):
+    """
+    Returns the SQL of the given captured queries that use the handle table
+    """
+    return [q['sql'] for q in queries if '"api_handle"' in q['sql']]
+
+@pytest.mark.django_db
+def test_handles_mint_new_handle_does_not_query_for_uniqueness(client, jwt_token):
+    headers = {'Authorization': f"Bearer {jwt_token}"}
+    body = {'prefix': '1903.1', 'url': 'http://example.com/test', 'repo': 'fedora2', 'repo_id': 'test-123'}
+
+    with CaptureQueriesContext(connection) as context:
+        response = client.post(
+            reverse('handles'), data=json.dumps(body), content_type='application/json', headers=headers
+        )
+    assert response.status_code == 200
+
+    # Only the next suffix query, and the insert
+    queries = handle_queries(context.captured_queries)
+    assert len(queries) == 2
+    assert queries[0].startswith('SELECT MAX(')
+    assert queries[1].startswith('INSERT INTO')
+
+@pytest.mark.django_db
+def test_handles_mint_new_handle_reports_duplicate_suffix_as_error(client, jwt_token, handle1, monkeypatch):
+    # Simulates a concurrent mint allocating the same suffix
+    monkeypatch.setattr(models, 'next_suffix', lambda prefix: handle1.suffix)
+    headers = {'Authorization': f"Bearer {jwt_token}"}
+    body = {'prefix': '1903.1', 'url': 'http://example.com/test', 'repo': 'fedora2', 'repo_id': 'test-123'}
+
+    response = client.post(reverse('handles'), data=json.dumps(body), content_type='application/json', headers=headers)
+    assert response.status_code == 400
+    assert response.json() == {'errors': ['Handle with this Prefix and Suffix already exists.']}
+    assert Handle.objects.count() == 1
+
 @pytest.mark.django_db
 def test_handles_prefix_suffix_patch_requires_jwt_token(client, handle1):
     prefix = handle1.prefix
@@ -337,6 +377,100 @@ def test_handles_prefix_suffix_patch_validation_errors(client, jwt_token, handle
     assert any('INVALID_REPO' in e for e in errors)
 
 
+@pytest.mark.django_db
+def test_handles_prefix_suffix_patch_only_updates_changed_fields(client, jwt_token, handle1):
+    headers = {'Authorization': f"Bearer {jwt_token}"}
+    url = reverse('handles_prefix_suffix', kwargs={'prefix': handle1.prefix, 'suffix': handle1.suffix})
+    body = {'url': 'https://example.org/updated', 'repo': handle1.repo}
+
+    with CaptureQueriesContext(connection) as context:
+        response = client.patch(url, data=json.dumps(body), content_type='application/json', headers=headers)
+    assert response.status_code == 200
+
+    # Only the handle lookup, and an update of the changed field, without a
+    # uniqueness query
+    queries = handle_queries(context.captured_queries)
+    assert len(queries) == 2
+    assert queries[0].startswith('SELECT')
+    assert queries[1].startswith('UPDATE')
+    assert '"url" = ' in queries[1]
+    assert '"repo" = ' not in queries[1]
+    assert Handle.objects.get(pk=handle1.pk).url == 'https://example.org/updated'
+
+    # An unchanged handle is not saved
+    with CaptureQueriesContext(connection) as context:
+        response = client.patch(url, data=json.dumps(body), content_type='application/json', headers=headers)
+    assert response.status_code == 200
+    assert len(handle_queries(context.captured_queries)) == 1
+
+
+def patch_handle(client, jwt_token, handle, body, **headers):
+    return client.patch(
+        reverse('handles_prefix_suffix', kwargs={'prefix': handle.prefix, 'suffix': handle.suffix}),
+        data=json.dumps(body), content_type='application/json',
+        headers={'Authorization': f"Bearer {jwt_token}", **headers}
+    )
+
+@pytest.mark.django_db
+def test_handles_prefix_suffix_patch_with_if_match_detects_concurrent_changes(client, jwt_token, handle1):
+    response = client.get(
+        reverse('handles_prefix_suffix', kwargs={'prefix': handle1.prefix, 'suffix': handle1.suffix}),
+        headers={'Authorization': f"Bearer {jwt_token}"}
+    )
+    etag = response['ETag']
+    assert etag == handle_etag(handle1)
+
+    # The first editor's change is made, and returns the new version
+    response = patch_handle(client, jwt_token, handle1, {'url': 'https://example.org/first'}, if_match=etag)
+    assert response.status_code == 200
+    assert response.json()['request']['url'] == 'https://example.org/first'
+    new_etag = response['ETag']
+    assert new_etag != etag
+
+    # The second editor's change (using the old version) is rejected
+    response = patch_handle(client, jwt_token, handle1, {'url': 'https://example.org/second'}, if_match=etag)
+    assert response.status_code == 412
+    assert response.json() == {'errors': ['Handle 1903.1/1 has been modified']}
+
+    handle = Handle.objects.get(pk=handle1.pk)
+    assert handle.url == 'https://example.org/first'
+    assert handle_etag(handle) == new_etag
+
+    # The change is recorded in the history
+    entry = HandleHistory.objects.get(handle_id=handle1.pk)
+    assert entry.before == {'url': 'http://example.com/'}
+    assert entry.after == {'url': 'https://example.org/first'}
+
+@pytest.mark.django_db
+def test_handles_prefix_suffix_patch_with_if_match_validates_fields(client, jwt_token, handle1):
+    response = patch_handle(client, jwt_token, handle1, {'repo': 'INVALID_REPO'}, if_match=handle_etag(handle1))
+    assert response.status_code == 400
+    assert any('INVALID_REPO' in e for e in response.json()['errors'])
+    assert Handle.objects.get(pk=handle1.pk).repo == 'fcrepo'
+
+@pytest.mark.django_db
+def test_handles_prefix_suffix_patch_with_if_match_for_unknown_handle(client, jwt_token):
+    handle = Handle(prefix='1903.1', suffix=99)
+    response = patch_handle(client, jwt_token, handle, {'url': 'https://example.org/'}, if_match='"1"')
+    assert response.status_code == 404
+
+@pytest.mark.django_db
+def test_handles_prefix_suffix_patch_with_if_match_any_version(client, jwt_token, handle1):
+    response = patch_handle(client, jwt_token, handle1, {'url': 'https://example.org/any'}, if_match='*')
+    assert response.status_code == 200
+    assert Handle.objects.get(pk=handle1.pk).url == 'https://example.org/any'
+
+@pytest.mark.parametrize('header', ['W/"1"', '"not-a-version"', '""'])
+def test_if_match_versions_ignores_other_etags(header):
+    assert if_match_versions(header) == []
+
+def test_if_match_versions_returns_handle_versions():
+    modified = datetime.datetime(2025, 1, 2, 3, 4, 5, 678901, tzinfo=datetime.UTC)
+    etag = handle_etag(Handle(modified=modified))
+    assert if_match_versions(f'W/"1", {etag}') == [modified]
+    assert if_match_versions('*') is None
+
+
 @pytest.mark.django_db
 def test_handles_prefix_suffix_patch_returns_404_for_unknown_handle(client, jwt_token):
     prefix = 'UNKNOWN_PREFIX'
@@ -351,3 +485,185 @@ def test_handles_prefix_suffix_patch_returns_404_for_unknown_handle(client, jwt_
     )
 
     assert response.status_code == 404
+
+
+@pytest.fixture
+def many_handles():
+    """
+    Creates 25 handles, alternating between the "avalon" and "fcrepo" repos
+    """
+    return [
+        Handle.objects.create(
+            prefix='1903.1', suffix=suffix, url=f"http://example.com/{suffix}",
+            repo='avalon' if suffix % 2 else 'fcrepo', repo_id=f"repo-id-{suffix}"
+        )
+        for suffix in range(1, 26)
+    ]
+
+
+def list_all_pages(client, headers, **params):
+    """
+    Follows the "next_cursor" of each page, returning a list of the pages.
+    """
+    pages = []
+    cursor = None
+    while True:
+        data = dict(params, **({'cursor': cursor} if cursor else {}))
+        response = client.get(reverse('handles'), data=data, headers=headers)
+        assert response.status_code == 200
+        pages.append(response.json())
+        cursor = pages[-1]['next_cursor']
+        if not cursor:
+            return pages
+
+
+@pytest.mark.django_db
+def test_handles_list_requires_jwt_token(client):
+    response = client.get(reverse('handles'))
+    assert response.status_code == 401
+
+
+@pytest.mark.django_db
+def test_handles_list_returns_handles(client, jwt_token, handle1):
+    headers = {'Authorization': f"Bearer {jwt_token}"}
+    response = client.get(reverse('handles'), headers=headers)
+    assert response.status_code == 200
+    data = response.json()
+    assert data['next_cursor'] is None
+    assert len(data['handles']) == 1
+    handle = data['handles'][0]
+    assert handle['prefix'] == '1903.1'
+    assert handle['suffix'] == '1'
+    assert handle['handle_url'] == 'http://hdl-local.lib.umd.edu/1903.1/1'
+    assert handle['url'] == 'http://example.com/'
+    assert handle['repo'] == 'fcrepo'
+
+
+@pytest.mark.django_db
+def test_handles_list_pages_by_handle(client, jwt_token, many_handles):
+    headers = {'Authorization': f"Bearer {jwt_token}"}
+    pages = list_all_pages(client, headers, limit=10)
+
+    assert [len(page['handles']) for page in pages] == [10, 10, 5]
+    suffixes = [int(h['suffix']) for page in pages for h in page['handles']]
+    assert suffixes == list(range(1, 26))
+
+
+@pytest.mark.django_db
+def test_handles_list_pages_by_modified(client, jwt_token, many_handles):
+    headers = {'Authorization': f"Bearer {jwt_token}"}
+    # Give several handles the same "modified" timestamp, to exercise the
+    # "id" tie-breaker
+    Handle.objects.filter(suffix__lte=12).update(modified=many_handles[20].modified)
+
+    pages = list_all_pages(client, headers, order='modified', limit=4)
+
+    handles = [h for page in pages for h in page['handles']]
+    assert len(handles) == 25
+    assert len({h['suffix'] for h in handles}) == 25
+    assert [h['modified'] for h in handles] == sorted(h['modified'] for h in handles)
+
+
+@pytest.mark.django_db
+def test_handles_list_returns_legacy_modified(client, jwt_token, handle1):
+    headers = {'Authorization': f"Bearer {jwt_token}"}
+    assert client.get(reverse("handles"), headers=headers).json()['handles'][0]['legacy_modified'] is None
+
+    Handle.objects.filter(pk=handle1.pk).update(
+        legacy_modified=datetime.datetime(2020, 1, 2, tzinfo=datetime.UTC)
+    )
+    handle = client.get(reverse("handles"), headers=headers).json()['handles'][0]
+    assert handle['legacy_modified'] == '2020-01-02T00:00:00+00:00'
+
+
+@pytest.mark.django_db
+def test_handles_list_filters(client, jwt_token, many_handles):
+    headers = {'Authorization': f"Bearer {jwt_token}"}
+
+    pages = list_all_pages(client, headers, repo='fcrepo', limit=5)
+    handles = [h for page in pages for h in page['handles']]
+    assert len(handles) == 12
+    assert all(h['repo'] == 'fcrepo' for h in handles)
+
+    modified_after = many_handles[19].modified.isoformat()
+    pages = list_all_pages(client, headers, modified_after=modified_after)
+    assert [h['suffix'] for h in pages[0]['handles']] == ['21', '22', '23', '24', '25']
+
+
+@pytest.mark.django_db
+def test_handles_list_caps_page_size(settings, client, jwt_token, many_handles):
+    settings.HANDLES_LIST_MAX_PAGE_SIZE = 20
+    headers = {'Authorization': f"Bearer {jwt_token}"}
+    response = client.get(reverse('handles'), data={'limit': 1000}, headers=headers)
+    assert len(response.json()['handles']) == 20
+
+
+@pytest.mark.django_db
+def test_handles_list_rejects_invalid_parameters(client, jwt_token, many_handles):
+    headers = {'Authorization': f"Bearer {jwt_token}"}
+
+    for params in [{'limit': 'abc'}, {'limit': '0'}, {'order': 'url'}, {'modified_after': 'yesterday'}, {'cursor': 'NOT_A_CURSOR'}]:
+        response = client.get(reverse('handles'), data=params, headers=headers)
+        assert response.status_code == 400
+        assert response.json()['errors']
+
+    # Cursors are only valid for the ordering they were created with
+    response = client.get(reverse('handles'), data={'limit': 5}, headers=headers)
+    cursor = response.json()['next_cursor']
+    response = client.get(reverse('handles'), data={'order': 'modified', 'cursor': cursor}, headers=headers)
+    assert response.status_code == 400
+
+
+def read_changes(response):
+    """
+    Returns the list of changes from a (streamed) change feed response.
+    """
+    content = b''.join(response.streaming_content).decode('utf-8')
+    return [json.loads(line) for line in content.splitlines()]
+
+
+@pytest.mark.django_db
+def test_handles_changes_requires_jwt_token(client):
+    response = client.get(reverse('handles_changes'))
+    assert response.status_code == 401
+
+
+@pytest.mark.django_db
+def test_handles_changes_returns_changes_after_cursor(settings, client, jwt_token, many_handles):
+    settings.CHANGE_FEED_SETTLE_SECONDS = 0
+    headers = {'Authorization': f"Bearer {jwt_token}"}
+
+    response = client.get(reverse('handles_changes'), headers=headers)
+    assert response.status_code == 200
+    assert response['Content-Type'] == 'application/x-ndjson'
+    changes = read_changes(response)
+    assert [c['handle']['suffix'] for c in changes] == [str(s) for s in range(1, 26)]
+
+    # Nothing has changed since the last cursor
+    cursor = changes[-1]['cursor']
+    response = client.get(reverse('handles_changes'), data={'since': cursor}, headers=headers)
+    assert read_changes(response) == []
+
+    # Updated handles are returned after the cursor
+    handle = many_handles[4]
+    handle.url = 'http://example.com/updated'
+    handle.save()
+    response = client.get(reverse('handles_changes'), data={'since': cursor}, headers=headers)
+    changes = read_changes(response)
+    assert [c['handle']['url'] for c in changes] == ['http://example.com/updated']
+
+
+@pytest.mark.django_db
+def test_handles_changes_excludes_unsettled_changes(settings, client, jwt_token, many_handles):
+    settings.CHANGE_FEED_SETTLE_SECONDS = 60
+    headers = {'Authorization': f"Bearer {jwt_token}"}
+    response = client.get(reverse('handles_changes'), headers=headers)
+    assert read_changes(response) == []
+
+
+@pytest.mark.django_db
+def test_handles_changes_rejects_invalid_parameters(client, jwt_token):
+    headers = {'Authorization': f"Bearer {jwt_token}"}
+    for params in [{'since': 'NOT_A_CURSOR'}, {'limit': '-1'}]:
+        response = client.get(reverse('handles_changes'), data=params, headers=headers)
+        assert response.status_code == 400
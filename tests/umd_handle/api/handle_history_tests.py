@@ -0,0 +1,124 @@
+import json
+import pytest
+from django.db import DatabaseError
+from django.urls import reverse
+from umd_handle.api import history
+from umd_handle.api.models import Handle, HandleHistory
+from umd_handle.api.tokens import create_jwt_token
+
+
+@pytest.fixture
+def jwt_token(settings) -> str:
+    settings.JWT_SECRET = 'test_token_secret'
+    return create_jwt_token('pytest history token')
+
+@pytest.fixture
+def handle1():
+    return Handle.objects.create(
+        prefix='1903.1', suffix=1, url='http://example.com/',
+        repo='fcrepo', repo_id='fcrepo-1'
+    )
+
+@pytest.mark.django_db
+def test_patch_records_changed_fields_and_token_description(client, jwt_token, handle1):
+    response = client.patch(
+        reverse('handles_prefix_suffix', kwargs={'prefix': '1903.1', 'suffix': 1}),
+        data=json.dumps({'url': 'http://example.com/new', 'notes': ''}),
+        content_type='application/json',
+        headers={'Authorization': f"Bearer {jwt_token}"}
+    )
+    assert response.status_code == 200
+
+    entry = HandleHistory.objects.get()
+    assert entry.handle == handle1
+    assert (entry.prefix, entry.suffix, entry.action) == ('1903.1', 1, 'update')
+    assert entry.before == {'url': 'http://example.com/'}
+    assert entry.after == {'url': 'http://example.com/new'}
+    assert entry.actor == 'pytest history token'
+
+@pytest.mark.django_db
+def test_patch_without_changes_is_not_recorded(client, jwt_token, handle1):
+    response = client.patch(
+        reverse('handles_prefix_suffix', kwargs={'prefix': '1903.1', 'suffix': 1}),
+        data=json.dumps({'url': 'http://example.com/'}),
+        content_type='application/json',
+        headers={'Authorization': f"Bearer {jwt_token}"}
+    )
+    assert response.status_code == 200
+    assert not HandleHistory.objects.exists()
+
+@pytest.mark.django_db
+def test_mint_records_create(client, jwt_token):
+    response = client.post(
+        reverse('handles'),
+        data=json.dumps({'prefix': '1903.1', 'url': 'http://example.com/', 'repo': 'aspace', 'repo_id': 'a1'}),
+        content_type='application/json',
+        headers={'Authorization': f"Bearer {jwt_token}"}
+    )
+    assert response.status_code == 200
+
+    entry = HandleHistory.objects.get()
+    assert entry.action == 'create'
+    assert entry.before is None
+    assert entry.after['repo_id'] == 'a1'
+
+@pytest.mark.django_db
+def test_admin_changes_record_saml_user(admin_client, admin_user, handle1):
+    response = admin_client.post(f"/admin/api/handle/{handle1.id}/change/", {
+        'url': 'http://example.com/admin', 'repo': 'fcrepo', 'repo_id': 'fcrepo-1',
+        'description': '', 'notes': '',
+    })
+    assert response.status_code == 302
+
+    response = admin_client.post(f"/admin/api/handle/{handle1.id}/delete/", {'post': 'yes'})
+    assert response.status_code == 302
+
+    update, delete = HandleHistory.objects.order_by('id')
+    assert (update.action, update.before, update.after) == (
+        'update', {'url': 'http://example.com/'}, {'url': 'http://example.com/admin'}
+    )
+    assert delete.action == 'delete'
+    assert delete.before['url'] == 'http://example.com/admin'
+    assert {update.actor, delete.actor} == {admin_user.username}
+
+@pytest.mark.django_db
+def test_buffered_entries_are_written_on_commit_and_flush(settings, handle1, django_capture_on_commit_callbacks):
+    settings.HANDLE_HISTORY_ASYNC = True
+    # Keep the background thread from writing the entries during the test
+    settings.HANDLE_HISTORY_FLUSH_SECONDS = 3600
+    writer = history.HistoryWriter()
+    original_writer, history.writer = history.writer, writer
+    try:
+        with django_capture_on_commit_callbacks(execute=True):
+            history.record_create(handle1, 'tester')
+            history.record_delete(handle1, 'tester')
+            # Nothing is buffered until the change is committed
+            assert writer.pending() == 0
+
+        assert writer.pending() == 2
+        assert not HandleHistory.objects.exists()
+
+        assert writer.flush() == 2
+        assert writer.pending() == 0
+        assert list(HandleHistory.objects.order_by('id').values_list('action', flat=True)) == ['create', 'delete']
+    finally:
+        history.writer = original_writer
+
+@pytest.mark.django_db
+def test_failed_write_of_full_buffer_keeps_entries(settings, handle1, monkeypatch):
+    settings.HANDLE_HISTORY_FLUSH_SECONDS = 3600
+    settings.HANDLE_HISTORY_MAX_PENDING = 2
+    writer = history.HistoryWriter()
+
+    def unavailable(*args, **kwargs):
+        raise DatabaseError('Database is unavailable')
+
+    monkeypatch.setattr(HandleHistory.objects, 'bulk_create', unavailable)
+    for action in [HandleHistory.ACTION_CREATE, HandleHistory.ACTION_UPDATE]:
+        # Does not raise, although the buffer is full and cannot be written
+        writer.add(HandleHistory(prefix='1903.1', suffix=1, action=action, actor='tester'))
+    assert writer.pending() == 2
+
+    monkeypatch.undo()
+    assert writer.flush() == 2
+    assert HandleHistory.objects.count() == 2
@@ -0,0 +1,184 @@
+import datetime
+import pytest
+import threading
+from django.db import connection
+from django.urls import reverse
+from django.utils import timezone
+from umd_handle.api import hits
+from umd_handle.api.models import Handle, HandleStats
+from umd_handle.api.tokens import create_jwt_token
+
+requires_postgresql = pytest.mark.skipif(connection.vendor != 'postgresql', reason='requires PostgreSQL')
+
+@pytest.fixture
+def jwt_token(settings):
+    settings.JWT_SECRET = 'test_token_secret'
+    return create_jwt_token('pytest test token')
+
+@pytest.fixture
+def handles():
+    return [
+        Handle.objects.create(
+            prefix='1903.1', suffix=suffix, url=f"http://example.com/{suffix}",
+            repo='aspace' if suffix == 3 else 'fcrepo', repo_id=f"r{suffix}"
+        )
+        for suffix in range(1, 4)
+    ]
+
+def resolve(client, jwt_token, handle):
+    return client.get(
+        reverse('handles_prefix_suffix', args=[handle.prefix, handle.suffix]),
+        headers={'Authorization': f"Bearer {jwt_token}"}
+    )
+
+@pytest.mark.django_db
+def test_resolving_a_handle_counts_the_hit(client, jwt_token, handles):
+    before = timezone.now()
+    for _ in range(2):
+        assert resolve(client, jwt_token, handles[0]).status_code == 200
+
+    stats = HandleStats.objects.get(handle=handles[0])
+    assert stats.hits == 2
+    assert stats.last_accessed >= before
+    assert not HandleStats.objects.filter(handle=handles[1]).exists()
+
+@pytest.mark.django_db
+def test_resolutions_are_not_counted_when_disabled(client, jwt_token, handles, settings):
+    settings.HANDLE_STATS_ENABLED = False
+    assert resolve(client, jwt_token, handles[0]).status_code == 200
+    assert not HandleStats.objects.exists()
+
+@pytest.mark.django_db
+def test_hit_counter_writes_aggregated_counts_in_one_batch(handles, django_assert_num_queries):
+    counter = hits.HitCounter(stripes=4)
+    now = timezone.now()
+
+    def count_hits():
+        for i in range(100):
+            counter.add(handles[i % 2].pk, now + datetime.timedelta(seconds=i))
+
+    threads = [threading.Thread(target=count_hits) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert counter.pending() == 2
+
+    # One multi-row upsert, in a transaction (savepoint)
+    with django_assert_num_queries(3):
+        assert counter.flush() == 2
+    assert counter.flush() == 0
+
+    counter.add(handles[0].pk, now - datetime.timedelta(days=1))
+    # Hits of deleted handles are ignored
+    counter.add(handles[2].pk, now)
+    handles[2].delete()
+    counter.flush()
+
+    stats = {s.handle_id: s for s in HandleStats.objects.all()}
+    assert stats[handles[0].pk].hits == 201
+    assert stats[handles[1].pk].hits == 200
+    # The latest access is kept
+    assert stats[handles[0].pk].last_accessed == now + datetime.timedelta(seconds=98)
+    assert handles[2].pk not in stats
+
+@pytest.mark.django_db
+def test_write_hits_writes_chunks_of_handles(handles, monkeypatch, django_assert_num_queries):
+    monkeypatch.setattr(hits, 'MAX_CHUNK_SIZE', 2)
+    now = timezone.now()
+
+    # Two upserts, in a transaction (savepoint)
+    with django_assert_num_queries(4):
+        hits.write_hits([(handle.pk, (i + 1, now)) for i, handle in enumerate(handles)])
+
+    assert dict(HandleStats.objects.values_list('handle__suffix', 'hits')) == {1: 1, 2: 2, 3: 3}
+
+@pytest.mark.django_db
+def test_write_hits_keeps_the_latest_last_accessed_time(handles):
+    now = timezone.now()
+    HandleStats.objects.bulk_create([
+        HandleStats(handle=handles[0], hits=1, last_accessed=now),
+        HandleStats(handle=handles[1], hits=1, last_accessed=None),
+    ])
+
+    hits.write_hits([
+        (handles[0].pk, (2, now - datetime.timedelta(seconds=1))),
+        (handles[1].pk, (2, now)),
+        (handles[2].pk, (2, now)),
+    ])
+
+    stats = {s.handle_id: (s.hits, s.last_accessed) for s in HandleStats.objects.all()}
+    assert stats == {handles[0].pk: (3, now), handles[1].pk: (3, now), handles[2].pk: (2, now)}
+
+@requires_postgresql
+@pytest.mark.django_db
+def test_write_hits_uses_greatest_with_typed_values_in_postgresql(handles, django_assert_num_queries):
+    # The VALUES of a multi-row upsert have no column types, so the
+    # parameters must be typed for the "hits" sum and GREATEST (timestamp)
+    now = timezone.now()
+    HandleStats.objects.create(handle=handles[0], hits=2**40, last_accessed=now)
+
+    with django_assert_num_queries(3) as queries:
+        hits.write_hits([
+            (handles[0].pk, (1, now - datetime.timedelta(days=1))),
+            (handles[1].pk, (2**33, now + datetime.timedelta(microseconds=1))),
+        ])
+    assert 'GREATEST(' in queries.captured_queries[1]['sql']
+
+    stats = {s.handle_id: (s.hits, s.last_accessed) for s in HandleStats.objects.all()}
+    assert stats == {
+        handles[0].pk: (2**40 + 1, now),
+        handles[1].pk: (2**33, now + datetime.timedelta(microseconds=1)),
+    }
+
+@pytest.mark.django_db
+def test_failed_flush_returns_hits_to_the_counter(handles, monkeypatch):
+    counter = hits.HitCounter()
+    counter.add(handles[0].pk, timezone.now())
+
+    def fail(batch):
+        raise RuntimeError('Database unavailable')
+
+    monkeypatch.setattr(hits, 'write_hits', fail)
+    with pytest.raises(RuntimeError):
+        counter.flush()
+    counter.add(handles[0].pk, timezone.now())
+    monkeypatch.undo()
+
+    counter.flush()
+    assert HandleStats.objects.get(handle=handles[0]).hits == 2
+
+@pytest.mark.django_db
+def test_handles_stats_returns_top_and_last_accessed_handles(client, jwt_token, handles):
+    for handle, count in zip(handles, [1, 3, 2]):
+        for _ in range(count):
+            resolve(client, jwt_token, handle)
+    headers = {'Authorization': f"Bearer {jwt_token}"}
+
+    response = client.get(reverse('handles_stats'), data={'limit': 2}, headers=headers)
+    assert response.status_code == 200
+    results = response.json()['handles']
+    assert [(h['suffix'], h['hits']) for h in results] == [('2', 3), ('3', 2)]
+    assert results[0]['url'] == 'http://example.com/2'
+    assert results[0]['last_accessed']
+
+    response = client.get(reverse('handles_stats'), data={'order': 'last_accessed'}, headers=headers)
+    assert [h['suffix'] for h in response.json()['handles']] == ['3', '2', '1']
+
+    response = client.get(reverse('handles_stats'), data={'repo': 'fcrepo'}, headers=headers)
+    assert [h['suffix'] for h in response.json()['handles']] == ['2', '1']
+
+    response = client.get(reverse('handles_stats'), data={'order': 'modified', 'limit': 0}, headers=headers)
+    assert response.status_code == 400
+    assert len(response.json()['errors']) == 2
+
+@pytest.mark.django_db
+def test_handles_stats_requires_jwt_token(client):
+    assert client.get(reverse('handles_stats')).status_code == 401
+
+@pytest.mark.django_db
+def test_admin_handle_list_shows_hits(admin_client, jwt_token, handles):
+    resolve(admin_client, jwt_token, handles[0])
+    response = admin_client.get('/admin/api/handle/', data={'o': '-6'})
+    assert response.status_code == 200
+    assert '<td class="field-hits">1</td>' in response.content.decode()
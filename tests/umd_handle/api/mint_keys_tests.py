@@ -0,0 +1,103 @@
+import datetime
+import json
+import pytest
+from io import StringIO
+from django.core.management import call_command
+from django.urls import reverse
+from django.utils import timezone
+from umd_handle.api.models import Handle, HandleHistory, MintKey
+from umd_handle.api.tokens import create_jwt_token
+
+MINT_REQUEST = {
+    'prefix': '1903.1',
+    'url': 'https://av.example.edu/media_objects/abc',
+    'repo': 'avalon',
+    'repo_id': 'abc',
+}
+
+
+@pytest.fixture
+def jwt_token(settings) -> str:
+    settings.JWT_SECRET = 'test_token_secret'
+    return create_jwt_token('pytest mint keys token')
+
+def mint(client, jwt_token, body=MINT_REQUEST, **headers):
+    return client.post(
+        reverse('handles'), data=json.dumps(body), content_type='application/json',
+        headers={'Authorization': f"Bearer {jwt_token}", **headers}
+    )
+
+@pytest.mark.django_db
+def test_retried_mint_with_idempotency_key_returns_same_handle(client, jwt_token):
+    first = mint(client, jwt_token, idempotency_key='avalon-abc-1')
+    assert first.status_code == 200
+    retry = mint(client, jwt_token, idempotency_key='avalon-abc-1')
+    assert retry.status_code == 200
+    assert retry.json() == first.json()
+
+    assert Handle.objects.count() == 1
+    assert HandleHistory.objects.filter(action=HandleHistory.ACTION_CREATE).count() == 1
+
+    # A new key mints a new handle
+    other = mint(client, jwt_token, idempotency_key='avalon-abc-2')
+    assert other.json()['suffix'] == '2'
+
+@pytest.mark.django_db
+def test_idempotency_key_reused_for_different_request(client, jwt_token):
+    mint(client, jwt_token, idempotency_key='key-1')
+    response = mint(client, jwt_token, {**MINT_REQUEST, 'repo_id': 'other'}, idempotency_key='key-1')
+    assert response.status_code == 422
+    assert response.json() == {'errors': ["Idempotency-Key 'key-1' was used for a different request"]}
+    assert Handle.objects.count() == 1
+
+@pytest.mark.django_db
+def test_failed_mint_does_not_keep_idempotency_key(client, jwt_token):
+    response = mint(client, jwt_token, {**MINT_REQUEST, 'repo': 'INVALID_REPO'}, idempotency_key='key-1')
+    assert response.status_code == 400
+    assert not MintKey.objects.exists()
+
+@pytest.mark.django_db
+def test_expired_idempotency_key_mints_new_handle(client, jwt_token):
+    mint(client, jwt_token, idempotency_key='key-1')
+    MintKey.objects.update(expires=timezone.now() - datetime.timedelta(seconds=1))
+
+    response = mint(client, jwt_token, idempotency_key='key-1')
+    assert response.json()['suffix'] == '2'
+    assert MintKey.objects.get().handle.suffix == 2
+
+@pytest.mark.django_db
+def test_mint_returns_existing_handle_for_repo_item(settings, client, jwt_token):
+    settings.MINT_RETURNS_EXISTING_HANDLE = True
+    existing = Handle.objects.create(suffix=7, **MINT_REQUEST)
+
+    response = mint(client, jwt_token)
+    assert response.status_code == 200
+    assert response.json()['suffix'] == '7'
+
+    response = mint(client, jwt_token, {**MINT_REQUEST, 'repo_id': 'def'})
+    assert response.json()['suffix'] == '8'
+    assert mint(client, jwt_token, {**MINT_REQUEST, 'repo_id': 'def'}).json()['suffix'] == '8'
+
+    # A claimed handle that is changed to another item is not returned
+    existing.repo_id = 'changed'
+    existing.save()
+    assert mint(client, jwt_token).json()['suffix'] == '9'
+    assert Handle.objects.count() == 3
+
+@pytest.mark.django_db
+def test_mint_creates_duplicates_by_default(client, jwt_token):
+    mint(client, jwt_token)
+    mint(client, jwt_token)
+    assert Handle.objects.count() == 2
+    assert not MintKey.objects.exists()
+
+@pytest.mark.django_db
+def test_db_clear_mint_keys_deletes_expired_keys(client, jwt_token):
+    mint(client, jwt_token, idempotency_key='key-1')
+    mint(client, jwt_token, idempotency_key='key-2')
+    MintKey.objects.filter(key__endswith=':key-1').update(expires=timezone.now() - datetime.timedelta(seconds=1))
+
+    out = StringIO()
+    call_command('db_clear_mint_keys', stdout=out)
+    assert 'Deleted 1 expired key(s)' in out.getvalue()
+    assert [key.key.rsplit(':', 1)[1] for key in MintKey.objects.all()] == ['key-2']
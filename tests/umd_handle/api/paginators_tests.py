@@ -0,0 +1,59 @@
+import pytest
+from django.core.cache import cache
+from umd_handle.api import paginators
+from umd_handle.api.models import Handle
+from umd_handle.api.paginators import EstimatedCountPaginator
+
+
+@pytest.fixture(autouse=True)
+def clear_cache():
+    cache.clear()
+    yield
+    cache.clear()
+
+@pytest.fixture
+def handles():
+    return Handle.objects.bulk_create([
+        Handle(prefix='1903.1', suffix=suffix, url='http://example.com/', repo='fcrepo', repo_id=f"r{suffix}")
+        for suffix in range(1, 6)
+    ])
+
+@pytest.mark.django_db
+def test_planner_estimate_is_not_available_in_sqlite():
+    assert paginators.planner_estimate(Handle.objects.all()) is None
+
+@pytest.mark.django_db
+def test_exact_counts_of_more_than_one_page_are_cached(handles, django_assert_num_queries):
+    queryset = Handle.objects.filter(repo='fcrepo').order_by('-modified')
+
+    with django_assert_num_queries(1):
+        assert EstimatedCountPaginator(queryset, 2).count == 5
+    with django_assert_num_queries(0):
+        assert EstimatedCountPaginator(queryset, 2).count == 5
+
+    # Different filters are counted separately
+    with django_assert_num_queries(1):
+        assert EstimatedCountPaginator(queryset.filter(suffix__gt=3), 1).count == 2
+
+@pytest.mark.django_db
+def test_exact_counts_that_fit_on_one_page_are_not_cached(handles, django_assert_num_queries):
+    queryset = Handle.objects.order_by('id')
+
+    assert EstimatedCountPaginator(queryset, 10).count == 5
+    with django_assert_num_queries(1):
+        assert EstimatedCountPaginator(queryset, 10).count == 5
+
+@pytest.mark.django_db
+def test_large_planner_estimates_are_used_instead_of_counting(settings, handles, monkeypatch, django_assert_num_queries):
+    settings.ADMIN_COUNT_ESTIMATE_THRESHOLD = 1000
+    monkeypatch.setattr(paginators, 'planner_estimate', lambda queryset: 250000)
+
+    with django_assert_num_queries(0):
+        assert EstimatedCountPaginator(Handle.objects.order_by('id'), 100).count == 250000
+
+@pytest.mark.django_db
+def test_small_planner_estimates_are_replaced_by_exact_count(settings, handles, monkeypatch):
+    settings.ADMIN_COUNT_ESTIMATE_THRESHOLD = 1000
+    monkeypatch.setattr(paginators, 'planner_estimate', lambda queryset: 7)
+
+    assert EstimatedCountPaginator(Handle.objects.order_by('id'), 100).count == 5
@@ -0,0 +1,103 @@
+import pytest
+from django.db import connection
+from django.urls import reverse
+from django.utils import timezone
+from umd_handle.api import rewrite_rules
+from umd_handle.api.models import Handle, UrlRewriteRule
+from umd_handle.api.rewrite_rules import RuleMatcher, rewrite_url
+from umd_handle.api.tokens import create_jwt_token
+
+
+@pytest.fixture(autouse=True)
+def reload_rules():
+    """
+    Discards the cached rules after each test, as the rules are removed when
+    the test transaction is rolled back, without a signal.
+    """
+    yield
+    rewrite_rules.invalidate()
+
+@pytest.fixture
+def jwt_token(settings) -> str:
+    settings.JWT_SECRET = 'test_token_secret'
+    return create_jwt_token('pytest rewrite rules token')
+
+def rule(pattern, replacement, match_type='prefix', repo='', priority=0, pk=1):
+    return (priority, pk, UrlRewriteRule(
+        pk=pk, pattern=pattern, replacement=replacement, match_type=match_type, repo=repo, priority=priority
+    ))
+
+def test_matcher_without_rules_returns_url():
+    matcher = RuleMatcher([])
+    assert matcher.apply('http://example.com/a', 'fcrepo') == 'http://example.com/a'
+
+def test_matcher_applies_highest_priority_matching_rule():
+    matcher = RuleMatcher([
+        rule('http://old.example.com/', 'https://new.example.com/', pk=1),
+        rule('http://old.example.com/special/', 'https://special.example.com/', priority=10, pk=2),
+        rule(r'^http://old\.example\.com/(\w+)/(\d+)$', r'https://ids.example.com/\2', 'regex', priority=5, pk=3),
+        rule('http://other.example.com/', 'https://other.example.com/', pk=4),
+    ])
+    assert matcher.apply('http://old.example.com/special/1', 'fcrepo') == 'https://special.example.com/1'
+    assert matcher.apply('http://old.example.com/items/1', 'fcrepo') == 'https://ids.example.com/1'
+    assert matcher.apply('http://old.example.com/items/a', 'fcrepo') == 'https://new.example.com/items/a'
+    assert matcher.apply('http://other.example.com/x', 'fcrepo') == 'https://other.example.com/x'
+    assert matcher.apply('http://unmatched.example.com/', 'fcrepo') == 'http://unmatched.example.com/'
+
+def test_matcher_rules_can_be_scoped_by_repo():
+    matcher = RuleMatcher([
+        rule('http://old.example.com/', 'https://avalon.example.com/', repo='avalon', pk=1),
+        rule('http://old.example.com/', 'https://new.example.com/', pk=2),
+    ])
+    assert matcher.apply('http://old.example.com/a', 'avalon') == 'https://avalon.example.com/a'
+    assert matcher.apply('http://old.example.com/a', 'fcrepo') == 'https://new.example.com/a'
+
+@pytest.mark.django_db
+def test_rules_are_reloaded_when_changed():
+    assert rewrite_url('http://old.example.com/a', 'fcrepo') == 'http://old.example.com/a'
+
+    rule = UrlRewriteRule.objects.create(pattern='http://old.example.com/', replacement='https://new.example.com/')
+    assert rewrite_url('http://old.example.com/a', 'fcrepo') == 'https://new.example.com/a'
+
+    rule.enabled = False
+    rule.save()
+    assert rewrite_url('http://old.example.com/a', 'fcrepo') == 'http://old.example.com/a'
+
+@pytest.mark.django_db
+def test_rules_changed_by_other_processes_are_reloaded(settings):
+    settings.URL_REWRITE_RULES_CHECK_SECONDS = 0
+    assert rewrite_url('http://old.example.com/a', 'fcrepo') == 'http://old.example.com/a'
+
+    # Changes made without a signal in this process (i.e., by another
+    # process, which does not share the cache) are found in the database
+    [rule] = UrlRewriteRule.objects.bulk_create([
+        UrlRewriteRule(pattern='http://old.example.com/', replacement='https://new.example.com/')
+    ])
+    assert rewrite_url('http://old.example.com/a', 'fcrepo') == 'https://new.example.com/a'
+
+    UrlRewriteRule.objects.filter(pk=rule.pk).update(replacement='https://newer.example.com/', modified=timezone.now())
+    assert rewrite_url('http://old.example.com/a', 'fcrepo') == 'https://newer.example.com/a'
+
+    with connection.cursor() as cursor:
+        cursor.execute(f"DELETE FROM {UrlRewriteRule._meta.db_table} WHERE id = %s", [rule.pk])
+    assert rewrite_url('http://old.example.com/a', 'fcrepo') == 'http://old.example.com/a'
+
+@pytest.mark.django_db
+def test_api_responses_use_rewritten_urls(client, jwt_token):
+    Handle.objects.create(
+        prefix='1903.1', suffix=1, url='http://old.example.com/a', repo='fcrepo', repo_id='fcrepo-1'
+    )
+    UrlRewriteRule.objects.create(pattern='http://old.example.com/', replacement='https://new.example.com/')
+    headers = {'Authorization': f"Bearer {jwt_token}"}
+
+    response = client.get(reverse('handles_prefix_suffix', kwargs={'prefix': '1903.1', 'suffix': 1}), headers=headers)
+    assert response.json()['url'] == 'https://new.example.com/a'
+
+    response = client.get(reverse('handles_info'), data={'prefix': '1903.1', 'suffix': '1'}, headers=headers)
+    assert response.json()['url'] == 'https://new.example.com/a'
+
+    response = client.get(reverse('handles_exists'), data={'repo': 'fcrepo', 'repo_id': 'fcrepo-1'}, headers=headers)
+    assert response.json()['url'] == 'https://new.example.com/a'
+
+    # The stored URL is unchanged
+    assert Handle.objects.get().url == 'http://old.example.com/a'
@@ -0,0 +1,114 @@
+import csv
+import pytest
+from io import StringIO
+from django.core.management import call_command
+from umd_handle.api.models import Handle, HandleHistory
+from umd_handle.api.url_rewrite import UrlRewrite, rewrite_urls
+
+CHANGELIST_URL = '/admin/api/handle/'
+
+
+@pytest.fixture
+def handles():
+    urls = [
+        'http://fedora.example.com/fedora/get/umd:1',
+        'http://fedora.example.com/fedora/get/umd:2',
+        'http://fedora.example.com/fedora/get/umd:3',
+        'https://avalon.example.com/media_objects/abc',
+    ]
+    return [
+        Handle.objects.create(
+            prefix='1903.1', suffix=suffix, url=url,
+            repo='avalon' if 'avalon' in url else 'fedora2', repo_id=f"id-{suffix}"
+        )
+        for suffix, url in enumerate(urls, start=1)
+    ]
+
+def urls_by_suffix():
+    return dict(Handle.objects.values_list('suffix', 'url'))
+
+@pytest.mark.django_db
+def test_prefix_rewrite_updates_matching_urls_in_chunks(handles):
+    modified = {h.suffix: h.modified for h in handles}
+    rewrite = UrlRewrite('http://fedora.example.com/', 'https://digital.example.com/')
+
+    result = rewrite_urls(Handle.objects.all(), rewrite, chunk_size=2, actor='tester')
+    assert result == (3, 3, 0)
+
+    urls = urls_by_suffix()
+    assert urls[1] == 'https://digital.example.com/fedora/get/umd:1'
+    assert urls[3] == 'https://digital.example.com/fedora/get/umd:3'
+    assert urls[4] == 'https://avalon.example.com/media_objects/abc'
+
+    # Rewritten handles are marked as modified, and recorded in the history
+    assert Handle.objects.get(suffix=1).modified > modified[1]
+    assert Handle.objects.get(suffix=4).modified == modified[4]
+    entries = HandleHistory.objects.order_by('suffix')
+    assert [e.suffix for e in entries] == [1, 2, 3]
+    assert entries[0].before == {'url': 'http://fedora.example.com/fedora/get/umd:1'}
+    assert entries[0].actor == 'tester'
+
+@pytest.mark.django_db
+def test_regex_rewrite_only_changes_filtered_queryset(handles):
+    rewrite = UrlRewrite(r'/get/umd:(\d+)$', r'/objects/umd-\1', regex=True)
+    result = rewrite_urls(Handle.objects.filter(suffix__in=[1, 2]), rewrite)
+    assert result == (2, 2, 0)
+
+    urls = urls_by_suffix()
+    assert urls[1] == 'http://fedora.example.com/fedora/objects/umd-1'
+    assert urls[3] == 'http://fedora.example.com/fedora/get/umd:3'
+
+@pytest.mark.django_db
+def test_dry_run_reports_count_without_changes(handles):
+    rewrite = UrlRewrite('http://fedora.example.com/', 'https://digital.example.com/')
+    assert rewrite_urls(Handle.objects.all(), rewrite, dry_run=True) == (3, 3, 0)
+    assert urls_by_suffix()[1] == 'http://fedora.example.com/fedora/get/umd:1'
+    assert not HandleHistory.objects.exists()
+
+@pytest.mark.django_db
+def test_invalid_rewritten_urls_are_skipped(handles):
+    rewrite = UrlRewrite('http://fedora.example.com/', 'ftp://digital.example.com/')
+    assert rewrite_urls(Handle.objects.all(), rewrite) == (3, 0, 3)
+    assert urls_by_suffix()[1] == 'http://fedora.example.com/fedora/get/umd:1'
+
+@pytest.mark.django_db
+def test_db_rewrite_urls_writes_audit_file(handles, tmp_path):
+    audit_file = tmp_path / 'audit.csv'
+    out = StringIO()
+    call_command(
+        'db_rewrite_urls', 'http://fedora.example.com/', 'https://digital.example.com/',
+        '--repo', 'fedora2', '--audit-file', str(audit_file), stdout=out
+    )
+    assert 'Rewrote 3 of 3 matching URL(s)' in out.getvalue()
+
+    with open(audit_file, newline='') as f:
+        rows = list(csv.reader(f))
+    assert rows[0] == ['handle', 'old_url', 'new_url']
+    assert rows[1] == [
+        '1903.1/1', 'http://fedora.example.com/fedora/get/umd:1', 'https://digital.example.com/fedora/get/umd:1'
+    ]
+
+@pytest.mark.django_db
+def test_admin_action_previews_then_rewrites(admin_client, handles):
+    data = {
+        'action': 'rewrite_selected_urls',
+        '_selected_action': [h.id for h in handles[:2]],
+        'pattern': 'http://fedora.example.com/',
+        'replacement': 'https://digital.example.com/',
+    }
+
+    # The action shows the form
+    response = admin_client.post(CHANGELIST_URL, {'action': data['action'], '_selected_action': data['_selected_action']})
+    assert response.status_code == 200
+    assert response.context['selected_count'] == 2
+
+    response = admin_client.post(CHANGELIST_URL, {**data, 'preview': 'Preview'})
+    assert response.status_code == 200
+    assert response.context['preview'] == (2, 2, 0)
+    assert urls_by_suffix()[1] == 'http://fedora.example.com/fedora/get/umd:1'
+
+    response = admin_client.post(CHANGELIST_URL, {**data, 'apply': 'Rewrite URLs'})
+    assert response.status_code == 302
+    urls = urls_by_suffix()
+    assert urls[1] == 'https://digital.example.com/fedora/get/umd:1'
+    assert urls[3] == 'http://fedora.example.com/fedora/get/umd:3'
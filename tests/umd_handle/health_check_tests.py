@@ -0,0 +1,58 @@
+import pytest
+import time
+from django.urls import reverse
+from umd_handle import health_check
+
+
+@pytest.fixture(autouse=True)
+def clear_cached_readiness_result():
+    health_check._cached_result = None
+    yield
+    health_check._cached_result = None
+
+def test_health_check_returns_ok(client):
+    response = client.get(reverse('health-check'))
+    assert response.status_code == 200
+    assert response.content.decode('utf-8') == 'OK'
+
+@pytest.mark.django_db
+def test_health_check_ready_reports_each_check(client):
+    response = client.get(reverse('health-check-ready'))
+    assert response.status_code == 200
+    data = response.json()
+    assert data['status'] == 'ok'
+    assert set(data['checks']) == {'database', 'cache', 'migrations'}
+    for check in data['checks'].values():
+        assert check['status'] == 'ok'
+        assert check['latency_ms'] >= 0
+
+@pytest.mark.django_db
+def test_health_check_ready_returns_503_when_a_check_fails(client, monkeypatch):
+    def failing_check():
+        raise RuntimeError('Cache is down')
+    monkeypatch.setattr(health_check, 'check_cache', failing_check)
+
+    response = client.get(reverse('health-check-ready'))
+    assert response.status_code == 503
+    data = response.json()
+    assert data['status'] == 'error'
+    assert data['checks']['cache'] == {'status': 'error', 'error': 'Cache is down', 'latency_ms': data['checks']['cache']['latency_ms']}
+    assert data['checks']['database']['status'] == 'ok'
+
+@pytest.mark.django_db
+def test_health_check_ready_fails_checks_that_time_out(client, settings, monkeypatch):
+    settings.READINESS_CHECK_TIMEOUT = 0.1
+    monkeypatch.setattr(health_check, 'check_cache', lambda: time.sleep(1))
+
+    response = client.get(reverse('health-check-ready'))
+    assert response.status_code == 503
+    assert response.json()['checks']['cache']['error'] == 'Timed out after 0.1s'
+
+@pytest.mark.django_db
+def test_health_check_ready_caches_result(client, monkeypatch):
+    calls = []
+    monkeypatch.setattr(health_check, 'check_cache', lambda: calls.append(1))
+
+    client.get(reverse('health-check-ready'))
+    client.get(reverse('health-check-ready'))
+    assert len(calls) == 1
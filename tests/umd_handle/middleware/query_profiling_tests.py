@@ -0,0 +1,58 @@
+import json
+import logging
+import pytest
+from django.core.exceptions import MiddlewareNotUsed
+from django.http import HttpResponse
+from django.test import RequestFactory
+from umd_handle.api.models import Handle
+from umd_handle.middleware import QueryProfilingMiddleware
+
+
+@pytest.fixture(autouse=True)
+def query_profiling_enabled(settings):
+    settings.QUERY_PROFILING_ENABLED = True
+    settings.SLOW_REQUEST_THRESHOLD_MS = 10000
+    settings.SLOW_QUERY_THRESHOLD_MS = 10000
+
+@pytest.fixture
+def rf():
+    """Fixture to provide a RequestFactory instance."""
+    return RequestFactory()
+
+def get_response_with_queries(request):
+    """A mock get_response function that makes two database queries."""
+    Handle.objects.count()
+    Handle.objects.filter(prefix='1903.1').exists()
+    return HttpResponse("OK")
+
+def test_middleware_is_not_used_when_profiling_is_disabled(settings):
+    settings.QUERY_PROFILING_ENABLED = False
+    with pytest.raises(MiddlewareNotUsed):
+        QueryProfilingMiddleware(get_response_with_queries)
+
+@pytest.mark.django_db
+def test_server_timing_header_reports_query_count(rf):
+    middleware = QueryProfilingMiddleware(get_response_with_queries)
+    response = middleware(rf.get('/api/v1/handles/1903.1/1'))
+    assert response.status_code == 200
+    assert response['Server-Timing'].startswith('db;desc="2 queries";dur=')
+    assert 'total;dur=' in response['Server-Timing']
+
+@pytest.mark.django_db
+def test_slow_queries_and_requests_are_logged(settings, rf, caplog):
+    settings.SLOW_REQUEST_THRESHOLD_MS = 0
+    settings.SLOW_QUERY_THRESHOLD_MS = 0
+    middleware = QueryProfilingMiddleware(get_response_with_queries)
+
+    with caplog.at_level(logging.WARNING, logger='umd_handle.slow_log'):
+        middleware(rf.get('/api/v1/handles/1903.1/1'))
+
+    entries = [json.loads(record.getMessage()) for record in caplog.records]
+    slow_queries = [e for e in entries if e['event'] == 'slow_query']
+    slow_requests = [e for e in entries if e['event'] == 'slow_request']
+
+    assert len(slow_queries) == 2
+    assert all('api_handle' in e['sql'] for e in slow_queries)
+    assert len(slow_requests) == 1
+    assert slow_requests[0]['queries'] == 2
+    assert slow_requests[0]['path'] == '/api/v1/handles/1903.1/1'
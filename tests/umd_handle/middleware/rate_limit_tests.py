@@ -0,0 +1,103 @@
+import pytest
+from django.core.cache import cache
+from django.core.exceptions import MiddlewareNotUsed
+from django.http import HttpResponse
+from django.test import RequestFactory
+from umd_handle.middleware import APIRateLimitMiddleware
+from umd_handle import rate_limit
+from umd_handle.rate_limit import TokenBucket
+
+
+@pytest.fixture(autouse=True)
+def rate_limit_enabled(settings):
+    settings.API_RATE_LIMIT_ENABLED = True
+    settings.API_RATE_LIMIT_READ_RATE = 1.0
+    settings.API_RATE_LIMIT_READ_BURST = 3
+    settings.API_RATE_LIMIT_WRITE_RATE = 1.0
+    settings.API_RATE_LIMIT_WRITE_BURST = 1
+    settings.API_RATE_LIMIT_CACHE = ''
+    settings.API_MAX_CONCURRENT_REQUESTS_PER_TOKEN = 1
+
+@pytest.fixture
+def rf():
+    """Fixture to provide a RequestFactory instance."""
+    return RequestFactory()
+
+def get_response_mock(request):
+    """A mock get_response function that returns a simple HttpResponse."""
+    return HttpResponse("OK")
+
+def api_request(rf, jwt_token, method='get'):
+    request = getattr(rf, method)('/api/v1/handles/1903.1/1')
+    request.jwt_token = jwt_token
+    return request
+
+def test_middleware_is_not_used_when_rate_limiting_is_disabled(settings):
+    settings.API_RATE_LIMIT_ENABLED = False
+    with pytest.raises(MiddlewareNotUsed):
+        APIRateLimitMiddleware(get_response_mock)
+
+def test_token_bucket_refills_at_rate():
+    bucket = TokenBucket(rate=2.0, burst=2, now=0)
+    assert bucket.take(0) == 0
+    assert bucket.take(0) == 0
+    assert bucket.take(0) == 0.5
+    assert bucket.take(0.5) == 0
+
+def test_requests_over_the_burst_are_rejected_with_retry_after(rf):
+    middleware = APIRateLimitMiddleware(get_response_mock)
+    statuses = [middleware(api_request(rf, 'token-a')).status_code for _ in range(4)]
+    assert statuses == [200, 200, 200, 429]
+
+    response = middleware(api_request(rf, 'token-a'))
+    assert response.status_code == 429
+    assert response['Retry-After'] == '1'
+
+def test_limits_are_separate_for_each_token_and_for_writes(rf):
+    middleware = APIRateLimitMiddleware(get_response_mock)
+    assert middleware(api_request(rf, 'token-a', 'patch')).status_code == 200
+    assert middleware(api_request(rf, 'token-a', 'post')).status_code == 429
+
+    # Reads, and other tokens, are not affected
+    assert middleware(api_request(rf, 'token-a')).status_code == 200
+    assert middleware(api_request(rf, 'token-b', 'post')).status_code == 200
+
+def test_requests_without_a_token_are_not_limited(rf):
+    middleware = APIRateLimitMiddleware(get_response_mock)
+    for _ in range(5):
+        assert middleware(rf.get('/')).status_code == 200
+
+def test_concurrent_requests_per_token_are_limited(rf):
+    nested_responses = {}
+
+    def get_response_with_nested_requests(request):
+        # While the "token-a" request is in flight, make another request
+        # for each token
+        if request.jwt_token == 'token-a' and not nested_responses:
+            for token in ('token-a', 'token-b'):
+                nested_responses[token] = middleware(api_request(rf, token)).status_code
+        return HttpResponse("OK")
+
+    middleware = APIRateLimitMiddleware(get_response_with_nested_requests)
+    response = middleware(api_request(rf, 'token-a'))
+    assert response.status_code == 200
+    assert nested_responses == {'token-a': 429, 'token-b': 200}
+
+    # The in-flight request is released when it completes
+    assert middleware.concurrency_limiter.in_flight == {}
+
+def test_limits_can_be_shared_using_the_cache(settings, rf, monkeypatch):
+    settings.API_RATE_LIMIT_CACHE = 'default'
+    settings.API_MAX_CONCURRENT_REQUESTS_PER_TOKEN = 0
+    settings.API_RATE_LIMIT_READ_BURST = 100
+    cache.clear()
+    # Keep both requests in the same fixed window
+    monkeypatch.setattr(rate_limit.time, 'time', lambda: 1000.5)
+
+    # Two middleware instances (i.e., in different processes) share limits
+    middleware1 = APIRateLimitMiddleware(get_response_mock)
+    middleware2 = APIRateLimitMiddleware(get_response_mock)
+    assert middleware1(api_request(rf, 'token-a', 'post')).status_code == 200
+    response = middleware2(api_request(rf, 'token-a', 'post'))
+    assert response.status_code == 429
+    assert int(response['Retry-After']) >= 1
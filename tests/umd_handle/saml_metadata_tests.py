@@ -0,0 +1,100 @@
+import os
+import pytest
+from io import StringIO
+from django.conf import settings
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from umd_handle import saml_metadata
+from umd_handle.saml_metadata import MetadataError, base_config, refresh_metadata, validate_metadata
+
+IDP_ENTITY_ID = 'https://idp.example.edu/idp'
+
+IDP_METADATA = f"""<?xml version="1.0"?>
+<EntityDescriptor xmlns="urn:oasis:names:tc:SAML:2.0:metadata" entityID="{IDP_ENTITY_ID}">
+  <IDPSSODescriptor protocolSupportEnumeration="urn:oasis:names:tc:SAML:2.0:protocol">
+    <SingleSignOnService Binding="urn:oasis:names:tc:SAML:2.0:bindings:HTTP-POST"
+                         Location="https://idp.example.edu/sso"/>
+  </IDPSSODescriptor>
+</EntityDescriptor>
+""".encode()
+
+requires_saml_setup = pytest.mark.skipif(
+    not all(os.path.exists(path) for path in [settings.SAML_CONFIG['xmlsec_binary'], settings.SAML_KEY_FILE]),
+    reason='xmlsec1, or the SAML key, is not installed'
+)
+
+
+@pytest.fixture(autouse=True)
+def metadata_settings(settings, tmp_path):
+    settings.SAML_IDP_ENTITY_ID = IDP_ENTITY_ID
+    settings.SAML_METADATA_FILE = str(tmp_path / 'saml-metadata' / 'idp-metadata.xml')
+    settings.SAML_METADATA_REFRESH_SECONDS = 0
+
+@pytest.fixture
+def fetch(monkeypatch):
+    """
+    Replaces the metadata fetch with one returning the "metadata" attribute,
+    or raising it, if it is an exception.
+    """
+    class Fetch:
+        metadata = IDP_METADATA
+
+        def __call__(self):
+            if isinstance(self.metadata, Exception):
+                raise self.metadata
+            return self.metadata
+
+    fetch = Fetch()
+    monkeypatch.setattr(saml_metadata, 'fetch_metadata', fetch)
+    return fetch
+
+def read_metadata_file():
+    with open(settings.SAML_METADATA_FILE, 'rb') as f:
+        return f.read()
+
+def test_validate_metadata_accepts_idp_metadata():
+    validate_metadata(IDP_METADATA, base_config())
+
+@pytest.mark.parametrize('xml', [
+    b'not xml',
+    IDP_METADATA.replace(IDP_ENTITY_ID.encode('utf-8'), b'https://other.example.edu/idp'),
+    IDP_METADATA.replace(b'IDPSSODescriptor', b'SPSSODescriptor'),
+])
+def test_validate_metadata_rejects_invalid_metadata(xml):
+    with pytest.raises(MetadataError):
+        validate_metadata(xml, base_config())
+
+def test_refresh_keeps_last_good_copy_on_failure(fetch):
+    refresh_metadata()
+    assert read_metadata_file() == IDP_METADATA
+
+    fetch.metadata = OSError('Connection refused')
+    with pytest.raises(OSError):
+        refresh_metadata()
+
+    fetch.metadata = b'<html>Maintenance</html>'
+    with pytest.raises(MetadataError):
+        refresh_metadata()
+
+    assert read_metadata_file() == IDP_METADATA
+    assert os.listdir(os.path.dirname(settings.SAML_METADATA_FILE)) == ['idp-metadata.xml']
+
+def test_saml_fetch_metadata_command_seeds_file(fetch):
+    out = StringIO()
+    call_command('saml_fetch_metadata', stdout=out)
+    assert read_metadata_file() == IDP_METADATA
+    assert 'Saved IdP metadata' in out.getvalue()
+
+    fetch.metadata = OSError('Connection refused')
+    with pytest.raises(CommandError):
+        call_command('saml_fetch_metadata', stdout=StringIO())
+
+@requires_saml_setup
+def test_config_loader_reuses_parsed_metadata_until_file_changes(fetch):
+    conf = saml_metadata.config_loader()
+    assert IDP_ENTITY_ID in conf.metadata.identity_providers()
+    assert saml_metadata.config_loader().metadata is conf.metadata
+
+    saml_metadata.write_metadata(IDP_METADATA + b'\n')
+    os.utime(settings.SAML_METADATA_FILE, ns=(0, 0))
+    assert saml_metadata.config_loader().metadata is not conf.metadata
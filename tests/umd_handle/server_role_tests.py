@@ -0,0 +1,48 @@
+import os
+import subprocess
+import sys
+
+API_ROLE_SCRIPT = """
+import sys
+import django
+django.setup()
+from django.conf import settings
+from django.urls import Resolver404, resolve
+
+assert resolve('/api/v1/handles/info').url_name == 'handles_info'
+assert resolve('/health-check/ready').url_name == 'health-check-ready'
+try:
+    resolve('/admin/')
+    raise AssertionError('Admin URLs should not be available')
+except Resolver404:
+    pass
+
+assert 'django.contrib.admin' not in settings.INSTALLED_APPS
+assert 'saml2' not in sys.modules
+assert 'djangosaml2' not in sys.modules
+print('OK')
+"""
+
+
+def run_with_role(role, script):
+    env = {
+        **os.environ,
+        'UMD_HANDLE_ROLE': role,
+        'DJANGO_SETTINGS_MODULE': 'umd_handle.settings',
+        # A random default SECRET_KEY starting with "$" is treated as a
+        # reference to another environment variable by django-environ
+        'SECRET_KEY': 'server-role-tests',
+    }
+    return subprocess.run([sys.executable, '-c', script], env=env, capture_output=True, text=True, check=False)
+
+
+def test_api_role_only_loads_the_rest_api():
+    result = run_with_role('api', API_ROLE_SCRIPT)
+    assert result.returncode == 0, result.stderr
+    assert result.stdout.strip() == 'OK'
+
+
+def test_invalid_role_is_rejected():
+    result = run_with_role('admin-only', 'import django; django.setup()')
+    assert result.returncode != 0
+    assert 'UMD_HANDLE_ROLE' in result.stderr
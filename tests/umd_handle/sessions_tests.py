@@ -0,0 +1,73 @@
+import pytest
+import time
+from datetime import timedelta
+from io import StringIO
+from django.contrib.sessions.models import Session
+from django.core.management import call_command
+from django.http import HttpResponse
+from django.utils import timezone
+from djangosaml2.cache import IdentityCache, OutstandingQueriesCache
+from saml2.saml import NameID
+from umd_handle.middleware import SamlSessionMiddleware
+
+SIGNED_COOKIES = 'django.contrib.sessions.backends.signed_cookies'
+
+
+def create_sessions(count, expired):
+    expire_date = timezone.now() + timedelta(days=-1 if expired else 1)
+    prefix = 'expired' if expired else 'current'
+    Session.objects.bulk_create(
+        Session(session_key=f"{prefix}{i:032d}", session_data='', expire_date=expire_date) for i in range(count)
+    )
+
+@pytest.mark.django_db
+def test_db_clear_sessions_deletes_expired_sessions_in_batches(django_assert_num_queries):
+    create_sessions(5, expired=True)
+    create_sessions(2, expired=False)
+
+    out = StringIO()
+    # Two full batches, and a final (partial) batch: a select and a delete each
+    with django_assert_num_queries(6):
+        call_command('db_clear_sessions', '--batch-size', '2', stdout=out)
+
+    assert 'Deleted 5 expired session(s)' in out.getvalue()
+    assert Session.objects.count() == 2
+    assert not Session.objects.filter(expire_date__lt=timezone.now()).exists()
+
+@pytest.mark.django_db
+def test_saml_session_can_use_signed_cookies(settings, rf):
+    settings.SAML_SESSION_ENGINE = SIGNED_COOKIES
+    name_id = NameID(text='jdoe', format='urn:oasis:names:tc:SAML:2.0:nameid-format:transient')
+
+    def login(request):
+        OutstandingQueriesCache(request.saml_session).set('id-123', '/admin')
+        IdentityCache(request.saml_session).set(
+            name_id, 'https://idp.example.edu/idp', {'ava': {'uid': ['jdoe']}, 'name_id': name_id},
+            int(time.time()) + 3600
+        )
+        return HttpResponse()
+
+    response = SamlSessionMiddleware(login)(rf.get('/saml2/login/'))
+    cookie = response.cookies[settings.SAML_SESSION_COOKIE_NAME].value
+
+    def callback(request):
+        assert OutstandingQueriesCache(request.saml_session).outstanding_queries() == {'id-123': '/admin'}
+        identity, _ = IdentityCache(request.saml_session).get_identity(name_id)
+        assert identity == {'uid': ['jdoe']}
+        return HttpResponse()
+
+    request = rf.get('/saml2/acs/')
+    request.COOKIES[settings.SAML_SESSION_COOKIE_NAME] = cookie
+    SamlSessionMiddleware(callback)(request)
+
+    # Nothing was written to the database
+    assert not Session.objects.exists()
+
+@pytest.mark.django_db
+def test_admin_interface_works_with_signed_cookie_sessions(settings, client, admin_user):
+    settings.SESSION_ENGINE = SIGNED_COOKIES
+    client.force_login(admin_user)
+
+    response = client.get('/admin/api/handle/')
+    assert response.status_code == 200
+    assert not Session.objects.exists()